@@ -0,0 +1,105 @@
+import logging
+
+from django.conf import settings
+from django.core import serializers
+from django.db import transaction
+from django.db.models.deletion import Collector
+
+from authentication.apps.customer import models, sharding
+from authentication.utils import get_local_time
+
+logger = logging.getLogger(__name__)
+
+
+def archive(batch_size=None):
+    """Move one batch of long soft deleted rows to the archive table.
+
+    Customers go first so the contacts they restrict can follow in the same
+    pass, and their emails, mobiles and national codes are freed in the
+    directory. Works on the pinned shard and returns how many soft deleted rows
+    were archived.
+    """
+    batch_size = batch_size or settings.AUTHENTICATION_CUSTOMER["ARCHIVE_BATCH_SIZE"]
+    cutoff = get_local_time() - settings.AUTHENTICATION_CUSTOMER["ARCHIVE_AFTER"]
+
+    customers = archive_batch(
+        models.Customer.all_objects.filter(deleted_at__lt=cutoff).order_by(
+            "deleted_at"
+        ),
+        batch_size,
+    )
+    if customers:
+        sharding.unregister([customer.pk for customer in customers])
+    contacts = archive_batch(
+        models.Contact.all_objects.filter(
+            deleted_at__lt=cutoff, customer__isnull=True
+        ).order_by("deleted_at"),
+        batch_size,
+    )
+    return len(customers) + len(contacts)
+
+
+def compact_change_history(batch_size=None):
+    """Move one batch of old email and mobile changes to the archive table.
+
+    Changes older than ``CHANGE_HISTORY_RETENTION`` go, except the current
+    change of each customer. Works on the pinned shard and returns how many
+    changes were archived.
+    """
+    batch_size = batch_size or settings.AUTHENTICATION_CUSTOMER["ARCHIVE_BATCH_SIZE"]
+    cutoff = (
+        get_local_time() - settings.AUTHENTICATION_CUSTOMER["CHANGE_HISTORY_RETENTION"]
+    )
+
+    return sum(
+        len(
+            archive_batch(
+                model.objects.filter(
+                    created_at__lt=cutoff, current_for__isnull=True
+                ).order_by("created_at"),
+                batch_size,
+            )
+        )
+        for model in (models.EmailChange, models.PhoneChange)
+    )
+
+
+def archive_batch(queryset, batch_size):
+    """Archive the first rows of ``queryset`` with everything they cascade to.
+
+    Rows are locked with ``SKIP LOCKED`` so several archivers can run side by
+    side. Every row the delete would remove, cascades included, is stored as an
+    ``Archive`` row before the delete runs in the same transaction. Returns
+    the archived rows of ``queryset``.
+    """
+    using = queryset.db
+    with transaction.atomic(using=using):
+        rows = list(queryset.select_for_update(skip_locked=True)[:batch_size])
+        if not rows:
+            return rows
+
+        collector = Collector(using=using)
+        collector.collect(rows)
+
+        instances = [
+            instance for instances in collector.data.values() for instance in instances
+        ]
+        for fast_delete in collector.fast_deletes:
+            instances.extend(fast_delete)
+
+        deleted_at = get_local_time()
+        models.Archive.objects.using(using).bulk_create(
+            models.Archive(
+                model=record["model"],
+                object_id=str(record["pk"]),
+                data=record["fields"],
+                deleted_at=getattr(instance, "deleted_at", None) or deleted_at,
+            )
+            for instance, record in zip(
+                instances, serializers.serialize("python", instances)
+            )
+        )
+        collector.delete()
+
+    logger.info("Archived %s %s rows", len(rows), queryset.model._meta.label)
+    return rows
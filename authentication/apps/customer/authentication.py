@@ -1,7 +1,28 @@
+import uuid
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from authentication.apps.customer import models, sharding
+from authentication.apps.customer.validators import normalize_email
+from authentication.cache import entity_key, generation_key, new_generation
 
-from authentication.apps.customer import models
+# Everything signin reads from a customer, fetched with its contact in one query.
+CREDENTIAL_FIELDS = (
+    "id",
+    "password",
+    "last_login",
+    "is_active",
+    "username__id",
+    "username__email",
+    "username__mobile",
+)
 
 
 class EmailMobileAuthentication(ModelBackend):
@@ -9,36 +30,89 @@ class EmailMobileAuthentication(ModelBackend):
         self, request, username=None, mobile=None, email=None, password=None, **kwargs
     ):
         if email:
-            try:
-                contact = models.Contact.objects.get(email=email)
-                customer = contact.customer
+            lookup = {"username__email_key": normalize_email(email)}
+        elif mobile:  # to allow authentication through mobile
+            lookup = {"username__mobile": mobile}
+        else:
+            return None
 
-            except ObjectDoesNotExist:
+        if sharding.is_sharded():
+            kind, value = (
+                (sharding.EMAIL, email) if email else (sharding.MOBILE, mobile)
+            )
+            customer_id = sharding.locate(kind, value)
+            if customer_id is None:
                 return None
-            else:
-                if customer.check_password(password) and self.user_can_authenticate(
-                    customer.username
-                ):
-                    return customer
+            sharding.pin(customer_id)
+            lookup = {"id": customer_id}
 
-        elif mobile:
-
-            try:  # to allow authentication through mobile
-                contact = models.Contact.objects.get(mobile=mobile)
-                customer = contact.customer
+        try:
+            customer = (
+                models.Customer.objects.select_related("username")
+                .only(*CREDENTIAL_FIELDS)
+                .get(**lookup)
+            )
+        except ObjectDoesNotExist:
+            return None
 
-            except ObjectDoesNotExist:
-                return None
-            else:
-                if customer.check_password(password) and self.user_can_authenticate(
-                    customer.username
-                ):
-                    return customer
+        if customer.check_password(password) and self.user_can_authenticate(
+            customer.username
+        ):
+            return customer
 
     def get_user(self, contact_id):
         try:
-            customer = models.Customer.objects.get(pk=contact_id)
+            sharding.pin(contact_id)
+        except ValueError:
+            return None
+        try:
+            customer = models.Customer.objects.select_related("username").get(
+                pk=contact_id
+            )
         except ObjectDoesNotExist:
             return None
 
         return customer if self.user_can_authenticate(customer.username) else None
+
+
+# What authenticated requests read from the customer, cached without secrets.
+# Other fields load from the shard when first used.
+SNAPSHOT_FIELDS = ("id", "username_id", "is_active", "email_verify", "mobile_verify")
+
+
+class ShardJWTAuthentication(JWTAuthentication):
+    """JWT authentication reading the customer from its shard.
+
+    ``SNAPSHOT_FIELDS`` of active customers are cached for
+    ``CUSTOMER_SNAPSHOT_TIMEOUT`` along with the customer's generation, see
+    ``authentication.cache.generation_key``. Saving a customer starts a new
+    generation, which retires the snapshot.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = uuid.UUID(str(validated_token.get(api_settings.USER_ID_CLAIM)))
+        except ValueError:
+            return super().get_user(validated_token)
+
+        key = entity_key(models.Customer, user_id)
+        generation_at = generation_key(models.Customer, user_id)
+        cached = cache.get_many([key, generation_at])
+        generation, snapshot = cached.get(generation_at), cached.get(key)
+        alias = sharding.pin(user_id)
+        if generation is not None and snapshot and snapshot[0] == generation:
+            user = models.Customer.from_db(alias, SNAPSHOT_FIELDS, snapshot[1])
+            if not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            return user
+
+        user = super().get_user(validated_token)
+        if generation is None:
+            # Fails when a write started a generation since the lookup.
+            generation = new_generation()
+            if not cache.add(generation_at, generation):
+                return user
+        values = tuple(getattr(user, field) for field in SNAPSHOT_FIELDS)
+        timeout = settings.AUTHENTICATION_CUSTOMER["CUSTOMER_SNAPSHOT_TIMEOUT"]
+        cache.set(key, (generation, values), timeout.total_seconds())
+        return user
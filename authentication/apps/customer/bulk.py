@@ -0,0 +1,100 @@
+"""Validation of lists of emails, mobiles and national codes.
+
+Partners check thousands of values before onboarding their customers.
+Formats are checked in process and uniqueness with one directory query per
+``BULK_VALIDATION["CHUNK_SIZE"]`` values, the same rules signup applies.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.utils.translation import gettext_lazy as _
+
+from authentication.apps.customer import sharding
+from authentication.apps.customer.validators import (
+    MOBILE_REGEX,
+    is_national_code,
+    normalize_email,
+    normalize_mobile,
+    normalize_national_code,
+)
+
+_mobile = re.compile(MOBILE_REGEX)
+
+
+def _email(value):
+    if len(value) > 75:
+        return None
+    try:
+        validate_email(value)
+    except ValidationError:
+        return None
+    return normalize_email(value)
+
+
+def _mobile_number(value):
+    value = normalize_mobile(value)
+    return value if len(value) <= 15 and _mobile.match(value) else None
+
+
+def _national_code(value):
+    value = normalize_national_code(value)
+    return value if is_national_code(value) else None
+
+
+# Per kind: the normalized value or None, and the errors of invalid and used
+# values.
+RULES = {
+    sharding.EMAIL: (
+        _email,
+        _("Enter a valid email address"),
+        _("This email already used"),
+    ),
+    sharding.MOBILE: (
+        _mobile_number,
+        _("Enter a valid mobile"),
+        _("This mobile number already used"),
+    ),
+    sharding.NATIONAL_CODE: (
+        _national_code,
+        _("Enter a valid national code"),
+        _("This national code already used"),
+    ),
+}
+
+
+def validate(kind, values):
+    """Return a result for every value, in order.
+
+    A result has the ``value``, whether it is ``valid``, whether it is
+    ``available`` (None for invalid values) and the ``error``, if any. Values
+    repeating an earlier one of the list are not available.
+    """
+    normalize, invalid, used = RULES[kind]
+    normalized = [normalize(value) for value in values]
+    taken = sharding.taken(
+        kind,
+        {value for value in normalized if value is not None},
+        settings.AUTHENTICATION_CUSTOMER["BULK_VALIDATION"]["CHUNK_SIZE"],
+    )
+
+    results = []
+    seen = set()
+    for value, key in zip(values, normalized):
+        if key is None:
+            results.append(
+                {"value": value, "valid": False, "available": None, "error": invalid}
+            )
+            continue
+        if key in taken:
+            error = used
+        elif key in seen:
+            error = _("Repeats an earlier value")
+        else:
+            error = None
+        seen.add(key)
+        results.append(
+            {"value": value, "valid": True, "available": not error, "error": error}
+        )
+    return results
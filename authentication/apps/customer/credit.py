@@ -0,0 +1,181 @@
+"""Customer credit kept as an append-only ledger.
+
+Every change of ``Customer.total_credit`` is a ``CreditTransaction`` row
+written in the same transaction as an ``F()`` update of the balance. The
+update never reads the balance first, so concurrent adjustments of a
+customer queue on its row lock instead of overwriting each other, and
+reading the credit stays a single column. Old ledger entries are rolled up
+into one entry per customer and archived.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+
+from authentication.apps.customer import archive, lifecycle, models, sharding
+from authentication.utils import get_local_time
+
+ROLLUP = "rollup"
+RESET = "reset"
+
+# Bounds of the BigIntegerField balances and amounts, kept symmetric so any
+# amount can be negated.
+MAX_CREDIT = 2**63 - 1
+
+
+class CreditError(Exception):
+    pass
+
+
+class InsufficientCredit(CreditError):
+    pass
+
+
+class CustomerNotFound(CreditError):
+    pass
+
+
+class CreditOutOfRange(CreditError):
+    pass
+
+
+def adjust(customer_id, amount, reason, reference=None, allow_negative=False):
+    """Add ``amount``, negative for charges, to the credit of a customer.
+
+    Returns the new balance. An adjustment repeating the ``reference`` of an
+    earlier one is not applied again and returns the current balance, as long
+    as the earlier entry is younger than ``CREDIT_LEDGER_RETENTION``; older
+    entries are rolled up without their references. Unless
+    ``allow_negative``, charges larger than the balance raise
+    ``InsufficientCredit``. Amounts and balances beyond ``MAX_CREDIT`` raise
+    ``CreditOutOfRange``.
+    """
+    if not -MAX_CREDIT <= amount <= MAX_CREDIT:
+        raise CreditOutOfRange(_("Credit out of range"))
+    with sharding.use_customer_shard(customer_id) as using:
+        try:
+            with transaction.atomic(using=using):
+                return apply(customer_id, amount, reason, reference, allow_negative)
+        except IntegrityError:
+            # The ledger entry comes first, nothing else was written.
+            if reference is None or not exists(customer_id):
+                raise CustomerNotFound(_("Customer not found"))
+            return balance(customer_id)
+
+
+def apply(customer_id, amount, reason, reference, allow_negative):
+    entry = models.CreditTransaction.objects.create(
+        customer_id=customer_id, amount=amount, reason=reason, reference=reference
+    )
+    customers = models.Customer.objects.filter(pk=customer_id)
+    insufficient = amount < 0 and not allow_negative
+    if insufficient:
+        customers = customers.filter(total_credit__gte=-amount)
+    elif amount < 0:
+        customers = customers.filter(total_credit__gte=-MAX_CREDIT - amount)
+    else:
+        customers = customers.filter(total_credit__lte=MAX_CREDIT - amount)
+    updated = customers.update(
+        total_credit=F("total_credit") + amount, updated_at=get_local_time()
+    )
+    if not updated:
+        if not exists(customer_id):
+            raise CustomerNotFound(_("Customer not found"))
+        if insufficient:
+            raise InsufficientCredit(_("Insufficient credit"))
+        raise CreditOutOfRange(_("Credit out of range"))
+
+    models.Customer.invalidate_snapshots([customer_id], using=entry._state.db)
+    lifecycle.publish(
+        lifecycle.CREDIT_CHANGED,
+        customer_id,
+        amount=amount,
+        reason=reason,
+        transaction=str(entry.id),
+    )
+    return balance(customer_id)
+
+
+def exists(customer_id):
+    return models.Customer.objects.filter(pk=customer_id).exists()
+
+
+def balance(customer_id):
+    return (
+        models.Customer.objects.filter(pk=customer_id)
+        .values_list("total_credit", flat=True)
+        .get()
+    )
+
+
+def record_resets(balances):
+    """Write the ledger entries taking ``(customer_id, balance)`` pairs to zero.
+
+    The caller sets their ``total_credit`` to zero in the same transaction.
+    Returns the ``CREDIT_CHANGED`` event data of every customer.
+    """
+    entries = models.CreditTransaction.objects.bulk_create(
+        models.CreditTransaction(customer_id=customer_id, amount=-balance, reason=RESET)
+        for customer_id, balance in balances
+    )
+    return [
+        (
+            entry.customer_id,
+            {
+                "amount": entry.amount,
+                "reason": entry.reason,
+                "transaction": str(entry.id),
+            },
+        )
+        for entry in entries
+    ]
+
+
+def adjust_many(adjustments):
+    """Apply every adjustment on its own and return a result for each.
+
+    An adjustment is a dict of ``adjust`` arguments; its result has the
+    ``customer`` and either the new ``balance`` or the ``error``.
+    """
+    results = []
+    for adjustment in adjustments:
+        customer_id = adjustment["customer_id"]
+        try:
+            results.append({"customer": customer_id, "balance": adjust(**adjustment)})
+        except CreditError as error:
+            results.append({"customer": customer_id, "error": str(error)})
+    return results
+
+
+def rollup(batch_size=None):
+    """Replace one batch of old ledger entries by one entry per customer.
+
+    Entries older than ``CREDIT_LEDGER_RETENTION`` are archived, so their
+    references no longer stop a replayed adjustment. Customers
+    whose only old entry is an earlier roll-up are left alone. Works on the
+    pinned shard and returns how many entries were archived.
+    """
+    batch_size = batch_size or settings.AUTHENTICATION_CUSTOMER["ARCHIVE_BATCH_SIZE"]
+    cutoff = (
+        get_local_time() - settings.AUTHENTICATION_CUSTOMER["CREDIT_LEDGER_RETENTION"]
+    )
+
+    old = models.CreditTransaction.objects.filter(created_at__lt=cutoff)
+    queryset = old.filter(
+        customer_id__in=old.exclude(reason=ROLLUP).values("customer_id")
+    ).order_by("customer_id", "created_at")
+    using = queryset.db
+    with transaction.atomic(using=using):
+        entries = archive.archive_batch(queryset, batch_size)
+        totals = defaultdict(int)
+        for entry in entries:
+            totals[entry.customer_id] += entry.amount
+        models.CreditTransaction.objects.using(using).bulk_create(
+            models.CreditTransaction(
+                customer_id=customer_id, amount=total, reason=ROLLUP
+            )
+            for customer_id, total in totals.items()
+        )
+    return len(entries)
@@ -1,5 +1,7 @@
 from django.db import models
 
+from authentication.apps.customer.validators import normalize_mobile
+
 
 class NullableUniqueCharField(models.CharField):
     description = "CharField that stores NULL but returns ''"
@@ -13,6 +15,18 @@ class NullableUniqueCharField(models.CharField):
         return value or None
 
 
+class MobileField(NullableUniqueCharField):
+    description = "Mobile number stored and looked up in its canonical form"
+
+    def pre_save(self, model_instance, add):
+        value = normalize_mobile(getattr(model_instance, self.attname))
+        setattr(model_instance, self.attname, value)
+        return value
+
+    def get_prep_value(self, value):
+        return super().get_prep_value(normalize_mobile(value))
+
+
 class NullableUniqueEmailField(models.EmailField):
     description = "EmailField that stores NULL but returns ''"
 
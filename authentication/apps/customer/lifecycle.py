@@ -0,0 +1,66 @@
+"""Customer lifecycle events for downstream services.
+
+Events are written to the outbox in the transaction of the change and the
+outbox relay publishes them in batches to the ``LIFECYCLE_EVENTS`` broker,
+so only committed changes are announced. Consumers replay the stream after
+a message id or read it through a consumer group, see
+``authentication.streams``. Every event carries the outbox ``id``, which is
+the same if the relay publishes it again after a crash.
+"""
+import functools
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from authentication.apps.customer import models
+
+# Outbox rows of this name are events, not tasks.
+TASK = "customer.lifecycle_event"
+
+CREATED = "created"
+EMAIL_VERIFIED = "email_verified"
+MOBILE_VERIFIED = "mobile_verified"
+CONTACT_CHANGED = "contact_changed"
+CREDIT_CHANGED = "credit_changed"
+ACTIVATED = "activated"
+DEACTIVATED = "deactivated"
+VERIFICATION_RESET = "verification_reset"
+
+
+def publish(event, customer_id, **data):
+    """Announce ``event`` of a customer once the caller's transaction commits."""
+    return models.Outbox.objects.create(
+        task=TASK, kwargs={"event": event, "customer_id": str(customer_id), **data}
+    )
+
+
+def publish_many(event, events):
+    """Announce ``event`` of many customers with one insert.
+
+    ``events`` are ``(customer_id, data)`` pairs.
+    """
+    return models.Outbox.objects.bulk_create(
+        models.Outbox(
+            task=TASK,
+            kwargs={"event": event, "customer_id": str(customer_id), **data},
+        )
+        for customer_id, data in events
+    )
+
+
+def message(row):
+    return dict(row.kwargs, id=str(row.id), at=row.created_at.isoformat())
+
+
+@functools.lru_cache(maxsize=None)
+def get_broker():
+    config = settings.LIFECYCLE_EVENTS
+    return import_string(config["BROKER"])(**config["OPTIONS"])
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    if setting == "LIFECYCLE_EVENTS":
+        get_broker.cache_clear()
@@ -0,0 +1,74 @@
+import os
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.tokens import PRIVATE_SUFFIX, PUBLIC_SUFFIX
+
+
+class Command(BaseCommand):
+    help = (
+        "Add a JWT signing key to JWT_KEYS['DIRECTORY'], or retire one so it only "
+        "verifies tokens issued before the rotation"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--algorithm", default=settings.JWT_KEYS["ALGORITHM"])
+        parser.add_argument("--kid", default=None)
+        parser.add_argument(
+            "--retire",
+            metavar="KID",
+            help="Keep only the public part of this key",
+        )
+
+    def handle(self, *args, **options):
+        directory = str(settings.JWT_KEYS["DIRECTORY"])
+        os.makedirs(directory, exist_ok=True)
+
+        if options["retire"]:
+            self.retire(directory, options["retire"])
+            return
+
+        if options["algorithm"].startswith("RS"):
+            key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        elif options["algorithm"] == "EdDSA":
+            key = ed25519.Ed25519PrivateKey.generate()
+        else:
+            raise CommandError(
+                "%s is not an asymmetric algorithm" % options["algorithm"]
+            )
+
+        kid = options["kid"] or time.strftime("%Y%m%d%H%M%S")
+        path = os.path.join(directory, kid + PRIVATE_SUFFIX)
+        if os.path.exists(path):
+            raise CommandError("%s already exists" % path)
+
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "wb") as key_file:
+            key_file.write(pem)
+        self.stdout.write("Created signing key %s" % kid)
+
+    def retire(self, directory, kid):
+        path = os.path.join(directory, kid + PRIVATE_SUFFIX)
+        if not os.path.exists(path):
+            raise CommandError("No private key %s" % kid)
+
+        with open(path, "rb") as key_file:
+            key = serialization.load_pem_private_key(key_file.read(), password=None)
+        with open(os.path.join(directory, kid + PUBLIC_SUFFIX), "wb") as key_file:
+            key_file.write(
+                key.public_key().public_bytes(
+                    serialization.Encoding.PEM,
+                    serialization.PublicFormat.SubjectPublicKeyInfo,
+                )
+            )
+        os.remove(path)
+        self.stdout.write("Retired signing key %s" % kid)
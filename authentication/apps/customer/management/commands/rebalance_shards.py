@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.apps.customer import rebalance, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Spread customer buckets evenly over SHARDING['SHARDS'], or move one "
+        "bucket. Customers of a bucket are refused while it moves, each move "
+        "waits twice for SHARDING['MAP_TTL']"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bucket", type=int, help="Move only this bucket")
+        parser.add_argument("--to", metavar="SHARD", help="Shard to move it to")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the moves without running them",
+        )
+
+    def handle(self, *args, **options):
+        if options["bucket"] is not None:
+            if not 0 <= options["bucket"] < settings.SHARDING["BUCKETS"]:
+                raise CommandError("No bucket %s" % options["bucket"])
+            if options["to"] not in sharding.get_shards():
+                raise CommandError("--to must be one of %s" % sharding.get_shards())
+            source = rebalance.current_map()[options["bucket"]]
+            moves = [(options["bucket"], source, options["to"])]
+        else:
+            moves = rebalance.plan()
+
+        for bucket, source, target in moves:
+            if options["dry_run"]:
+                self.stdout.write("Bucket %s: %s -> %s" % (bucket, source, target))
+                continue
+            moved = rebalance.move_bucket(bucket, target)
+            self.stdout.write(
+                "Moved bucket %s from %s to %s (%s customers)"
+                % (bucket, source, target, moved)
+            )
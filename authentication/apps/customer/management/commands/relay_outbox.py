@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from authentication.apps.customer import outbox
+
+
+class Command(BaseCommand):
+    help = "Publish committed outbox messages to the Celery broker in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.AUTHENTICATION_CUSTOMER["OUTBOX_RELAY_BATCH_SIZE"],
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the outbox once and exit instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        interval = settings.AUTHENTICATION_CUSTOMER[
+            "OUTBOX_RELAY_INTERVAL"
+        ].total_seconds()
+
+        while True:
+            published = outbox.relay(options["batch_size"])
+            if published:
+                self.stdout.write("Published %s outbox messages" % published)
+                continue
+            if options["once"]:
+                return
+            time.sleep(interval)
@@ -1,20 +1,51 @@
 from django.contrib.auth.models import BaseUserManager
-from django.db.models import Manager
+from django.db import transaction
+from django.db.models import Manager, QuerySet
 
+from authentication.utils import get_local_time
 
-class ContactCustomerManager(BaseUserManager):
-    def create_customer(self, contact, password=None, **kwargs):
-        customer = self.model(username=contact, **kwargs)
 
-        customer.set_password(password)
-        customer.save(using=self._db)
-        return customer
+class SoftDeleteQuerySet(QuerySet):
+    def delete(self):
+        now = get_local_time()
+        if not getattr(self.model, "cache_snapshots", False):
+            return self.update(deleted_at=now, updated_at=now)
+
+        # update() bypasses save(), drop the cached rows it changes.
+        self._for_write = True
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list("pk", flat=True))
+            updated = (
+                self.model._base_manager.using(self.db)
+                .filter(pk__in=pks)
+                .update(deleted_at=now, updated_at=now)
+            )
+            self.model.invalidate_snapshots(pks, using=self.db)
+        return updated
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def hard_delete(self):
+        return super().delete()
+
+    hard_delete.alters_data = True
+    hard_delete.queryset_only = True
 
 
-class ExcludeDeletedEntityManager(Manager):
+class ExcludeDeletedEntityManager(Manager.from_queryset(SoftDeleteQuerySet)):
     def get_queryset(self):
         return (
             super(ExcludeDeletedEntityManager, self)
             .get_queryset()
             .filter(deleted_at=None)
         )
+
+
+class ContactCustomerManager(ExcludeDeletedEntityManager, BaseUserManager):
+    def create_customer(self, contact, password=None, **kwargs):
+        customer = self.model(username=contact, **kwargs)
+
+        customer.set_password(password)
+        customer.save(using=self._db)
+        return customer
@@ -0,0 +1,501 @@
+# Generated by Django 4.0 on 2026-10-19 19:12
+
+import re
+import uuid
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import authentication.apps.customer.fields
+import authentication.apps.customer.validators
+import authentication.utils
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Customer",
+            fields=[
+                (
+                    "last_login",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="last login"
+                    ),
+                ),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                (
+                    "password",
+                    models.CharField(
+                        error_messages={"required": "Password required"},
+                        max_length=128,
+                        validators=[
+                            django.core.validators.RegexValidator(
+                                message="Ensure Password has at least one digit",
+                                regex="\\d",
+                            ),
+                            django.core.validators.RegexValidator(
+                                message="Ensure Password has at least one latin letter",
+                                regex="[a-zA-Z]",
+                            ),
+                            django.core.validators.MinLengthValidator(8),
+                        ],
+                    ),
+                ),
+                ("object_id", models.UUIDField(blank=True, null=True)),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Designates whether this user should be treated as active. Unselect this instead of deleting accounts.",
+                        verbose_name="active",
+                    ),
+                ),
+                ("email_verify", models.DateTimeField(blank=True, null=True)),
+                ("mobile_verify", models.DateTimeField(blank=True, null=True)),
+                ("total_credit", models.BigIntegerField(default=0)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="People",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                ("name", models.CharField(blank=True, default="", max_length=50)),
+                ("last_name", models.CharField(blank=True, default="", max_length=50)),
+                ("id_number", models.CharField(blank=True, default="", max_length=15)),
+                (
+                    "national_code",
+                    models.CharField(
+                        error_messages={
+                            "invalid": "Enter a valid national code",
+                            "unique": "This national code already used",
+                        },
+                        max_length=10,
+                        unique=True,
+                        validators=[
+                            authentication.apps.customer.validators.validate_national_code
+                        ],
+                        verbose_name="national code",
+                    ),
+                ),
+                ("birth_date", models.DateField(blank=True, default=None, null=True)),
+                (
+                    "sex",
+                    models.CharField(
+                        choices=[("F", "Female"), ("M", "Male"), ("U", "Unsure")],
+                        default="U",
+                        max_length=1,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="PhoneChange",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                (
+                    "old_mobile",
+                    authentication.apps.customer.fields.NullableUniqueCharField(
+                        default="", max_length=15, null=True
+                    ),
+                ),
+                (
+                    "new_mobile",
+                    authentication.apps.customer.fields.NullableUniqueCharField(
+                        default="", max_length=15, null=True
+                    ),
+                ),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mobile_change",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="OTPTemp",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                ("code", models.PositiveSmallIntegerField()),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="otp_temp",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="EmailTemp",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                ("email", models.EmailField(default="", max_length=254)),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="email_temp",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="EmailChange",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                (
+                    "old_email",
+                    authentication.apps.customer.fields.NullableUniqueEmailField(
+                        default="", max_length=75, null=True
+                    ),
+                ),
+                (
+                    "new_email",
+                    authentication.apps.customer.fields.NullableUniqueEmailField(
+                        default="", max_length=75, null=True
+                    ),
+                ),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="email_change",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="Contact",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                ("object_id", models.UUIDField(blank=True, null=True)),
+                (
+                    "email",
+                    authentication.apps.customer.fields.NullableUniqueEmailField(
+                        blank=True,
+                        default=None,
+                        error_messages={
+                            "invalid": "Enter a valid email address",
+                            "max_length": "Enter a valid email address",
+                            "unique": "This email already used",
+                        },
+                        max_length=75,
+                        null=True,
+                        unique=True,
+                        verbose_name="email address",
+                    ),
+                ),
+                (
+                    "mobile",
+                    authentication.apps.customer.fields.NullableUniqueCharField(
+                        blank=True,
+                        default=None,
+                        error_messages={
+                            "invalid": "Enter a valid mobile",
+                            "max_length": "Enter a valid mobile",
+                            "unique": "This mobile already used",
+                        },
+                        max_length=15,
+                        null=True,
+                        unique=True,
+                        validators=[
+                            django.core.validators.RegexValidator(
+                                "^(?:0|98|\\+98|\\+980|0098|098|00980)?(9\\d{9})$",
+                                "Enter a valid mobile",
+                                "invalid",
+                            )
+                        ],
+                        verbose_name="mobile",
+                    ),
+                ),
+                (
+                    "telephone",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        error_messages={
+                            "invalid": "Enter a valid telephone",
+                            "max_length": "Enter a valid telephone",
+                        },
+                        max_length=15,
+                        validators=[
+                            django.core.validators.RegexValidator(
+                                re.compile("^\\d+(?:\\d+)*\\Z"),
+                                code="invalid",
+                                message=None,
+                            )
+                        ],
+                        verbose_name="telephone",
+                    ),
+                ),
+                ("city", models.CharField(blank=True, default="", max_length=50)),
+                ("province", models.CharField(blank=True, default="", max_length=50)),
+                (
+                    "postal_code",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        error_messages={
+                            "invalid": "Enter a valid postal code",
+                            "max_length": "Enter a valid postal code",
+                        },
+                        max_length=10,
+                        validators=[
+                            django.core.validators.RegexValidator(
+                                re.compile("^\\d+(?:\\d+)*\\Z"),
+                                code="invalid",
+                                message=None,
+                            )
+                        ],
+                        verbose_name="postal code",
+                    ),
+                ),
+                ("address", models.CharField(blank=True, default="", max_length=254)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="Company",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                ("name", models.CharField(max_length=50)),
+                (
+                    "national_code",
+                    models.CharField(
+                        error_messages={
+                            "invalid": "Enter a valid national code",
+                            "unique": "This national code already used",
+                        },
+                        max_length=10,
+                        unique=True,
+                        validators=[
+                            authentication.apps.customer.validators.validate_national_code
+                        ],
+                        verbose_name="national code",
+                    ),
+                ),
+                (
+                    "registration_code",
+                    models.CharField(blank=True, default="", max_length=20),
+                ),
+                (
+                    "agent",
+                    models.OneToOneField(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="company",
+                        to="customer.people",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="username",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.RESTRICT,
+                related_name="customer",
+                to="customer.contact",
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.0 on 2026-10-19 19:13
+
+import uuid
+
+from django.db import migrations, models
+
+import authentication.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Outbox",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                ("task", models.CharField(max_length=100)),
+                ("args", models.JSONField(blank=True, default=list)),
+                ("kwargs", models.JSONField(blank=True, default=dict)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="outbox",
+            index=models.Index(
+                fields=["created_at"], name="customer_ou_created_343660_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 4.0 on 2026-10-19 19:35
+
+import logging
+
+import django.core.validators
+from django.db import migrations
+
+import authentication.apps.customer.fields
+from authentication.apps.customer.validators import normalize_mobile
+
+logger = logging.getLogger(__name__)
+
+
+def canonicalize_mobiles(apps, schema_editor):
+    """Rewrite stored mobiles in their canonical form.
+
+    A contact whose canonical mobile already belongs to another contact keeps
+    its raw value and is logged, the duplicates have to be merged by hand.
+    """
+    db = schema_editor.connection.alias
+    Contact = apps.get_model("customer", "Contact")
+    PhoneChange = apps.get_model("customer", "PhoneChange")
+
+    mobiles = dict(
+        Contact.objects.using(db).exclude(mobile=None).values_list("id", "mobile")
+    )
+    taken = set(mobiles.values())
+    for contact_id, mobile in mobiles.items():
+        canonical = normalize_mobile(mobile)
+        if canonical == mobile:
+            continue
+        if canonical in taken:
+            logger.warning(
+                "Contact %s keeps mobile %r, %s is already used",
+                contact_id,
+                mobile,
+                canonical,
+            )
+            continue
+        Contact.objects.using(db).filter(id=contact_id).update(mobile=canonical)
+        taken.discard(mobile)
+        taken.add(canonical)
+
+    changes = PhoneChange.objects.using(db).values_list(
+        "id", "old_mobile", "new_mobile"
+    )
+    for change_id, old_mobile, new_mobile in changes.iterator():
+        if (old_mobile, new_mobile) != (
+            normalize_mobile(old_mobile),
+            normalize_mobile(new_mobile),
+        ):
+            PhoneChange.objects.using(db).filter(id=change_id).update(
+                old_mobile=normalize_mobile(old_mobile),
+                new_mobile=normalize_mobile(new_mobile),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0002_outbox"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="contact",
+            name="mobile",
+            field=authentication.apps.customer.fields.MobileField(
+                blank=True,
+                default=None,
+                error_messages={
+                    "invalid": "Enter a valid mobile",
+                    "max_length": "Enter a valid mobile",
+                    "unique": "This mobile already used",
+                },
+                max_length=15,
+                null=True,
+                unique=True,
+                validators=[
+                    django.core.validators.RegexValidator(
+                        "^(?:0|98|\\+98|\\+980|0098|098|00980)?(9\\d{9})$",
+                        "Enter a valid mobile",
+                        "invalid",
+                    )
+                ],
+                verbose_name="mobile",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="phonechange",
+            name="new_mobile",
+            field=authentication.apps.customer.fields.MobileField(
+                default="", max_length=15, null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="phonechange",
+            name="old_mobile",
+            field=authentication.apps.customer.fields.MobileField(
+                default="", max_length=15, null=True
+            ),
+        ),
+        migrations.RunPython(canonicalize_mobiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.0 on 2026-10-19 19:52
+
+import logging
+
+from django.db import migrations, models
+
+from authentication.apps.customer.validators import normalize_email
+
+logger = logging.getLogger(__name__)
+
+
+def fill_email_keys(apps, schema_editor):
+    """Fill the lookup key of every email before it becomes unique.
+
+    Emails differing only in case get the key of the first one only, the
+    others are logged to be merged by hand and cannot sign in until then.
+    """
+    db = schema_editor.connection.alias
+    Contact = apps.get_model("customer", "Contact")
+
+    taken = set()
+    emails = Contact.objects.using(db).exclude(email=None).order_by("created_at")
+    for contact_id, email in emails.values_list("id", "email").iterator():
+        key = normalize_email(email)
+        if key in taken:
+            logger.warning(
+                "Contact %s shares email %s with another contact", contact_id, key
+            )
+            continue
+        taken.add(key)
+        Contact.objects.using(db).filter(id=contact_id).update(email_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0003_canonical_mobile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contact",
+            name="email_key",
+            field=models.CharField(
+                default=None, editable=False, max_length=75, null=True
+            ),
+        ),
+        migrations.RunPython(fill_email_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="contact",
+            name="email_key",
+            field=models.CharField(
+                default=None, editable=False, max_length=75, null=True, unique=True
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.0 on 2026-10-19 19:38
+
+import uuid
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+import authentication.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0004_contact_email_key"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Archive",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                ("model", models.CharField(max_length=100)),
+                ("object_id", models.CharField(max_length=36)),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="archive",
+            index=models.Index(
+                fields=["model", "object_id"], name="customer_ar_model_dac605_idx"
+            ),
+        ),
+    ]
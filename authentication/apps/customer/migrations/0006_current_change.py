@@ -0,0 +1,55 @@
+# Generated by Django 4.0 on 2026-10-19 19:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def point_to_latest_changes(apps, schema_editor):
+    # The base manager also reaches soft deleted customers, which the default
+    # manager of the historical model hides.
+    db = schema_editor.connection.alias
+    customers = apps.get_model("customer", "Customer")._base_manager
+    for field, model_name in (
+        ("current_email_change", "EmailChange"),
+        ("current_mobile_change", "PhoneChange"),
+    ):
+        changes = apps.get_model("customer", model_name)._base_manager.filter(
+            customer=OuterRef("pk")
+        )
+        customers.using(db).update(
+            **{field: Subquery(changes.order_by("-created_at").values("pk")[:1])}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0005_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="current_email_change",
+            field=models.OneToOneField(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="current_for",
+                to="customer.emailchange",
+            ),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="current_mobile_change",
+            field=models.OneToOneField(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="current_for",
+                to="customer.phonechange",
+            ),
+        ),
+        migrations.RunPython(point_to_latest_changes, migrations.RunPython.noop),
+    ]
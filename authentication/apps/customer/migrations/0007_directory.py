@@ -0,0 +1,125 @@
+# Generated by Django 4.0 on 2026-10-19 19:46
+
+import logging
+
+from django.conf import settings
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+
+def fill_directory(apps, schema_editor):
+    """Register the emails, mobiles and national codes of existing customers.
+
+    Runs on every shard and writes to the directory database, which has to be
+    migrated first. A value another customer already registered, e.g. on an
+    earlier migrated shard, is logged and left to be merged by hand.
+    """
+    db = schema_editor.connection.alias
+    Customer = apps.get_model("customer", "Customer")
+    People = apps.get_model("customer", "People")
+    Directory = apps.get_model("customer", "Directory")
+
+    national_codes = dict(
+        People.objects.using(db).values_list("id", "national_code").iterator()
+    )
+    customers = Customer._base_manager.using(db).values_list(
+        "id", "object_id", "username__email_key", "username__mobile"
+    )
+    entries = []
+    for customer_id, owner_id, email_key, mobile in customers.iterator():
+        values = (
+            ("email", email_key),
+            ("mobile", mobile),
+            ("national_code", national_codes.get(owner_id)),
+        )
+        entries.extend(
+            Directory(kind=kind, value=value, customer_id=customer_id)
+            for kind, value in values
+            if value
+        )
+        if len(entries) >= CHUNK_SIZE:
+            register(Directory, entries)
+            entries = []
+    register(Directory, entries)
+
+
+def register(Directory, entries):
+    directory = Directory.objects.using(settings.SHARDING["DIRECTORY"])
+    owners = {}
+    for kind in {entry.kind for entry in entries}:
+        values = [entry.value for entry in entries if entry.kind == kind]
+        owners.update(
+            ((kind, value), customer_id)
+            for value, customer_id in directory.filter(
+                kind=kind, value__in=values
+            ).values_list("value", "customer_id")
+        )
+
+    new = []
+    for entry in entries:
+        key = (entry.kind, entry.value)
+        if key not in owners:
+            owners[key] = entry.customer_id
+            new.append(entry)
+        elif owners[key] != entry.customer_id:
+            logger.warning(
+                "Customer %s keeps %s %r out of the directory, it belongs to %s",
+                entry.customer_id,
+                entry.kind,
+                entry.value,
+                owners[key],
+            )
+    directory.bulk_create(new)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0006_current_change"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Directory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("kind", models.CharField(max_length=20)),
+                ("value", models.CharField(max_length=75)),
+                ("customer_id", models.UUIDField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ShardBucket",
+            fields=[
+                (
+                    "bucket",
+                    models.PositiveIntegerField(primary_key=True, serialize=False),
+                ),
+                ("shard", models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="directory",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "value"), name="unique_directory_value"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="directory",
+            constraint=models.UniqueConstraint(
+                fields=("customer_id", "kind"), name="unique_directory_kind"
+            ),
+        ),
+        migrations.RunPython(fill_directory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.0 on 2026-10-19 20:02
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import authentication.utils
+
+
+def open_ledgers(apps, schema_editor):
+    """Record the credit of existing customers as their first ledger entry."""
+    db = schema_editor.connection.alias
+    Customer = apps.get_model("customer", "Customer")
+    CreditTransaction = apps.get_model("customer", "CreditTransaction")
+
+    balances = (
+        Customer.objects.using(db)
+        .exclude(total_credit=0)
+        .values_list("id", "total_credit")
+    )
+    CreditTransaction.objects.using(db).bulk_create(
+        (
+            CreditTransaction(customer_id=customer_id, amount=amount, reason="opening")
+            for customer_id, amount in balances.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0007_directory"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CreditTransaction",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                ("amount", models.BigIntegerField()),
+                ("reason", models.CharField(max_length=100)),
+                ("reference", models.CharField(blank=True, max_length=100, null=True)),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="credit_transactions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="credittransaction",
+            index=models.Index(
+                fields=["created_at"], name="customer_cr_created_12d6bd_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="credittransaction",
+            constraint=models.UniqueConstraint(
+                fields=("customer", "reference"), name="unique_credit_reference"
+            ),
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
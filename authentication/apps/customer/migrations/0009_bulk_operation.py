@@ -0,0 +1,64 @@
+# Generated by Django 4.0 on 2026-10-19 20:06
+
+import uuid
+
+from django.db import migrations, models
+
+import authentication.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0008_credit_ledger"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BulkOperation",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(default=authentication.utils.get_local_time),
+                ),
+                ("deleted_at", models.DateTimeField(default=None, null=True)),
+                ("operation", models.CharField(max_length=30)),
+                ("customer_ids", models.JSONField(blank=True, default=list)),
+                ("filters", models.JSONField(blank=True, default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                ("total", models.PositiveIntegerField(null=True)),
+                ("processed", models.PositiveIntegerField(default=0)),
+                ("updated", models.PositiveIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
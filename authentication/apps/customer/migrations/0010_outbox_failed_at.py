@@ -0,0 +1,18 @@
+# Generated by Django 4.0 on 2026-10-19 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0009_bulk_operation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outbox",
+            name="failed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.0 on 2026-10-19 20:34
+
+from django.db import migrations, models
+
+from authentication.apps.customer.utils import bucket_for
+
+CHUNK_SIZE = 1000
+
+
+def fill_buckets(apps, schema_editor):
+    db = schema_editor.connection.alias
+    customers = apps.get_model("customer", "Customer")._base_manager.using(db)
+    while True:
+        ids = list(
+            customers.filter(bucket=None).values_list("id", flat=True)[:CHUNK_SIZE]
+        )
+        if not ids:
+            break
+        by_bucket = {}
+        for customer_id in ids:
+            by_bucket.setdefault(bucket_for(customer_id), []).append(customer_id)
+        for bucket, bucket_ids in by_bucket.items():
+            customers.filter(id__in=bucket_ids).update(bucket=bucket)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0010_outbox_failed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="bucket",
+            field=models.PositiveIntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+    ]
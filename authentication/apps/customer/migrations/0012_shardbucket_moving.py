@@ -0,0 +1,18 @@
+# Generated by Django 4.0 on 2026-10-19 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0011_customer_bucket"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shardbucket",
+            name="moving",
+            field=models.BooleanField(default=False),
+        ),
+    ]
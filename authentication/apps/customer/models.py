@@ -2,19 +2,25 @@ from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.core import validators
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
 from django.utils.translation import gettext_lazy as _
 
-from authentication.apps.customer.fields import (
-    NullableUniqueCharField,
-    NullableUniqueEmailField,
+from authentication.apps.customer.fields import MobileField, NullableUniqueEmailField
+from authentication.apps.customer.managers import (
+    ContactCustomerManager,
+    ExcludeDeletedEntityManager,
 )
-from authentication.apps.customer.managers import ContactCustomerManager
-from authentication.apps.customer.validators import validate_national_code
-from authentication.models import EntityMixin
+from authentication.apps.customer.utils import bucket_for
+from authentication.apps.customer.validators import (
+    MOBILE_REGEX,
+    normalize_email,
+    validate_national_code,
+)
+from authentication.models import EntityMixin, SoftDeleteMixin
 
 
-class Contact(EntityMixin):
+class Contact(SoftDeleteMixin, EntityMixin):
     content_type = models.ForeignKey(
         ContentType, on_delete=models.CASCADE, null=True, blank=True
     )
@@ -35,7 +41,12 @@ class Contact(EntityMixin):
         },
     )
 
-    mobile = NullableUniqueCharField(
+    # Lowercased email, unique and used for every lookup by email.
+    email_key = models.CharField(
+        max_length=75, unique=True, null=True, default=None, editable=False
+    )
+
+    mobile = MobileField(
         _("mobile"),
         max_length=15,
         unique=True,
@@ -44,7 +55,7 @@ class Contact(EntityMixin):
         null=True,
         validators=[
             validators.RegexValidator(
-                r"^(?:0|98|\+98|\+980|0098|098|00980)?(9\d{9})$",
+                MOBILE_REGEX,
                 _("Enter a valid mobile"),
                 "invalid",
             )
@@ -86,8 +97,18 @@ class Contact(EntityMixin):
 
     address = models.CharField(max_length=254, default="", blank=True)
 
+    objects = ExcludeDeletedEntityManager()
+    all_objects = models.Manager()
+
+    def save(self, *args, **kwargs):
+        self.email_key = normalize_email(self.email)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "email" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "email_key"}
+        super().save(*args, **kwargs)
+
 
-class Customer(AbstractBaseUser, EntityMixin):
+class Customer(SoftDeleteMixin, AbstractBaseUser, EntityMixin):
     username = models.OneToOneField(
         Contact, on_delete=models.RESTRICT, related_name="customer"
     )
@@ -129,14 +150,58 @@ class Customer(AbstractBaseUser, EntityMixin):
 
     total_credit = models.BigIntegerField(default=0)
 
+    # Shard bucket of the id, so a bucket moves without hashing every id.
+    bucket = models.PositiveIntegerField(null=True, editable=False, db_index=True)
+
+    # The latest rows of the change histories, read instead of the histories.
+    current_email_change = models.OneToOneField(
+        "EmailChange",
+        on_delete=models.SET_NULL,
+        null=True,
+        editable=False,
+        related_name="current_for",
+    )
+
+    current_mobile_change = models.OneToOneField(
+        "PhoneChange",
+        on_delete=models.SET_NULL,
+        null=True,
+        editable=False,
+        related_name="current_for",
+    )
+
     USERNAME_FIELD = "username"
 
+    # Authenticated requests read customers from the cache.
+    cache_snapshots = True
+
     objects = ContactCustomerManager()
+    all_objects = models.Manager()
+
+    def save(self, *args, **kwargs):
+        if self.bucket is None:
+            self.bucket = bucket_for(self.pk)
+        super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().delete(using=using, keep_parents=keep_parents)
+            self.username.delete(using=using)
+
+    def record_email_change(self, **fields):
+        """Append an email change to the history and make it the current one.
+
+        The caller saves the customer.
+        """
+        self.current_email_change = EmailChange.objects.create(customer=self, **fields)
+
+    def record_mobile_change(self, **fields):
+        """Append a mobile change to the history and make it the current one.
 
-    # def delete(self, using=None, keep_parents=False):
-    #     super(Customer, self).delete(using=using, keep_parents=keep_parents)
-    #     self.username.delete()
-    #     self.people.delete()
+        The caller saves the customer.
+        """
+        self.current_mobile_change = PhoneChange.objects.create(customer=self, **fields)
 
 
 class People(EntityMixin):
@@ -247,5 +312,137 @@ class PhoneChange(EntityMixin):
         Customer, related_name="mobile_change", on_delete=models.CASCADE
     )
 
-    old_mobile = NullableUniqueCharField(max_length=15, default="", null=True)
-    new_mobile = NullableUniqueCharField(max_length=15, default="", null=True)
+    old_mobile = MobileField(max_length=15, default="", null=True)
+    new_mobile = MobileField(max_length=15, default="", null=True)
+
+
+class Outbox(EntityMixin):
+    task = models.CharField(max_length=100)
+
+    args = models.JSONField(default=list, blank=True)
+
+    kwargs = models.JSONField(default=dict, blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    # Set once the message failed OUTBOX_MAX_ATTEMPTS times, the relay skips
+    # it from then on.
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at"])]
+
+
+class Archive(EntityMixin):
+    """A row moved out of its table, see ``authentication.apps.customer.archive``."""
+
+    model = models.CharField(max_length=100)
+
+    object_id = models.CharField(max_length=36)
+
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [models.Index(fields=["model", "object_id"])]
+
+
+class CreditTransaction(EntityMixin):
+    """An entry of the credit ledger, see ``authentication.apps.customer.credit``.
+
+    The entries of a customer add up to its ``total_credit``.
+    """
+
+    customer = models.ForeignKey(
+        Customer, on_delete=models.CASCADE, related_name="credit_transactions"
+    )
+
+    amount = models.BigIntegerField()
+
+    reason = models.CharField(max_length=100)
+
+    # Set by the caller so a retried adjustment is only applied once.
+    reference = models.CharField(max_length=100, null=True, blank=True)  # noqa DJ01
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["customer", "reference"], name="unique_credit_reference"
+            ),
+        ]
+        indexes = [models.Index(fields=["created_at"])]
+
+
+class Directory(models.Model):
+    """Global index from emails, mobiles and national codes to customer ids.
+
+    Lives on ``SHARDING["DIRECTORY"]`` next to the shard map, see
+    ``authentication.apps.customer.sharding``.
+    """
+
+    kind = models.CharField(max_length=20)
+
+    value = models.CharField(max_length=75)
+
+    customer_id = models.UUIDField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "value"], name="unique_directory_value"
+            ),
+            models.UniqueConstraint(
+                fields=["customer_id", "kind"], name="unique_directory_kind"
+            ),
+        ]
+
+
+class ShardBucket(models.Model):
+    """Shard of a bucket moved away from its round robin default."""
+
+    bucket = models.PositiveIntegerField(primary_key=True)
+
+    shard = models.CharField(max_length=100)
+
+    # Set while the bucket is copied to another shard, its customers are
+    # refused until the move ends.
+    moving = models.BooleanField(default=False)
+
+
+class BulkOperation(EntityMixin):
+    """An operation on many customers, see ``authentication.apps.customer.operations``.
+
+    Lives on ``SHARDING["DIRECTORY"]`` as it spans every shard. ``processed``
+    counts the customers looked at so far and ``updated`` those changed.
+    """
+
+    class STATUSES:
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+        STATUS_CHOICES = (
+            (PENDING, _("Pending")),
+            (RUNNING, _("Running")),
+            (DONE, _("Done")),
+            (FAILED, _("Failed")),
+        )
+
+    operation = models.CharField(max_length=30)
+
+    # Either the customers to change or the filters selecting them.
+    customer_ids = models.JSONField(default=list, blank=True)
+
+    filters = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(
+        max_length=10, choices=STATUSES.STATUS_CHOICES, default=STATUSES.PENDING
+    )
+
+    total = models.PositiveIntegerField(null=True)
+
+    processed = models.PositiveIntegerField(default=0)
+
+    updated = models.PositiveIntegerField(default=0)
+
+    error = models.TextField(blank=True)
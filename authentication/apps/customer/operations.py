@@ -0,0 +1,184 @@
+"""Operations on many customers at once.
+
+Support activates, deactivates or resets thousands of customers with one
+request, given by id or selected by filters. Every shard is walked in chunks
+of ``BULK_OPERATIONS["CHUNK_SIZE"]`` customers and each chunk is changed by
+one set based ``UPDATE`` in its own transaction. Only customers not already
+in the target state are changed; like single updates, their cached snapshots
+are dropped and a lifecycle event of each is written to the outbox.
+
+Operations on more than ``BULK_OPERATIONS["SYNC_LIMIT"]`` customers, or
+selected by filters, run in the ``customer.run_bulk_operation`` task and
+report their progress on their ``BulkOperation`` row.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from authentication.apps.customer import credit, lifecycle, models, sharding
+from authentication.utils import get_local_time
+
+logger = logging.getLogger(__name__)
+
+ACTIVATE = "activate"
+DEACTIVATE = "deactivate"
+RESET_VERIFICATION = "reset_verification"
+RESET_CREDIT = "reset_credit"
+
+# Per operation: the values to set and the lifecycle event of every changed
+# customer.
+OPERATIONS = {
+    ACTIVATE: ({"is_active": True}, lifecycle.ACTIVATED),
+    DEACTIVATE: ({"is_active": False}, lifecycle.DEACTIVATED),
+    RESET_VERIFICATION: (
+        {"email_verify": None, "mobile_verify": None},
+        lifecycle.VERIFICATION_RESET,
+    ),
+    RESET_CREDIT: ({"total_credit": 0}, lifecycle.CREDIT_CHANGED),
+}
+
+# Filters selecting customers and their lookups.
+FILTERS = {
+    "is_active": lambda value: {"is_active": value},
+    "email_verified": lambda value: {"email_verify__isnull": not value},
+    "mobile_verified": lambda value: {"mobile_verify__isnull": not value},
+    "created_after": lambda value: {"created_at__gte": value},
+    "created_before": lambda value: {"created_at__lt": value},
+}
+
+STATUSES = models.BulkOperation.STATUSES
+
+
+def get_options():
+    return settings.AUTHENTICATION_CUSTOMER["BULK_OPERATIONS"]
+
+
+def create(operation, ids=(), filters=None):
+    return models.BulkOperation.objects.create(
+        operation=operation, customer_ids=[str(id) for id in ids], filters=filters or {}
+    )
+
+
+def runs_inline(job):
+    """Return whether ``job`` is small enough to run in the request."""
+    return 0 < len(job.customer_ids) <= get_options()["SYNC_LIMIT"]
+
+
+def run(job):
+    """Apply ``job`` on every shard, recording its progress on the row.
+
+    A job delivered again after a crash starts over, which only looks at the
+    customers already changed once more.
+    """
+    if job.status in (STATUSES.DONE, STATUSES.FAILED):
+        return job
+
+    job.status = STATUSES.RUNNING
+    job.total = count(job)
+    job.processed = job.updated = 0
+    job.save(update_fields=["status", "total", "processed", "updated", "updated_at"])
+    try:
+        for alias, chunks in selections(job):
+            with sharding.use_shard(alias):
+                for ids in chunks:
+                    job.updated += apply(job.operation, ids)
+                    job.processed += len(ids)
+                    job.save(update_fields=["processed", "updated", "updated_at"])
+    except Exception as error:
+        logger.exception("Bulk operation %s failed", job.id)
+        job.status = STATUSES.FAILED
+        job.error = str(error)
+    else:
+        job.status = STATUSES.DONE
+    job.save(update_fields=["status", "error", "updated_at"])
+    return job
+
+
+def lookups(filters):
+    result = {}
+    for name, value in filters.items():
+        result.update(FILTERS[name](value))
+    return result
+
+
+def count(job):
+    if job.customer_ids:
+        return len(job.customer_ids)
+    total = 0
+    for alias in sharding.get_shards():
+        with sharding.use_shard(alias):
+            total += models.Customer.objects.filter(**lookups(job.filters)).count()
+    return total
+
+
+def selections(job):
+    """Return the shards of ``job`` with the chunks of customer ids on each."""
+    chunk_size = get_options()["CHUNK_SIZE"]
+    if not job.customer_ids:
+        return [
+            (alias, chunks(lookups(job.filters), chunk_size))
+            for alias in sharding.get_shards()
+        ]
+
+    by_shard = defaultdict(list)
+    for customer_id in sorted(job.customer_ids):
+        by_shard[sharding.shard_for(customer_id)].append(customer_id)
+    return [
+        (
+            alias,
+            (
+                ids[start : start + chunk_size]
+                for start in range(0, len(ids), chunk_size)
+            ),
+        )
+        for alias, ids in by_shard.items()
+    ]
+
+
+def chunks(filters, chunk_size):
+    """Yield the ids of the customers matching ``filters`` in key order.
+
+    Each chunk continues after the last id of the previous one, so customers
+    the operation takes out of the selection are not skipped over.
+    """
+    queryset = (
+        models.Customer.objects.filter(**filters)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    ids = list(queryset[:chunk_size])
+    while ids:
+        yield ids
+        ids = list(queryset.filter(pk__gt=ids[-1])[:chunk_size])
+
+
+def apply(operation, ids):
+    """Change the customers among ``ids`` not yet in the target state.
+
+    Works on the pinned shard and returns how many customers were changed.
+    """
+    values, event = OPERATIONS[operation]
+    using = sharding.get_pinned_shard()
+    with transaction.atomic(using=using):
+        changed = list(
+            models.Customer.objects.select_for_update()
+            .filter(pk__in=ids)
+            .exclude(**values)
+            .values_list("pk", "total_credit")
+        )
+        if not changed:
+            return 0
+
+        pks = [pk for pk, _ in changed]
+        models.Customer.objects.filter(pk__in=pks).update(
+            **values, updated_at=get_local_time()
+        )
+        if operation == RESET_CREDIT:
+            events = credit.record_resets(changed)
+        else:
+            events = [(pk, {}) for pk in pks]
+        models.Customer.invalidate_snapshots(pks, using=using)
+        lifecycle.publish_many(event, events)
+    return len(changed)
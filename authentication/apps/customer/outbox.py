@@ -0,0 +1,142 @@
+import logging
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from kombu.exceptions import KombuError
+from redis.exceptions import RedisError
+
+from authentication.apps.customer import lifecycle, models, sharding
+from authentication.utils import get_local_time
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, *args, **kwargs):
+    """Store ``task`` in the outbox inside the caller's transaction.
+
+    The relay publishes the message only after the row is committed, so a
+    rolled back request never reaches the broker. The row is written to the
+    pinned shard, next to the rows the task is about.
+    """
+    return models.Outbox.objects.create(task=task.name, args=list(args), kwargs=kwargs)
+
+
+def pending(using):
+    """Return the messages of a shard the relay still has to publish."""
+    return models.Outbox.objects.using(using).filter(failed_at=None)
+
+
+def record_failure(message):
+    """Count a failed attempt, giving up after ``OUTBOX_MAX_ATTEMPTS``.
+
+    Given up messages stay in the outbox for inspection and can be retried
+    by clearing their ``failed_at``.
+    """
+    message.attempts += 1
+    if message.attempts >= settings.AUTHENTICATION_CUSTOMER["OUTBOX_MAX_ATTEMPTS"]:
+        message.failed_at = get_local_time()
+        logger.error(
+            "Outbox message %s failed %s times, giving up", message.id, message.attempts
+        )
+    message.save(update_fields=["attempts", "failed_at", "updated_at"])
+
+
+def relay(batch_size=None):
+    """Publish one batch of pending outbox messages of every shard.
+
+    Returns how many messages were sent.
+    """
+    batch_size = (
+        batch_size or settings.AUTHENTICATION_CUSTOMER["OUTBOX_RELAY_BATCH_SIZE"]
+    )
+    if current_app.conf.task_always_eager:
+        return sum(run_locally(alias, batch_size) for alias in sharding.get_shards())
+    return sum(relay_shard(alias, batch_size) for alias in sharding.get_shards())
+
+
+def relay_shard(using, batch_size):
+    """Publish one batch of the pending outbox messages of a shard.
+
+    Rows are locked with ``SKIP LOCKED`` so several relays can run side by side,
+    and each message is sent with its outbox id as the task id so a redelivery
+    after a crash can be detected by the worker. Lifecycle events of the batch
+    go to their broker in one call.
+    """
+    with transaction.atomic(using=using):
+        messages = list(
+            pending(using)
+            .select_for_update(skip_locked=True)
+            .order_by("created_at")[:batch_size]
+        )
+        if not messages:
+            return 0
+
+        published = publish_events(messages)
+        with current_app.producer_or_acquire() as producer:
+            for message in messages:
+                if message.task == lifecycle.TASK:
+                    continue
+                try:
+                    current_app.send_task(
+                        message.task,
+                        args=message.args,
+                        kwargs=message.kwargs,
+                        task_id=str(message.id),
+                        producer=producer,
+                    )
+                except KombuError:
+                    logger.exception("Publishing outbox message %s failed", message.id)
+                    record_failure(message)
+                    break
+                published.append(message.id)
+
+        models.Outbox.objects.using(using).filter(id__in=published).delete()
+
+    return len(published)
+
+
+def publish_events(messages):
+    """Publish the lifecycle events among ``messages``, return their ids."""
+    events = [message for message in messages if message.task == lifecycle.TASK]
+    if not events:
+        return []
+    try:
+        lifecycle.get_broker().publish([lifecycle.message(event) for event in events])
+    except (RedisError, OSError):
+        logger.exception("Publishing %s lifecycle events failed", len(events))
+        for event in events:
+            record_failure(event)
+        return []
+    return [event.id for event in events]
+
+
+def run_locally(using, batch_size):
+    """Run pending messages in this process instead of publishing them.
+
+    Used by local stacks (tests, benchmarks) configured with always eager tasks.
+    Every message runs in its own transaction and stays in the outbox if its
+    task fails, so it is retried on the next pass.
+    """
+    messages = list(pending(using).order_by("created_at")[:batch_size])
+    with transaction.atomic(using=using):
+        published = publish_events(messages)
+        models.Outbox.objects.using(using).filter(id__in=published).delete()
+
+    done = len(published)
+    for message in messages:
+        if message.task == lifecycle.TASK:
+            continue
+        with transaction.atomic(using=using):
+            result = current_app.tasks[message.task].apply(
+                args=message.args, kwargs=message.kwargs, task_id=str(message.id)
+            )
+            if result.successful():
+                message.delete()
+                done += 1
+            else:
+                transaction.set_rollback(True)
+        if not result.successful():
+            logger.error("Outbox message %s failed: %s", message.id, result.result)
+            record_failure(message)
+    return done
@@ -0,0 +1,220 @@
+"""Move buckets of customers between shards.
+
+Other processes only see changes of the shard map once their copy expires
+(``SHARDING["MAP_TTL"]``), so a move waits that long after freezing the bucket
+and again after repointing it.
+"""
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, transaction
+from django.db.models import Count, Max
+
+from authentication.apps.customer import models, sharding
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+
+COPY_ATTEMPTS = 3
+
+# Seconds requests routed with an expired shard map may still be running.
+IN_FLIGHT_GRACE = 5
+
+# Rows hanging off a customer, copied along with it.
+CUSTOMER_MODELS = (
+    models.EmailChange,
+    models.PhoneChange,
+    models.EmailTemp,
+    models.OTPTemp,
+    models.CreditTransaction,
+)
+
+# Lookups selecting the rows of every table stored for a bucket.
+BUCKET_LOOKUPS = (
+    (models.Customer, "bucket"),
+    (models.Contact, "customer__bucket"),
+    (models.People, "customer__bucket"),
+    (models.Company, "customer__bucket"),
+    *((model, "customer__bucket") for model in CUSTOMER_MODELS),
+)
+
+
+class BucketChanged(Exception):
+    pass
+
+
+def current_map():
+    """Return the shard of every bucket."""
+    sharding.shard_map.clear()
+    return {
+        bucket: sharding.shard_map.get(bucket)
+        for bucket in range(settings.SHARDING["BUCKETS"])
+    }
+
+
+def plan():
+    """Return ``(bucket, source, target)`` moves spreading buckets evenly.
+
+    Buckets of shards no longer listed in ``SHARDING["SHARDS"]`` move too.
+    """
+    shards = sharding.get_shards()
+    owned = defaultdict(list)
+    for bucket, shard in current_map().items():
+        owned[shard].append(bucket)
+
+    share, extra = divmod(sum(map(len, owned.values())), len(shards))
+    quota = {shard: share + (index < extra) for index, shard in enumerate(shards)}
+    surplus = [
+        (bucket, shard)
+        for shard, buckets in owned.items()
+        for bucket in sorted(buckets)[quota.get(shard, 0) :]
+    ]
+    moves = []
+    for target in shards:
+        for _ in range(quota[target] - len(owned[target])):
+            bucket, source = surplus.pop()
+            moves.append((bucket, source, target))
+    return moves
+
+
+def chunks(bucket, using):
+    """Yield the customers of ``bucket`` on ``using``, CHUNK_SIZE at a time."""
+    customers = (
+        models.Customer.all_objects.using(using).filter(bucket=bucket).order_by("pk")
+    )
+    chunk = list(customers[:CHUNK_SIZE])
+    while chunk:
+        yield chunk
+        chunk = list(customers.filter(pk__gt=chunk[-1].pk)[:CHUNK_SIZE])
+
+
+def owners(customers):
+    """Return the ids of the owners of ``customers`` by owner model."""
+    ids = defaultdict(list)
+    for customer in customers:
+        if customer.content_type_id:
+            model = ContentType.objects.get_for_id(customer.content_type_id)
+            ids[model.model_class()].append(customer.object_id)
+    return ids
+
+
+def customer_rows(customers, using):
+    """Return the rows stored for ``customers`` by model, parents first.
+
+    Runs one query per model.
+    """
+    ids = [customer.pk for customer in customers]
+    rows = {
+        model: list(model._base_manager.using(using).filter(pk__in=owner_ids))
+        for model, owner_ids in owners(customers).items()
+    }
+    rows[models.Contact] = list(
+        models.Contact._base_manager.using(using).filter(
+            pk__in=[customer.username_id for customer in customers]
+        )
+    )
+    rows[models.Customer] = customers
+    for model in CUSTOMER_MODELS:
+        rows[model] = list(model._base_manager.using(using).filter(customer_id__in=ids))
+    return rows
+
+
+def copy_bucket(bucket, source, target):
+    """Insert the rows of ``bucket`` on ``target``, replacing earlier copies.
+
+    Returns how many customers were copied.
+    """
+    copied = 0
+    tables = set()
+    with transaction.atomic(using=target):
+        with connections[target].constraint_checks_disabled():
+            for customers in chunks(bucket, source):
+                remove(target, customers)
+                for model, rows in customer_rows(customers, source).items():
+                    model._base_manager.using(target).bulk_create(rows)
+                    tables.add(model._meta.db_table)
+                copied += len(customers)
+        connections[target].check_constraints(table_names=sorted(tables))
+    return copied
+
+
+def fingerprint(bucket, using):
+    """Return the row count and last update of every table of ``bucket``."""
+    return [
+        model._base_manager.using(using)
+        .filter(**{lookup: bucket})
+        .aggregate(count=Count("pk", distinct=True), updated_at=Max("updated_at"))
+        for model, lookup in BUCKET_LOOKUPS
+    ]
+
+
+def set_bucket(bucket, shard, moving=False):
+    models.ShardBucket.objects.using(
+        sharding.get_directory_database()
+    ).update_or_create(bucket=bucket, defaults={"shard": shard, "moving": moving})
+    sharding.shard_map.clear()
+
+
+def wait_for_maps():
+    """Wait until every process has reloaded its shard map."""
+    ttl = settings.SHARDING["MAP_TTL"].total_seconds()
+    time.sleep(ttl + IN_FLIGHT_GRACE)
+
+
+def move_bucket(bucket, target):
+    """Copy the customers of ``bucket`` to ``target`` and repoint the bucket.
+
+    The bucket is frozen first, other processes refuse its customers once
+    their shard map expires. The copy is repeated while writes that raced the
+    freeze still change the source, and the source rows are only removed once
+    no process can route to them anymore. A failed move keeps the bucket
+    frozen on the source and can simply be run again. Returns how many
+    customers moved.
+    """
+    source = current_map()[bucket]
+    if source == target:
+        return 0
+
+    set_bucket(bucket, source, moving=True)
+    wait_for_maps()
+    for _ in range(COPY_ATTEMPTS):
+        copied = fingerprint(bucket, source)
+        moved = copy_bucket(bucket, source, target)
+        if fingerprint(bucket, source) == copied:
+            break
+    else:
+        raise BucketChanged("Bucket %s kept changing while it was copied" % bucket)
+
+    set_bucket(bucket, target)
+    wait_for_maps()
+    if fingerprint(bucket, source) != copied:
+        raise BucketChanged(
+            "Bucket %s changed on %s after it moved, its rows are kept there"
+            % (bucket, source)
+        )
+    for customers in chunks(bucket, source):
+        with transaction.atomic(using=source):
+            remove(source, customers)
+
+    logger.info(
+        "Moved bucket %s from %s to %s (%s customers)", bucket, source, target, moved
+    )
+    return moved
+
+
+def remove(using, customers):
+    """Delete the rows stored for ``customers`` on ``using``."""
+    ids = [customer.pk for customer in customers]
+    # Customers go first, deleting their contact or owner would cascade to them.
+    models.Customer._base_manager.using(using).filter(pk__in=ids).delete()
+    for model in CUSTOMER_MODELS:
+        model._base_manager.using(using).filter(customer_id__in=ids).delete()
+    models.Contact._base_manager.using(using).filter(
+        pk__in=[customer.username_id for customer in customers]
+    ).delete()
+    for model, owner_ids in owners(customers).items():
+        model._base_manager.using(using).filter(pk__in=owner_ids).delete()
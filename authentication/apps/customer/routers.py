@@ -0,0 +1,31 @@
+from authentication.apps.customer import sharding
+
+# Global tables kept on SHARDING["DIRECTORY"] instead of the customer's shard.
+DIRECTORY_MODELS = {"directory", "shardbucket", "bulkoperation"}
+
+
+class ShardRouter:
+    """Send customer app queries to the pinned shard.
+
+    Related objects follow the database of the instance they were read from.
+    Without a pinned shard queries go to the default database.
+    """
+
+    app_label = "customer"
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != self.app_label:
+            return None
+        if model._meta.model_name in DIRECTORY_MODELS:
+            return sharding.get_directory_database()
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return sharding.get_pinned_shard()
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == self.app_label and model_name in DIRECTORY_MODELS:
+            return db == sharding.get_directory_database()
+        return None
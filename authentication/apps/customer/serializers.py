@@ -1,13 +1,34 @@
+import uuid
+
 from django.conf import settings
 from django.core import validators
 from django.core.validators import RegexValidator
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from rest_framework.validators import UniqueValidator
 
-from authentication.apps.customer import models
-from authentication.apps.customer.validators import validate_national_code
+from authentication.apps.customer import credit, lifecycle, models, operations, sharding
+from authentication.apps.customer.sharding import DirectoryUniqueValidator
+from authentication.apps.customer.validators import (
+    MOBILE_REGEX,
+    normalize_mobile,
+    normalize_national_code,
+    validate_national_code,
+)
+
+
+class MobileField(serializers.CharField):
+    """CharField validating and returning the canonical form of a mobile."""
+
+    def to_internal_value(self, data):
+        return normalize_mobile(super().to_internal_value(data))
+
+
+class NationalCodeField(serializers.CharField):
+    """CharField returning a national code in ASCII digits."""
+
+    def to_internal_value(self, data):
+        return normalize_national_code(super().to_internal_value(data))
 
 
 class SignupSerializer(serializers.ModelSerializer):
@@ -19,24 +40,24 @@ class SignupSerializer(serializers.ModelSerializer):
             "invalid": _("Enter a valid email address"),
         },
         validators=[
-            UniqueValidator(
-                queryset=models.Contact.objects.all(),
+            DirectoryUniqueValidator(
+                sharding.EMAIL,
                 message=_("This email already used"),
             ),
         ],
     )
 
-    mobile = serializers.CharField(
+    mobile = MobileField(
         max_length=15,
         required=False,
         validators=[
             validators.RegexValidator(
-                r"^(?:0|98|\+98|\+980|0098|098|00980)?(9\d{9})$",
+                MOBILE_REGEX,
                 _("Enter a valid mobile"),
                 "invalid",
             ),
-            UniqueValidator(
-                queryset=models.Contact.objects.all(),
+            DirectoryUniqueValidator(
+                sharding.MOBILE,
                 message=_("This mobile number already used"),
             ),
         ],
@@ -46,12 +67,12 @@ class SignupSerializer(serializers.ModelSerializer):
         },
     )
 
-    national_code = serializers.CharField(
+    national_code = NationalCodeField(
         max_length=10,
         validators=[
             validate_national_code,
-            UniqueValidator(
-                queryset=models.People.objects.all(),
+            DirectoryUniqueValidator(
+                sharding.NATIONAL_CODE,
                 message=_("This national code already used"),
             ),
         ],
@@ -94,11 +115,29 @@ class SignupSerializer(serializers.ModelSerializer):
             mobile=validated_data.pop("mobile", None),
             owner=people,
         )
-        models.Customer.objects.create_customer(
-            contact, password=validated_data.pop("password", ""), owner=people
+        customer = models.Customer.objects.create_customer(
+            contact,
+            password=validated_data.pop("password", ""),
+            owner=people,
+            id=validated_data.pop("id", None) or uuid.uuid4(),
+        )
+        sharding.register(
+            customer.id,
+            created=True,
+            email=contact.email,
+            mobile=contact.mobile,
+            national_code=people.national_code,
         )
-        models.EmailChange.objects.create(customer=contact.customer)
-        models.PhoneChange.objects.create(customer=contact.customer)
+        customer.record_email_change()
+        customer.record_mobile_change()
+        customer.save(
+            update_fields=[
+                "current_email_change",
+                "current_mobile_change",
+                "updated_at",
+            ]
+        )
+        lifecycle.publish(lifecycle.CREATED, customer.id)
 
         return contact
 
@@ -165,14 +204,10 @@ class CustomerDetailSerializer(serializers.ModelSerializer):
         return PeopleSerilizer(instance=obj.people.all()[0]).data
 
     def get_change_email(self, obj):
-        return EmailChangeSerializer(
-            instance=obj.email_change.latest("created_at")
-        ).data
+        return EmailChangeSerializer(instance=obj.current_email_change).data
 
     def get_change_mobile(self, obj):
-        return MobileChangeSerializer(
-            instance=obj.mobile_change.latest("created_at")
-        ).data
+        return MobileChangeSerializer(instance=obj.current_mobile_change).data
 
     class Meta:
         model = models.Customer
@@ -198,24 +233,24 @@ class CustomerUpdateSerializer(serializers.ModelSerializer):
             "invalid": _("Enter a valid email address"),
         },
         validators=[
-            UniqueValidator(
-                queryset=models.Contact.objects.all(),
+            DirectoryUniqueValidator(
+                sharding.EMAIL,
                 message=_("This email already used"),
             ),
         ],
     )
 
-    mobile = serializers.CharField(
+    mobile = MobileField(
         max_length=15,
         required=False,
         validators=[
             validators.RegexValidator(
-                r"^(?:0|98|\+98|\+980|0098|098|00980)?(9\d{9})$",
+                MOBILE_REGEX,
                 _("Enter a valid mobile"),
                 "invalid",
             ),
-            UniqueValidator(
-                queryset=models.Contact.objects.all(),
+            DirectoryUniqueValidator(
+                sharding.MOBILE,
                 message=_("This mobile number already used"),
             ),
         ],
@@ -225,13 +260,13 @@ class CustomerUpdateSerializer(serializers.ModelSerializer):
         },
     )
 
-    national_code = serializers.CharField(
+    national_code = NationalCodeField(
         max_length=10,
         required=False,
         validators=[
             validate_national_code,
-            UniqueValidator(
-                queryset=models.People.objects.all(),
+            DirectoryUniqueValidator(
+                sharding.NATIONAL_CODE,
                 message=_("This national code already used"),
             ),
         ],
@@ -256,31 +291,36 @@ class CustomerUpdateSerializer(serializers.ModelSerializer):
         )
 
     def update(self, instance, validated_data):
+        changed = sorted(validated_data)
+        contact_changed = "email" in validated_data or "mobile" in validated_data
         if "email" in validated_data:
             instance.email_verify = None
-            instance.save()
-            models.EmailChange.objects.create(
-                customer=instance,
+            instance.record_email_change(
                 new_email=validated_data.pop("email", instance.username.email),
                 old_email=instance.username.email,
             )
 
         if "mobile" in validated_data:
             instance.mobile_verify = None
-            instance.save()
-            models.PhoneChange.objects.create(
-                customer=instance,
+            instance.record_mobile_change(
                 new_mobile=validated_data.pop("mobile", instance.username.mobile),
                 old_mobile=instance.username.mobile,
             )
-        instance.owner.name = validated_data.get("name", instance.owner.name)
-        instance.owner.last_name = validated_data.get(
-            "last_name", instance.owner.last_name
-        )
-        instance.owner.national_code = validated_data.get(
-            "national_code", instance.owner.national_code
-        )
-        instance.owner.save()
+
+        if contact_changed:
+            instance.save()
+        # Not instance.owner: generic foreign keys read from the default database.
+        owner = instance.people.all()[0]
+        owner.name = validated_data.get("name", owner.name)
+        owner.last_name = validated_data.get("last_name", owner.last_name)
+        owner.national_code = validated_data.get("national_code", owner.national_code)
+        owner.save()
+        if "national_code" in validated_data:
+            sharding.register(
+                instance.id, national_code=validated_data["national_code"]
+            )
+        if changed:
+            lifecycle.publish(lifecycle.CONTACT_CHANGED, instance.id, fields=changed)
         return instance
 
 
@@ -297,21 +337,139 @@ class ChangeEmailSerializer(serializers.Serializer):
             "invalid": _("Enter a valid email address"),
         },
         validators=[
-            UniqueValidator(
-                queryset=models.Contact.objects.all(),
+            DirectoryUniqueValidator(
+                sharding.EMAIL,
                 message=_("This email already used"),
             ),
         ],
     )
 
 
+class AvailabilitySerializer(serializers.Serializer):
+    email = serializers.EmailField(max_length=75, required=False)
+    mobile = MobileField(
+        max_length=15,
+        required=False,
+        validators=[
+            validators.RegexValidator(
+                MOBILE_REGEX,
+                _("Enter a valid mobile"),
+                "invalid",
+            )
+        ],
+    )
+    national_code = NationalCodeField(
+        max_length=10, required=False, validators=[validate_national_code]
+    )
+
+    def validate(self, attrs):
+        if len(attrs) != 1:
+            raise ValidationError(_("Just use one of email, mobile or national code"))
+        return attrs
+
+
+class BulkValidationSerializer(serializers.Serializer):
+    emails = serializers.ListField(
+        child=serializers.CharField(allow_blank=True), required=False
+    )
+    mobiles = serializers.ListField(
+        child=serializers.CharField(allow_blank=True), required=False
+    )
+    national_codes = serializers.ListField(
+        child=serializers.CharField(allow_blank=True), required=False
+    )
+
+    def validate(self, attrs):
+        if not attrs:
+            raise ValidationError(
+                _("Either emails, mobiles or national codes must be supplied")
+            )
+        limit = settings.AUTHENTICATION_CUSTOMER["BULK_VALIDATION"]["MAX_VALUES"]
+        if sum(map(len, attrs.values())) > limit:
+            raise ValidationError(_("Send at most %s values at once") % limit)
+        return attrs
+
+
+class CreditAdjustmentSerializer(serializers.Serializer):
+    customer = serializers.UUIDField(source="customer_id")
+    amount = serializers.IntegerField(
+        min_value=-credit.MAX_CREDIT, max_value=credit.MAX_CREDIT
+    )
+    reason = serializers.CharField(max_length=100)
+    reference = serializers.CharField(max_length=100, required=False)
+    allow_negative = serializers.BooleanField(required=False, default=False)
+
+    def validate_amount(self, value):
+        if not value:
+            raise ValidationError(_("Amount can not be zero"))
+        return value
+
+
+class CreditAdjustSerializer(serializers.Serializer):
+    adjustments = CreditAdjustmentSerializer(many=True, allow_empty=False)
+
+    def validate_adjustments(self, value):
+        limit = settings.AUTHENTICATION_CUSTOMER["CREDIT_ADJUST_MAX_ADJUSTMENTS"]
+        if len(value) > limit:
+            raise ValidationError(_("Send at most %s adjustments at once") % limit)
+        return value
+
+
+class BulkOperationFiltersSerializer(serializers.Serializer):
+    is_active = serializers.BooleanField(required=False)
+    email_verified = serializers.BooleanField(required=False)
+    mobile_verified = serializers.BooleanField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise ValidationError(_("Filters can not be empty"))
+        return attrs
+
+
+class BulkOperationSerializer(serializers.Serializer):
+    operation = serializers.ChoiceField(choices=list(operations.OPERATIONS))
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, allow_empty=False
+    )
+    filters = BulkOperationFiltersSerializer(required=False)
+
+    def validate_ids(self, value):
+        limit = settings.AUTHENTICATION_CUSTOMER["BULK_OPERATIONS"]["MAX_IDS"]
+        if len(value) > limit:
+            raise ValidationError(_("Send at most %s ids at once") % limit)
+        return value
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filters" in attrs):
+            raise ValidationError(_("Either ids or filters must be supplied"))
+        return attrs
+
+
+class BulkOperationStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.BulkOperation
+        fields = (
+            "id",
+            "operation",
+            "status",
+            "total",
+            "processed",
+            "updated",
+            "error",
+            "created_at",
+            "updated_at",
+        )
+
+
 class SigninSerializer(serializers.Serializer):
     email = serializers.EmailField(required=False)
-    mobile = serializers.CharField(
+    mobile = MobileField(
         required=False,
         validators=[
             validators.RegexValidator(
-                r"^(?:0|98|\+98|\+980|0098|098|00980)?(9\d{9})$",
+                MOBILE_REGEX,
                 _("Enter a valid mobile"),
                 "invalid",
             )
@@ -337,6 +495,19 @@ class SignoutSerializer(serializers.Serializer):
     refresh = serializers.CharField()
 
 
+class SessionSerializer(serializers.Serializer):
+    sid = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    last_used_at = serializers.DateTimeField()
+    ip = serializers.CharField()
+    user_agent = serializers.CharField()
+    current = serializers.BooleanField()
+
+
+class RevokeSessionSerializer(serializers.Serializer):
+    sid = serializers.CharField(required=False)
+
+
 class OTPSerializer(serializers.Serializer):
     code = serializers.IntegerField(max_value=9999, min_value=1000)
 
@@ -358,7 +529,7 @@ class ChangePasswordSerializer(serializers.Serializer):
     )
 
     confirm_password = serializers.CharField(required=True)
-    refresh = serializers.CharField()
+    refresh = serializers.CharField(required=False)
 
     def validate(self, attrs):
         if attrs.get("new_password") == attrs.get("old_password"):
@@ -371,16 +542,16 @@ class ChangePasswordSerializer(serializers.Serializer):
 
 
 class MobileSerializer(serializers.Serializer):
-    mobile = serializers.CharField(
+    mobile = MobileField(
         max_length=15,
         validators=[
             RegexValidator(
-                r"^(?:0|98|\+98|\+980|0098|098|00980)?(9\d{9})$",
+                MOBILE_REGEX,
                 _("Enter a valid mobile"),
                 "invalid",
             ),
-            UniqueValidator(
-                queryset=models.Contact.objects.all(),
+            DirectoryUniqueValidator(
+                sharding.MOBILE,
                 message=_("This mobile number already used"),
             ),
         ],
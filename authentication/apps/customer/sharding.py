@@ -0,0 +1,318 @@
+"""Hash based sharding of customer data.
+
+Every row of a customer lives on one of ``SHARDING["SHARDS"]``: the customer
+id hashes to one of ``SHARDING["BUCKETS"]`` buckets and the shard map assigns
+buckets to shards. Buckets without a ``ShardBucket`` row stay on the first
+shard, so adding a shard moves nothing until ``rebalance_shards`` spreads the
+buckets. Requests and tasks for customers of a bucket being moved are refused
+with ``ShardUnavailable`` until the move ends.
+
+Queries on customer models go to the shard pinned for the current request or
+task (``ShardRouter``). Emails, mobiles and national codes are looked up in the
+``Directory`` table of ``SHARDING["DIRECTORY"]``, which also keeps them unique
+across shards. A Bloom filter of the directory answers availability checks of
+unused values without a query.
+"""
+import contextvars
+import heapq
+import logging
+import operator
+import time
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from redis.exceptions import RedisError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.validators import UniqueValidator
+
+from authentication.apps.customer import models
+from authentication.apps.customer.utils import bucket_for
+from authentication.apps.customer.validators import (
+    normalize_email,
+    normalize_national_code,
+)
+from authentication.bloom import BloomFilter
+
+EMAIL = "email"
+MOBILE = "mobile"
+NATIONAL_CODE = "national_code"
+
+logger = logging.getLogger(__name__)
+
+_pinned = contextvars.ContextVar("shard", default=None)
+
+
+def get_shards():
+    return settings.SHARDING["SHARDS"]
+
+
+def get_directory_database():
+    return settings.SHARDING["DIRECTORY"]
+
+
+def is_sharded():
+    return len(get_shards()) > 1
+
+
+class ShardMap:
+    """Bucket to shard assignments, reloaded from ``ShardBucket`` after a TTL."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.moving = set()
+        self.expires_at = 0
+
+    def get(self, bucket):
+        if time.monotonic() >= self.expires_at:
+            self.load()
+        return self.buckets.get(bucket) or get_shards()[0]
+
+    def is_moving(self, bucket):
+        if time.monotonic() >= self.expires_at:
+            self.load()
+        return bucket in self.moving
+
+    def load(self):
+        rows = models.ShardBucket.objects.using(get_directory_database()).values_list(
+            "bucket", "shard", "moving"
+        )
+        self.buckets = {bucket: shard for bucket, shard, _ in rows}
+        self.moving = {bucket for bucket, _, moving in rows if moving}
+        ttl = settings.SHARDING["MAP_TTL"].total_seconds()
+        self.expires_at = time.monotonic() + ttl
+
+    def clear(self):
+        self.expires_at = 0
+
+
+shard_map = ShardMap()
+
+
+@receiver(setting_changed)
+def reset_shard_map(setting, **kwargs):
+    if setting == "SHARDING":
+        shard_map.clear()
+
+
+class ShardUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Customer is being moved, try again shortly")
+    default_code = "shard_unavailable"
+
+
+def shard_for(customer_id):
+    """Return the shard of a customer, refusing customers of moving buckets."""
+    if not is_sharded():
+        return get_shards()[0]
+    bucket = bucket_for(customer_id)
+    if shard_map.is_moving(bucket):
+        raise ShardUnavailable()
+    return shard_map.get(bucket)
+
+
+def get_pinned_shard():
+    """Return the shard pinned for the current request or task, if any."""
+    return _pinned.get()
+
+
+def pin(customer_id):
+    """Route customer queries to the shard of ``customer_id`` until unpinned.
+
+    Requests are unpinned by ``ShardMiddleware``, elsewhere use ``use_shard``.
+    """
+    alias = shard_for(customer_id)
+    _pinned.set(alias)
+    return alias
+
+
+@contextmanager
+def use_shard(alias):
+    token = _pinned.set(alias)
+    try:
+        yield alias
+    finally:
+        _pinned.reset(token)
+
+
+@contextmanager
+def use_customer_shard(customer_id):
+    with use_shard(shard_for(customer_id)) as alias:
+        yield alias
+
+
+class ShardedResults:
+    """Read only sequence of the rows of a queryset on every shard.
+
+    Every shard is sorted by the same ``ordering`` and read only up to the end
+    of the requested slice, the merged rows are sliced in Python. Paginators
+    can page it like a queryset.
+    """
+
+    ordered = True
+
+    def __init__(self, querysets, ordering, count=None):
+        self.querysets = [queryset.order_by(*ordering) for queryset in querysets]
+        self.key = operator.attrgetter(*ordering)
+        self.total = count
+
+    def count(self):
+        if self.total is None:
+            self.total = sum(queryset.count() for queryset in self.querysets)
+        return self.total
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index : index + 1][0]
+        rows = heapq.merge(
+            *(queryset[: index.stop] for queryset in self.querysets), key=self.key
+        )
+        return list(islice(rows, index.start, index.stop))
+
+
+@contextmanager
+def atomic():
+    """Run a block atomically on the pinned shard and on the directory."""
+    shard = get_pinned_shard() or get_shards()[0]
+    with ExitStack() as stack:
+        for alias in dict.fromkeys([shard, get_directory_database()]):
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+def directory_value(kind, value):
+    if kind == EMAIL:
+        return normalize_email(value)
+    if kind == NATIONAL_CODE:
+        return normalize_national_code(value)
+    return value
+
+
+def locate(kind, value):
+    """Return the id of the customer owning a lookup value, or None."""
+    return (
+        models.Directory.objects.using(get_directory_database())
+        .filter(kind=kind, value=directory_value(kind, value))
+        .values_list("customer_id", flat=True)
+        .first()
+    )
+
+
+def taken(kind, values, chunk_size=1000):
+    """Return which of the normalized lookup ``values`` are in the directory.
+
+    Runs one ``IN`` query per ``chunk_size`` values.
+    """
+    values = list(values)
+    entries = models.Directory.objects.using(get_directory_database())
+    found = set()
+    for start in range(0, len(values), chunk_size):
+        found.update(
+            entries.filter(
+                kind=kind, value__in=values[start : start + chunk_size]
+            ).values_list("value", flat=True)
+        )
+    return found
+
+
+def register(customer_id, created=False, **values):
+    """Point the given lookup values at a customer, replacing its old ones.
+
+    Keys are ``EMAIL``, ``MOBILE`` and ``NATIONAL_CODE``; empty values only
+    remove the old entry. A just ``created`` customer has no old entries.
+    """
+    entries = models.Directory.objects.using(get_directory_database())
+    if not created:
+        entries.filter(customer_id=customer_id, kind__in=values).delete()
+    added = entries.bulk_create(
+        models.Directory(
+            kind=kind, value=directory_value(kind, value), customer_id=customer_id
+        )
+        for kind, value in values.items()
+        if value
+    )
+    items = [used_value(entry.kind, entry.value) for entry in added]
+    if items:
+        transaction.on_commit(
+            lambda: add_used_values(items), using=get_directory_database()
+        )
+
+
+def add_used_values(items):
+    # Runs once the customer is saved, a stale filter only costs queries until
+    # the next rebuild.
+    try:
+        used_values().add(items)
+    except RedisError:
+        logger.exception(
+            "Adding %s values to the availability filter failed", len(items)
+        )
+
+
+def used_values():
+    """Return the Bloom filter of the lookup values in the directory."""
+    options = settings.AUTHENTICATION_CUSTOMER["AVAILABILITY_FILTER"]
+    return BloomFilter("used-values", options["CAPACITY"], options["ERROR_RATE"])
+
+
+def used_value(kind, value):
+    return "%s:%s" % (kind, value)
+
+
+def is_available(kind, value):
+    """Return whether a lookup value is free, querying only on filter hits."""
+    value = directory_value(kind, value)
+    if not used_values().might_contain(used_value(kind, value)):
+        return True
+    return not (
+        models.Directory.objects.using(get_directory_database())
+        .filter(kind=kind, value=value)
+        .exists()
+    )
+
+
+def rebuild_used_values():
+    entries = (
+        models.Directory.objects.using(get_directory_database())
+        .values_list("kind", "value")
+        .iterator(chunk_size=10000)
+    )
+    return used_values().rebuild(used_value(*entry) for entry in entries)
+
+
+def unregister(customer_ids):
+    models.Directory.objects.using(get_directory_database()).filter(
+        customer_id__in=customer_ids
+    ).delete()
+
+
+class DirectoryUniqueValidator(UniqueValidator):
+    """``UniqueValidator`` checking a lookup value against the directory.
+
+    Values of soft deleted customers stay taken until they are archived.
+    """
+
+    def __init__(self, kind, message=None):
+        super().__init__(queryset=models.Directory.objects.all(), message=message)
+        self.kind = kind
+
+    def filter_queryset(self, value, queryset, field_name):
+        return queryset.using(get_directory_database()).filter(
+            kind=self.kind, value=directory_value(self.kind, value)
+        )
+
+    def exclude_current_instance(self, queryset, instance):
+        if isinstance(instance, models.Customer):
+            return queryset.exclude(customer_id=instance.pk)
+        return queryset
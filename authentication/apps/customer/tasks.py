@@ -1,35 +1,107 @@
 from celery import shared_task
 from django.conf import settings
 
-from authentication.apps.customer.models import Contact, EmailChange, EmailTemp, OTPTemp
-from authentication.utils import send_email
+from authentication.apps.customer import archive, credit, operations, sharding
+from authentication.apps.customer.models import (
+    BulkOperation,
+    Customer,
+    EmailTemp,
+    OTPTemp,
+)
+from authentication.profiling import profile_task
+from authentication.utils import send_email, send_sms
 
 
-@shared_task(name="customer.send_email_verification")
-def send_email_verification(contact_id):
+def legacy_customer_id(contact_id):
+    """Return the customer of a contact named by a message of an older release.
+
+    Those messages were queued before sharding, so the contact is on the first
+    shard. Drop along with the ``contact_id`` arguments once they are drained.
+    """
+    with sharding.use_shard(sharding.get_shards()[0]):
+        return Customer.all_objects.values_list("id", flat=True).get(
+            username_id=contact_id
+        )
 
-    contact = Contact.objects.get(id=contact_id)
-    temp = EmailTemp.objects.create(customer=contact.customer, email=contact.email)
-    email_change = EmailChange.objects.filter(customer=contact.customer).latest(
-        "created_at"
-    )
+
+@shared_task(
+    name="customer.send_email_verification",
+    autoretry_for=(sharding.ShardUnavailable,),
+    retry_backoff=True,
+)
+@profile_task
+def send_email_verification(contact_id=None, customer_id=None):
+    customer_id = customer_id or legacy_customer_id(contact_id)
+    with sharding.use_customer_shard(customer_id):
+        customer = Customer.objects.select_related(
+            "username", "current_email_change"
+        ).get(id=customer_id)
+        contact = customer.username
+        temp = EmailTemp.objects.create(customer=customer, email=contact.email)
+        email_change = customer.current_email_change
 
     url = settings.URL_TEMPLATES["EMAIL_VERIFICATION_URL_TEMPLATE"].format(
-        customer_id=temp.customer.id, temp_id=temp.id
+        customer_id=customer.id, temp_id=temp.id
     )
     context = {"verification_url": url}
-    if contact.customer.email_verify is None and email_change.new_email:
+    if customer.email_verify is None and email_change.new_email:
         send_email("customer", "email_verification", context, [email_change.new_email])
     else:
         send_email("customer", "email_verification", context, [contact.email])
 
 
-@shared_task(name="customer.send_mobile_verification_code")
-def send_mobile_verification_code(contact_id):
+@shared_task(
+    name="customer.send_mobile_verification_code",
+    autoretry_for=(sharding.ShardUnavailable,),
+    retry_backoff=True,
+)
+@profile_task
+def send_mobile_verification_code(contact_id=None, customer_id=None):
+    customer_id = customer_id or legacy_customer_id(contact_id)
     # code = random.randint(1000, 9999)  # noqa S311
     code = 1234
 
-    # Send To Phone Here
+    with sharding.use_customer_shard(customer_id):
+        customer = Customer.objects.select_related("username").get(id=customer_id)
+        OTPTemp.objects.create(customer=customer, code=code)
+
+    send_sms(customer.username.mobile, code)
+
+
+@shared_task(name="customer.archive_deleted", ignore_result=True)
+@profile_task
+def archive_deleted():
+    for alias in sharding.get_shards():
+        with sharding.use_shard(alias):
+            while archive.archive():
+                pass
+
+
+@shared_task(name="customer.compact_change_history", ignore_result=True)
+@profile_task
+def compact_change_history():
+    for alias in sharding.get_shards():
+        with sharding.use_shard(alias):
+            while archive.compact_change_history():
+                pass
+
+
+@shared_task(name="customer.rollup_credit_ledger", ignore_result=True)
+@profile_task
+def rollup_credit_ledger():
+    for alias in sharding.get_shards():
+        with sharding.use_shard(alias):
+            while credit.rollup():
+                pass
+
+
+@shared_task(name="customer.rebuild_availability_filter", ignore_result=True)
+@profile_task
+def rebuild_availability_filter():
+    sharding.rebuild_used_values()
+
 
-    contact = Contact.objects.get(id=contact_id)
-    OTPTemp.objects.create(customer=contact.customer, code=code)
+@shared_task(name="customer.run_bulk_operation", ignore_result=True)
+@profile_task
+def run_bulk_operation(operation_id):
+    operations.run(BulkOperation.objects.get(id=operation_id))
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import threading
+
+import orjson
+from django.test import SimpleTestCase, override_settings
+from prometheus_client import REGISTRY
+from rest_framework import status
+
+from authentication import audit
+from authentication.apps.customer.tests.utils import (
+    PASSWORD,
+    QueryBudgetTestCase,
+    create_customer,
+)
+
+
+class BlockedSink:
+    def __init__(self):
+        self.lines = []
+        self.released = threading.Event()
+
+    def write(self, lines):
+        self.released.wait()
+        self.lines.extend(lines)
+
+
+class AuditLogTests(SimpleTestCase):
+    def test_full_queue_drops_events(self):
+        dropped = REGISTRY.get_sample_value(
+            "authentication_audit_events_dropped_total", {"reason": "queue_full"}
+        )
+        sink = BlockedSink()
+        log = audit.AuditLog(
+            sink, queue_size=1, batch_size=10, flush_interval=0, flush_timeout=5
+        )
+        for serial in range(5):
+            log.emit(audit.SIGNOUT, serial=serial)
+
+        self.assertGreaterEqual(
+            REGISTRY.get_sample_value(
+                "authentication_audit_events_dropped_total", {"reason": "queue_full"}
+            ),
+            (dropped or 0) + 3,
+        )
+        sink.released.set()
+        log.flush()
+        self.assertLessEqual(len(sink.lines), 2)
+        self.assertEqual(orjson.loads(sink.lines[0])["event"], audit.SIGNOUT)
+
+    def test_flush_gives_up_on_a_hanging_sink(self):
+        sink = BlockedSink()
+        self.addCleanup(sink.released.set)
+        log = audit.AuditLog(
+            sink, queue_size=10, batch_size=10, flush_interval=0, flush_timeout=0.05
+        )
+        log.emit(audit.SIGNOUT)
+        log.emit(audit.SIGNOUT)
+
+        self.assertFalse(log.flush())
+        self.assertGreaterEqual(
+            REGISTRY.get_sample_value(
+                "authentication_audit_events_dropped_total",
+                {"reason": "flush_timeout"},
+            ),
+            1,
+        )
+
+    def test_file_sink_rotates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "audit.log")
+            sink = audit.FileSink(path, max_bytes=10, backup_count=2)
+            for line in (b"first line", b"second line", b"third line"):
+                sink.write([line])
+            self.assertEqual(
+                sorted(os.listdir(directory)), ["audit.log.1", "audit.log.2"]
+            )
+            with open(path + ".1", "rb") as file:
+                self.assertEqual(file.read(), b"third line\n")
+
+
+class SigninAuditTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "audit.log")
+        settings = override_settings(
+            AUDIT_LOG={
+                "SINK": "authentication.audit.FileSink",
+                "OPTIONS": {"path": self.path},
+                "QUEUE_SIZE": 100,
+                "BATCH_SIZE": 10,
+                "FLUSH_INTERVAL": 0.01,
+                "FLUSH_TIMEOUT": 5.0,
+            }
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.customer = create_customer(1, email="first@example.com")
+
+    def events(self):
+        audit.get_audit_log().flush()
+        with open(self.path, "rb") as file:
+            return [orjson.loads(line) for line in file]
+
+    def signin(self, password):
+        return self.client.post(
+            "/customer/signin/",
+            {"email": "first@example.com", "password": password},
+            format="json",
+            REMOTE_ADDR="10.0.0.1",
+        )
+
+    def test_signin_events(self):
+        self.assertEqual(
+            self.signin("wrong123").status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        self.assertEqual(self.signin(PASSWORD).status_code, status.HTTP_200_OK)
+
+        failed, succeeded = self.events()
+        self.assertEqual(failed["event"], audit.SIGNIN_FAILED)
+        self.assertEqual(failed["username"], "first@example.com")
+        self.assertEqual(failed["ip"], "10.0.0.1")
+        self.assertEqual(succeeded["event"], audit.SIGNIN_SUCCEEDED)
+        self.assertEqual(succeeded["customer_id"], str(self.customer.id))
@@ -0,0 +1,324 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+import jwt
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken as SimpleRefreshToken
+
+from authentication import tokens
+from authentication.apps.customer.tests.utils import (
+    PASSWORD,
+    QueryBudgetTestCase,
+    create_customer,
+)
+
+
+class SigninTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com")
+        self.mobile_customer = create_customer(2, mobile="09120000001")
+
+    def test_signin_with_email(self):
+        with self.assertBudget(queries=1, cache_calls=2):
+            response = self.client.post(
+                "/customer/signin/",
+                {"email": "first@example.com", "password": PASSWORD},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("refresh", response.data["token"])
+
+    def test_signin_with_mobile(self):
+        with self.assertBudget(queries=1, cache_calls=2):
+            response = self.client.post(
+                "/customer/signin/",
+                {"mobile": "09120000001", "password": PASSWORD},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_signin_with_email_in_other_case(self):
+        with self.assertBudget(queries=1, cache_calls=2):
+            response = self.client.post(
+                "/customer/signin/",
+                {"email": "First@Example.com", "password": PASSWORD},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_signin_with_other_mobile_spelling(self):
+        with self.assertBudget(queries=1, cache_calls=2):
+            response = self.client.post(
+                "/customer/signin/",
+                {"mobile": "+98912۰۰۰۰۰۰1", "password": PASSWORD},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_signin_with_wrong_password(self):
+        with self.assertBudget(queries=1, cache_calls=2):
+            response = self.client.post(
+                "/customer/signin/",
+                {"email": "first@example.com", "password": "wrong123"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_signin_lockout(self):
+        for _ in range(4):
+            self.client.post(
+                "/customer/signin/",
+                {"email": "first@example.com", "password": "wrong123"},
+                format="json",
+            )
+        with self.assertBudget(queries=0, cache_calls=1):
+            response = self.client.post(
+                "/customer/signin/",
+                {"email": "first@example.com", "password": PASSWORD},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SessionTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com")
+        self.token = self.authenticate(self.customer)
+
+    def test_signout(self):
+        with self.assertBudget(queries=1, cache_calls=2):
+            response = self.client.post(
+                "/customer/signout/", {"refresh": self.token["refresh"]}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_205_RESET_CONTENT)
+
+    def test_change_password(self):
+        other = self.authenticate(self.customer)
+        with self.assertBudget(queries=2, cache_calls=2):
+            response = self.client.post(
+                "/customer/%s/change_password/" % self.customer.id,
+                {
+                    "old_password": PASSWORD,
+                    "new_password": "another123",
+                    "confirm_password": "another123",
+                    "refresh": self.token["refresh"],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials()
+        response = self.client.post(
+            "/token/refresh/", {"refresh": other["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_refresh(self):
+        self.client.credentials()
+        with self.assertBudget(queries=0):
+            response = self.client.post(
+                "/token/refresh/", {"refresh": self.token["refresh"]}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", response.data)
+        self.assertNotEqual(response.data["refresh"], self.token["refresh"])
+
+    def test_refresh_token_reuse_revokes_session(self):
+        self.client.credentials()
+        rotated = self.client.post(
+            "/token/refresh/", {"refresh": self.token["refresh"]}, format="json"
+        ).data
+
+        response = self.client.post(
+            "/token/refresh/", {"refresh": self.token["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(
+            "/token/refresh/", {"refresh": rotated["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_and_revoke_sessions(self):
+        other = self.authenticate(self.customer)
+        response = self.client.get("/customer/sessions/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        current = [session for session in response.data if session["current"]]
+        self.assertEqual(len(current), 1)
+
+        self.client.post(
+            "/customer/revoke_sessions/", {"sid": current[0]["sid"]}, format="json"
+        )
+        response = self.client.post(
+            "/token/refresh/", {"refresh": other["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + self.token["access"])
+        self.assertEqual(len(self.client.get("/customer/sessions/").data), 1)
+
+    def test_revoke_sessions_of_others_only_finds_own(self):
+        other = create_customer(2, email="second@example.com")
+        sid = tokens.RefreshToken(self.token["refresh"])[tokens.SESSION_CLAIM]
+        self.authenticate(other)
+
+        response = self.client.post(
+            "/customer/revoke_sessions/", {"sid": sid}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(
+            "/token/refresh/", {"refresh": self.token["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_token_verify(self):
+        self.client.credentials()
+        with self.assertBudget(queries=0):
+            response = self.client.post(
+                "/token/verify/", {"token": self.token["access"]}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+@override_settings(SERVICE_CLIENT_KEYS=["gateway-key"])
+class IntrospectionTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com")
+        self.token = self.authenticate(self.customer)
+        self.client.credentials()
+
+    def introspect(self, tokens, key="gateway-key"):
+        return self.client.post(
+            "/token/introspect/",
+            {"tokens": tokens},
+            format="json",
+            HTTP_X_SERVICE_KEY=key,
+        )
+
+    def test_introspect_batch(self):
+        other = self.authenticate(self.customer)
+        self.client.post(
+            "/customer/signout/",
+            {"refresh": self.token["refresh"]},
+            format="json",
+            HTTP_AUTHORIZATION="Bearer " + self.token["access"],
+        )
+        legacy = SimpleRefreshToken.for_user(self.customer)
+        legacy.blacklist()
+
+        with self.assertBudget(queries=1):
+            response = self.introspect(
+                [
+                    other["access"],
+                    self.token["access"],
+                    self.token["refresh"],
+                    str(legacy),
+                    "not-a-token",
+                ]
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        access, revoked_access, revoked_refresh, blacklisted, invalid = response.data[
+            "tokens"
+        ]
+        self.assertTrue(access["active"])
+        self.assertEqual(access["token_type"], "access")
+        self.assertEqual(access["user_id"], str(self.customer.id))
+        self.assertFalse(revoked_access["active"])
+        self.assertFalse(revoked_refresh["active"])
+        self.assertTrue(blacklisted["blacklisted"])
+        self.assertFalse(invalid["active"])
+
+    def test_introspect_requires_service_key(self):
+        for key in ("wrong", "кліч"):
+            response = self.introspect([self.token["access"]], key=key)
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SigningKeyTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.keys = {
+            "ALGORITHM": "RS256",
+            "DIRECTORY": directory.name,
+            "ACTIVE_KID": "",
+            "JWKS_MAX_AGE": 3600,
+        }
+        with override_settings(JWT_KEYS=self.keys):
+            call_command("generate_signing_key", kid="first", stdout=StringIO())
+        self.settings = override_settings(JWT_KEYS=self.keys)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def key_path(self, kid):
+        return os.path.join(self.keys["DIRECTORY"], kid + tokens.PRIVATE_SUFFIX)
+
+    def test_tokens_verify_with_published_keys(self):
+        token = self.authenticate(self.customer)["access"]
+        self.assertEqual(jwt.get_unverified_header(token)["kid"], "first")
+
+        response = self.client.get("/.well-known/jwks.json")
+        self.assertIn("max-age=3600", response["Cache-Control"])
+        (key,) = response.json()["keys"]
+        payload = jwt.decode(
+            token,
+            jwt.PyJWK(key).key,
+            algorithms=["RS256"],
+            options={"verify_aud": False},
+        )
+        self.assertEqual(payload["user_id"], str(self.customer.id))
+
+    def test_new_key_signs_once_published_for_jwks_max_age(self):
+        call_command("generate_signing_key", kid="second", stdout=StringIO())
+        tokens.get_keyring.cache_clear()
+        tokens.get_token_backend.cache_clear()
+        published = time.time() - 3601
+        os.utime(self.key_path("first"), (published, published))
+
+        token = self.authenticate(self.customer)["access"]
+        self.assertEqual(jwt.get_unverified_header(token)["kid"], "first")
+        self.assertEqual(
+            [
+                key["kid"]
+                for key in self.client.get("/.well-known/jwks.json").json()["keys"]
+            ],
+            ["first", "second"],
+        )
+
+        os.utime(self.key_path("second"), (published, published))
+        tokens.get_keyring.cache_clear()
+        tokens.get_token_backend.cache_clear()
+        token = self.authenticate(self.customer)["access"]
+        self.assertEqual(jwt.get_unverified_header(token)["kid"], "second")
+
+    def test_rotation_keeps_old_tokens_valid(self):
+        old_token = self.authenticate(self.customer)["access"]
+
+        call_command("generate_signing_key", kid="second", stdout=StringIO())
+        call_command("generate_signing_key", retire="first", stdout=StringIO())
+        tokens.get_keyring.cache_clear()
+        tokens.get_token_backend.cache_clear()
+
+        new_token = self.authenticate(self.customer)["access"]
+        self.assertEqual(jwt.get_unverified_header(new_token)["kid"], "second")
+        for token in (old_token, new_token):
+            response = self.client.post(
+                "/token/verify/", {"token": token}, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                key["kid"]
+                for key in self.client.get("/.well-known/jwks.json").json()["keys"]
+            ],
+            ["first", "second"],
+        )
@@ -0,0 +1,107 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from rest_framework import status
+
+from authentication.apps.customer import models
+from authentication.apps.customer.authentication import SNAPSHOT_FIELDS
+from authentication.apps.customer.tests.utils import (
+    QueryBudgetTestCase,
+    create_customer,
+)
+from authentication.cache import LocalTier, entity_key
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches["default"]
+        self.cache.clear()
+
+    def test_reads_stay_in_process(self):
+        self.cache.set("key", {"value": 1})
+        self.cache.client.delete(self.cache.make_key("key"))
+        self.assertEqual(self.cache.get("key"), {"value": 1})
+
+        self.cache.local.discard()
+        self.assertIsNone(self.cache.get("key"))
+
+    def test_writes_of_other_processes_invalidate(self):
+        self.cache.set("key", 1)
+        key = self.cache.make_key("key")
+
+        self.cache.local.receive(self.cache.local.message(key))
+        self.assertIsNotNone(self.cache.local.get(key))
+
+        other = LocalTier(self.cache.local.channel, 10)
+        self.cache.local.receive(other.message(key))
+        self.assertIsNone(self.cache.local.get(key))
+        self.assertEqual(self.cache.get("key"), 1)
+
+        self.cache.local.receive(other.message())
+        self.assertIsNone(self.cache.local.get(key))
+
+    def test_incr(self):
+        self.cache.set("counter", 1)
+        self.assertEqual(self.cache.get("counter"), 1)
+        self.assertEqual(self.cache.incr("counter", 2), 3)
+        self.assertEqual(self.cache.get("counter"), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_get_many(self):
+        self.cache.set_many({"a": 1, "b": "two"})
+        self.cache.local.discard(self.cache.make_key("b"))
+        self.assertEqual(self.cache.get_many(["a", "b", "c"]), {"a": 1, "b": "two"})
+
+    def test_local_tier_is_bounded(self):
+        tier = LocalTier("channel", 2)
+        for key in "abc":
+            tier.set(key, b"data", 60)
+        tier.get("b")
+        tier.set("d", b"data", 60)
+        self.assertEqual(list(tier.entries), ["b", "d"])
+
+
+class CustomerSnapshotTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com")
+        self.authenticate(self.customer)
+        self.key = entity_key(models.Customer, self.customer.id)
+
+    def test_snapshot_has_no_password(self):
+        self.client.get("/customer/me/")
+        generation, values = caches["default"].get(self.key)
+        self.assertIn(self.customer.id, values)
+        self.assertNotIn(self.customer.password, values)
+
+        with self.assertBudget(queries=3, cache_calls=1):
+            response = self.client.get("/customer/me/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_saving_retires_the_snapshot(self):
+        self.client.get("/customer/me/")
+        stale = caches["default"].get(self.key)
+
+        self.customer.is_active = False
+        self.customer.save()
+        # A reader that loaded the row before the save caches it afterwards.
+        caches["default"].set(self.key, stale)
+        response = self.client.get("/customer/me/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_snapshot_is_rejected(self):
+        self.client.get("/customer/me/")
+        generation, values = caches["default"].get(self.key)
+        index = SNAPSHOT_FIELDS.index("is_active")
+        values = values[:index] + (False,) + values[index + 1 :]
+        caches["default"].set(self.key, (generation, values))
+
+        response = self.client.get("/customer/me/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_soft_deleting_retires_the_snapshot(self):
+        self.client.get("/customer/me/")
+
+        models.Customer.objects.filter(id=self.customer.id).delete()
+        response = self.client.get("/customer/me/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,134 @@
+import uuid
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.test import override_settings
+from rest_framework import status
+
+from authentication.apps.customer import credit, lifecycle, models
+from authentication.apps.customer.tests.utils import (
+    QueryBudgetTestCase,
+    create_customer,
+)
+
+
+def ledger_total(customer):
+    return customer.credit_transactions.aggregate(total=Sum("amount"))["total"]
+
+
+class CreditTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com")
+
+    def test_adjust(self):
+        with self.assertBudget(queries=6, cache_calls=1):
+            self.assertEqual(credit.adjust(self.customer.id, 500, "top-up"), 500)
+        self.assertEqual(credit.adjust(self.customer.id, -200, "charge"), 300)
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.total_credit, 300)
+        self.assertEqual(ledger_total(self.customer), 300)
+        self.assertEqual(models.Outbox.objects.filter(task=lifecycle.TASK).count(), 2)
+
+    def test_insufficient_credit(self):
+        with self.assertRaises(credit.InsufficientCredit):
+            credit.adjust(self.customer.id, -1, "charge")
+        self.assertEqual(
+            credit.adjust(self.customer.id, -1, "fee", allow_negative=True), -1
+        )
+        self.assertEqual(self.customer.credit_transactions.count(), 1)
+
+        with self.assertRaises(credit.CustomerNotFound):
+            credit.adjust(uuid.uuid4(), 1, "top-up")
+
+    def test_credit_out_of_range(self):
+        credit.adjust(self.customer.id, credit.MAX_CREDIT, "top-up")
+        with self.assertRaises(credit.CreditOutOfRange):
+            credit.adjust(self.customer.id, 1, "top-up")
+        with self.assertRaises(credit.CreditOutOfRange):
+            credit.adjust(self.customer.id, credit.MAX_CREDIT + 1, "top-up")
+
+        credit.adjust(self.customer.id, -credit.MAX_CREDIT, "charge")
+        credit.adjust(self.customer.id, -credit.MAX_CREDIT, "fee", allow_negative=True)
+        with self.assertRaises(credit.CreditOutOfRange):
+            credit.adjust(self.customer.id, -1, "fee", allow_negative=True)
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.total_credit, -credit.MAX_CREDIT)
+        self.assertEqual(self.customer.credit_transactions.count(), 3)
+
+    def test_reference_is_applied_once(self):
+        credit.adjust(self.customer.id, 500, "top-up", reference="invoice-1")
+        self.assertEqual(
+            credit.adjust(self.customer.id, 500, "top-up", reference="invoice-1"), 500
+        )
+        self.assertEqual(self.customer.credit_transactions.count(), 1)
+
+    def test_rollup(self):
+        other = create_customer(2, email="second@example.com")
+        for amount in (100, 200, -50):
+            credit.adjust(self.customer.id, amount, "top-up")
+        credit.adjust(other.id, 10, "top-up")
+        models.CreditTransaction.objects.exclude(amount=-50).update(
+            created_at=self.customer.created_at - timedelta(days=365)
+        )
+
+        self.assertEqual(credit.rollup(), 3)
+        self.assertEqual(credit.rollup(), 0)
+
+        self.assertEqual(
+            sorted(self.customer.credit_transactions.values_list("reason", "amount")),
+            [("rollup", 300), ("top-up", -50)],
+        )
+        self.assertEqual(ledger_total(other), 10)
+        self.assertEqual(
+            models.Archive.objects.filter(model="customer.credittransaction").count(),
+            3,
+        )
+
+
+@override_settings(SERVICE_CLIENT_KEYS=["billing-key"])
+class CreditAPITests(QueryBudgetTestCase):
+    def test_adjust_credit(self):
+        customer = create_customer(1, email="first@example.com")
+        missing = uuid.uuid4()
+        adjustments = [
+            {"customer": str(customer.id), "amount": 100, "reason": "top-up"},
+            {"customer": str(customer.id), "amount": -300, "reason": "charge"},
+            {"customer": str(missing), "amount": 100, "reason": "top-up"},
+        ]
+
+        response = self.client.post(
+            "/customer/credit/", {"adjustments": adjustments}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.post(
+            "/customer/credit/",
+            {"adjustments": adjustments},
+            format="json",
+            HTTP_X_SERVICE_KEY="billing-key",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"customer": customer.id, "balance": 100},
+                {"customer": customer.id, "error": "Insufficient credit"},
+                {"customer": missing, "error": "Customer not found"},
+            ],
+        )
+
+    def test_amount_out_of_range(self):
+        customer = create_customer(1, email="first@example.com")
+        adjustments = [
+            {"customer": str(customer.id), "amount": 2**63, "reason": "top-up"}
+        ]
+        response = self.client.post(
+            "/customer/credit/",
+            {"adjustments": adjustments},
+            format="json",
+            HTTP_X_SERVICE_KEY="billing-key",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,116 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import override_settings
+from rest_framework import status
+
+from authentication.apps.customer import lifecycle, models, outbox
+from authentication.apps.customer.tests.utils import (
+    PASSWORD,
+    QueryBudgetTestCase,
+    create_customer,
+    drain_outbox,
+    make_national_code,
+)
+
+
+class LifecycleEventTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overridden = override_settings(
+            LIFECYCLE_EVENTS={
+                "BROKER": "authentication.streams.FileBroker",
+                "OPTIONS": {"path": os.path.join(directory.name, "lifecycle")},
+            }
+        )
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        self.broker = lifecycle.get_broker()
+
+    def signup(self, serial):
+        response = self.client.post(
+            "/customer/signup/",
+            {
+                "email": "customer%s@example.com" % serial,
+                "national_code": make_national_code(serial),
+                "password": PASSWORD,
+                "agree_with_policy": True,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def test_published_after_commit(self):
+        customer_id = self.signup(1)
+        self.assertEqual(self.broker.read(), [])
+
+        drain_outbox()
+        [(_, event)] = self.broker.read()
+        self.assertEqual(event["event"], lifecycle.CREATED)
+        self.assertEqual(event["customer_id"], str(customer_id))
+        self.assertFalse(models.Outbox.objects.exists())
+
+    def test_contact_changed(self):
+        customer = create_customer(1, email="first@example.com")
+        self.authenticate(customer)
+        self.client.patch(
+            "/customer/%s/" % customer.id,
+            {"name": "Ali", "mobile": "09120000001"},
+            format="json",
+        )
+        drain_outbox()
+        [(_, event)] = self.broker.read()
+        self.assertEqual(event["event"], lifecycle.CONTACT_CHANGED)
+        self.assertEqual(event["fields"], ["mobile", "name"])
+
+    def test_replay_and_consumer_groups(self):
+        for serial in range(1, 4):
+            self.signup(serial)
+        drain_outbox()
+
+        first, second, third = self.broker.read()
+        self.assertEqual(self.broker.read(after=first[0]), [second, third])
+
+        self.broker.create_group("billing")
+        self.assertEqual(
+            self.broker.read_group("billing", "a", count=2), [first, second]
+        )
+        self.assertEqual(self.broker.read_group("billing", "b"), [third])
+        self.assertEqual(self.broker.ack("billing", [first[0], third[0]]), 2)
+        self.assertEqual(self.broker.read_group("billing", "a"), [])
+
+    def test_failed_publish_stays_in_outbox(self):
+        self.signup(1)
+        with mock.patch.object(self.broker, "publish", side_effect=OSError):
+            outbox.relay()
+        self.assertEqual(
+            list(
+                models.Outbox.objects.filter(task=lifecycle.TASK).values_list(
+                    "attempts", flat=True
+                )
+            ),
+            [1],
+        )
+
+        drain_outbox()
+        self.assertEqual(len(self.broker.read()), 1)
+
+    def test_given_up_after_max_attempts(self):
+        self.signup(1)
+        with mock.patch.dict(
+            settings.AUTHENTICATION_CUSTOMER, {"OUTBOX_MAX_ATTEMPTS": 2}
+        ), mock.patch.object(self.broker, "publish", side_effect=OSError):
+            outbox.relay()
+            outbox.relay()
+            outbox.relay()
+
+        event = models.Outbox.objects.get(task=lifecycle.TASK)
+        self.assertEqual(event.attempts, 2)
+        self.assertIsNotNone(event.failed_at)
+        drain_outbox()
+        self.assertEqual(self.broker.read(), [])
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase, override_settings
+from django.urls import resolve
+from rest_framework import status
+
+from authentication import metrics
+
+
+@override_settings(SERVICE_CLIENT_KEYS=["scraper-key"])
+class MetricsEndpointTests(SimpleTestCase):
+    def test_metrics_require_service_key(self):
+        for key in ("", "wrong-key"):
+            response = self.client.get("/metrics", HTTP_X_SERVICE_KEY=key)
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.get("/metrics", HTTP_X_SERVICE_KEY="scraper-key")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b"authentication_request_seconds", response.content)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddlewareTests(SimpleTestCase):
+    def sample(self, name, **labels):
+        return metrics.get_registry().get_sample_value(name, labels) or 0
+
+    def test_requests_are_counted_per_route(self):
+        route = resolve("/info").view_name
+        latency = dict(route=route, method="GET", status="200")
+        queries = dict(route=route, method="GET")
+        unmatched = dict(route="unmatched", method="GET", status="404")
+        before = [
+            self.sample("authentication_request_seconds_count", **latency),
+            self.sample("authentication_request_queries_count", **queries),
+            self.sample("authentication_request_seconds_count", **unmatched),
+        ]
+
+        self.client.get("/info")
+        self.client.get("/info")
+        self.client.get("/no-such-route")
+
+        self.assertEqual(
+            [
+                self.sample("authentication_request_seconds_count", **latency),
+                self.sample("authentication_request_queries_count", **queries),
+                self.sample("authentication_request_seconds_count", **unmatched),
+            ],
+            [before[0] + 2, before[1] + 2, before[2] + 1],
+        )
+        self.assertEqual(
+            self.sample("authentication_request_queries_sum", **queries), 0
+        )
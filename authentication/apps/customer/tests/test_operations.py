@@ -0,0 +1,154 @@
+import uuid
+from unittest import mock
+
+from django.conf import settings
+from django.test import override_settings
+from rest_framework import status
+
+from authentication.apps.customer import credit, lifecycle, models, operations
+from authentication.apps.customer.tests.utils import (
+    QueryBudgetTestCase,
+    create_customer,
+    drain_outbox,
+)
+
+STATUSES = models.BulkOperation.STATUSES
+
+
+def events(event):
+    return sorted(
+        row.kwargs["customer_id"]
+        for row in models.Outbox.objects.filter(task=lifecycle.TASK)
+        if row.kwargs["event"] == event
+    )
+
+
+class OperationTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customers = [
+            create_customer(serial, email="customer%s@example.com" % serial)
+            for serial in range(1, 6)
+        ]
+
+    def test_deactivate_by_ids(self):
+        first, second = self.customers[:2]
+        models.Customer.objects.filter(pk=second.pk).update(is_active=False)
+        job = operations.create(
+            operations.DEACTIVATE, ids=[first.id, second.id, uuid.uuid4()]
+        )
+
+        with self.assertBudget(queries=11, cache_calls=1):
+            operations.run(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, STATUSES.DONE)
+        self.assertEqual((job.total, job.processed, job.updated), (3, 3, 1))
+        self.assertEqual(events(lifecycle.DEACTIVATED), [str(first.id)])
+        self.assertEqual(
+            models.Customer.objects.filter(is_active=True).count(),
+            len(self.customers) - 2,
+        )
+
+    @mock.patch.dict(
+        settings.AUTHENTICATION_CUSTOMER["BULK_OPERATIONS"], {"CHUNK_SIZE": 2}
+    )
+    def test_reset_verification_by_filters_in_chunks(self):
+        unverified = self.customers[0]
+        models.Customer.objects.filter(pk=unverified.pk).update(email_verify=None)
+        job = operations.create(
+            operations.RESET_VERIFICATION, filters={"email_verified": True}
+        )
+
+        operations.run(job)
+
+        self.assertEqual((job.total, job.processed, job.updated), (4, 4, 4))
+        self.assertFalse(
+            models.Customer.objects.filter(email_verify__isnull=False).exists()
+        )
+        self.assertEqual(
+            events(lifecycle.VERIFICATION_RESET),
+            sorted(str(customer.id) for customer in self.customers[1:]),
+        )
+        # Done jobs are not run again when their task is delivered twice.
+        self.assertEqual(operations.run(job).updated, 4)
+
+    def test_reset_credit_keeps_the_ledger(self):
+        first, second = self.customers[:2]
+        credit.adjust(first.id, 500, "top-up")
+        credit.adjust(second.id, -30, "fee", allow_negative=True)
+
+        job = operations.create(
+            operations.RESET_CREDIT, ids=[customer.id for customer in self.customers]
+        )
+        operations.run(job)
+
+        self.assertEqual(job.updated, 2)
+        for customer in (first, second):
+            customer.refresh_from_db()
+            self.assertEqual(customer.total_credit, 0)
+            self.assertEqual(
+                sum(customer.credit_transactions.values_list("amount", flat=True)), 0
+            )
+        self.assertEqual(
+            models.CreditTransaction.objects.filter(reason=credit.RESET).count(), 2
+        )
+
+
+@override_settings(SERVICE_CLIENT_KEYS=["support-key"])
+class OperationAPITests(QueryBudgetTestCase):
+    def post(self, data):
+        return self.client.post(
+            "/customer/operations/",
+            data,
+            format="json",
+            HTTP_X_SERVICE_KEY="support-key",
+        )
+
+    def test_small_operation_runs_in_the_request(self):
+        customer = create_customer(1, email="first@example.com", verified=False)
+
+        response = self.client.post(
+            "/customer/operations/",
+            {"operation": "activate", "ids": [str(customer.id)]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.post({"operation": "activate", "ids": [str(customer.id)]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], STATUSES.DONE)
+        self.assertEqual(response.data["updated"], 1)
+        customer.refresh_from_db()
+        self.assertTrue(customer.is_active)
+
+    def test_large_operation_runs_in_a_task(self):
+        create_customer(1, email="first@example.com", verified=False)
+
+        response = self.post({"operation": "activate", "filters": {"is_active": False}})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], STATUSES.PENDING)
+        url = "/customer/operations/%s/" % response.data["id"]
+
+        drain_outbox()
+        response = self.client.get(url, HTTP_X_SERVICE_KEY="support-key")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], STATUSES.DONE)
+        self.assertEqual((response.data["total"], response.data["updated"]), (1, 1))
+        self.assertFalse(models.Customer.objects.filter(is_active=False).exists())
+
+        response = self.client.get(
+            "/customer/operations/%s/" % uuid.uuid4(), HTTP_X_SERVICE_KEY="support-key"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_selection(self):
+        for data in (
+            {"operation": "activate"},
+            {"operation": "activate", "ids": [str(uuid.uuid4())], "filters": {}},
+            {"operation": "activate", "filters": {}},
+            {"operation": "delete", "ids": [str(uuid.uuid4())]},
+        ):
+            self.assertEqual(
+                self.post(data).status_code, status.HTTP_400_BAD_REQUEST, data
+            )
@@ -0,0 +1,54 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from authentication import profiling
+
+
+class ProfilingTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.config = {
+            "SAMPLE_RATE": 0,
+            "TOKEN": "profile-token",
+            "HEADER": "X-Profile",
+            "MODE": "cprofile",
+            "INTERVAL": 0.005,
+            "DIRECTORY": self.directory.name,
+            "MAX_FILES": 3,
+        }
+
+    def profiles(self):
+        return sorted(os.listdir(self.directory.name))
+
+    def test_should_profile_only_with_token(self):
+        self.assertTrue(profiling.should_profile(self.config, "profile-token"))
+        for header_value in (None, "", "wrong-token", "profile-tokén"):
+            self.assertFalse(profiling.should_profile(self.config, header_value))
+
+        self.config["TOKEN"] = ""
+        self.assertFalse(profiling.should_profile(self.config, "profile-token"))
+        self.config["SAMPLE_RATE"] = 1
+        self.assertTrue(profiling.should_profile(self.config))
+
+    def test_prune_keeps_the_newest_files(self):
+        for index in range(5):
+            path = os.path.join(self.directory.name, "%s.prof" % index)
+            open(path, "w").close()
+            os.utime(path, (index, index))
+
+        profiling.prune(self.directory.name, 3)
+        self.assertEqual(self.profiles(), ["2.prof", "3.prof", "4.prof"])
+
+    def test_requests_with_token_are_profiled(self):
+        with override_settings(PROFILING=self.config):
+            self.client.get("/info")
+            self.assertEqual(self.profiles(), [])
+
+            for _ in range(4):
+                self.client.get("/info", HTTP_X_PROFILE="profile-token")
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 3)
+        self.assertTrue(all(name.endswith(".prof") for name in profiles))
@@ -0,0 +1,37 @@
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from authentication.parsers import ORJSONParser
+from authentication.renderers import ORJSONRenderer
+from authentication.utils import get_local_time
+
+
+class ORJSONTests(SimpleTestCase):
+    def test_matches_drf_renderer(self):
+        data = {
+            "id": uuid.uuid4(),
+            "time": get_local_time(),
+            "provider": _("Khallagh Borhan"),
+            "amount": Decimal("1.50"),
+            "text": "line\u2028separated\u2029",
+            "items": [{"count": 1, "active": True, "parent": None}],
+            1: "integer key",
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_falls_back_to_drf_renderer(self):
+        data = {"total": 2**70, "items": [1]}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_parse(self):
+        parsed = ORJSONParser().parse(BytesIO('{"name": "علی"}'.encode()))
+        self.assertEqual(parsed, {"name": "علی"})
+
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"name": '))
@@ -0,0 +1,37 @@
+from django.test import RequestFactory, TestCase
+from rest_framework.renderers import JSONRenderer
+
+from authentication.apps.customer import models, representations, serializers
+from authentication.apps.customer.tests.utils import create_customer
+from authentication.renderers import ORJSONRenderer
+
+
+class RepresentationTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/customer/")
+        create_customer(1, email="first@example.com")
+        create_customer(2, mobile="09120000001", verified=False)
+        changed = create_customer(3, email="third@example.com", total_credit=1500)
+        changed.record_email_change(
+            old_email="third@example.com", new_email="new@example.com"
+        )
+        changed.save()
+
+    def assertSameJSON(self, data, expected):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_customers(self):
+        queryset = models.Customer.objects.order_by("created_at")
+        self.assertSameJSON(
+            representations.customers(queryset, self.request),
+            serializers.CustomerSerializer(
+                queryset, many=True, context={"request": self.request}
+            ).data,
+        )
+
+    def test_customer_detail(self):
+        for customer in models.Customer.objects.all():
+            self.assertSameJSON(
+                representations.customer_detail(customer),
+                serializers.CustomerDetailSerializer(customer).data,
+            )
@@ -0,0 +1,211 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from authentication.apps.customer import credit, models, rebalance, sharding
+from authentication.apps.customer.tests.utils import PASSWORD, make_national_code
+from authentication.connections import get_redis
+from authentication.utils import get_local_time
+
+
+@override_settings(
+    SHARDING={
+        "SHARDS": ["default", "shard_1"],
+        "BUCKETS": 4,
+        "DIRECTORY": "default",
+        "MAP_TTL": timedelta(seconds=30),
+    }
+)
+class ShardingTests(APITestCase):
+    databases = {"default", "shard_1"}
+
+    def setUp(self):
+        get_redis().flushdb()
+        patcher = mock.patch.object(rebalance, "wait_for_maps")
+        self.wait_for_maps = patcher.start()
+        self.addCleanup(patcher.stop)
+        call_command("rebalance_shards", stdout=StringIO())
+        self.customers = [self.signup(serial) for serial in range(8)]
+
+    def signup(self, serial):
+        email = "customer%s@example.com" % serial
+        response = self.client.post(
+            "/customer/signup/",
+            {
+                "email": email,
+                "national_code": make_national_code(serial + 1),
+                "password": PASSWORD,
+                "agree_with_policy": True,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        customer_id = response.data["id"]
+        shard = sharding.shard_for(customer_id)
+        models.Customer.objects.using(shard).filter(id=customer_id).update(
+            is_active=True
+        )
+        return customer_id, email, shard
+
+    def signin(self, email):
+        return self.client.post(
+            "/customer/signin/",
+            {"email": email, "password": PASSWORD},
+            format="json",
+        )
+
+    def test_customers_are_stored_on_their_shard(self):
+        shards = {shard for _, _, shard in self.customers}
+        self.assertEqual(shards, {"default", "shard_1"})
+        for customer_id, _, shard in self.customers:
+            other = "shard_1" if shard == "default" else "default"
+            self.assertTrue(models.Customer.objects.using(shard).filter(id=customer_id))
+            self.assertFalse(
+                models.Customer.objects.using(other).filter(id=customer_id)
+            )
+
+    def test_signin_and_me_read_the_customer_shard(self):
+        for customer_id, email, _ in self.customers:
+            response = self.signin(email)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.client.credentials(
+                HTTP_AUTHORIZATION="Bearer " + response.json()["token"]["access"]
+            )
+            response = self.client.get("/customer/me/")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["id"], customer_id)
+
+    def test_list_gathers_every_shard(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION="Bearer "
+            + self.signin(self.customers[0][1]).json()["token"]["access"]
+        )
+        response = self.client.get("/customer/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), len(self.customers))
+
+    def test_list_pages_are_ordered_across_shards(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION="Bearer "
+            + self.signin(self.customers[0][1]).json()["token"]["access"]
+        )
+        pages = [
+            self.client.get("/customer/", {"page": page, "page_size": 3})
+            for page in (1, 2, 3)
+        ]
+        self.assertEqual(pages[0]["X-Result-Count"], str(len(self.customers)))
+        urls = [customer["url"] for page in pages for customer in page.data]
+        self.assertEqual(
+            [url.rstrip("/").rsplit("/", 1)[-1] for url in urls],
+            [customer_id for customer_id, _, _ in self.customers],
+        )
+
+    def test_email_is_unique_across_shards(self):
+        for _, email, _ in self.customers:
+            response = self.client.post(
+                "/customer/signup/",
+                {
+                    "email": email.upper(),
+                    "national_code": make_national_code(100),
+                    "password": PASSWORD,
+                    "agree_with_policy": True,
+                },
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def bucket_on(self, shard):
+        customer_id, email, _ = next(
+            customer for customer in self.customers if customer[2] == shard
+        )
+        return sharding.bucket_for(customer_id), customer_id, email
+
+    def test_move_bucket(self):
+        bucket, customer_id, email = self.bucket_on("shard_1")
+        moving = models.Customer.objects.using("shard_1").filter(bucket=bucket)
+        self.assertIn(
+            customer_id, {str(pk) for pk in moving.values_list("pk", flat=True)}
+        )
+        credit.adjust(customer_id, 100, "top-up", reference="invoice-1")
+
+        count = moving.count()
+
+        # A few queries per model and chunk, however many customers move.
+        self.wait_for_maps.reset_mock()
+        with self.assertNumQueries(35, using="default"):
+            with self.assertNumQueries(69, using="shard_1"):
+                self.assertEqual(rebalance.move_bucket(bucket, "default"), count)
+        self.assertEqual(self.wait_for_maps.call_count, 2)
+
+        self.assertEqual(sharding.shard_for(customer_id), "default")
+        self.assertFalse(
+            models.Customer.all_objects.using("shard_1").filter(id=customer_id)
+        )
+        customer = models.Customer.objects.using("default").get(id=customer_id)
+        self.assertEqual(customer.username.email, email)
+        self.assertEqual(customer.current_email_change.customer_id, customer.id)
+        self.assertEqual(customer.credit_transactions.get().reference, "invoice-1")
+        self.assertEqual(self.signin(email).status_code, status.HTTP_200_OK)
+
+    def test_moving_bucket_refuses_its_customers(self):
+        bucket, _, email = self.bucket_on("shard_1")
+        statuses = []
+
+        self.wait_for_maps.side_effect = lambda: statuses.append(
+            self.signin(email).status_code
+        )
+        rebalance.move_bucket(bucket, "default")
+        self.assertEqual(
+            statuses,
+            [status.HTTP_503_SERVICE_UNAVAILABLE, status.HTTP_200_OK],
+        )
+
+    def test_move_copies_again_while_the_source_changes(self):
+        bucket, customer_id, _ = self.bucket_on("shard_1")
+        copy_bucket = rebalance.copy_bucket
+
+        def racing_copy(*args):
+            moved = copy_bucket(*args)
+            if racing_copy.races:
+                # A request routed with a shard map older than the freeze.
+                racing_copy.races -= 1
+                models.Customer.objects.using(args[1]).filter(id=customer_id).update(
+                    total_credit=F("total_credit") + 100, updated_at=get_local_time()
+                )
+            return moved
+
+        racing_copy.races = 1
+        with mock.patch.object(rebalance, "copy_bucket", racing_copy):
+            rebalance.move_bucket(bucket, "default")
+        customer = models.Customer.objects.using("default").get(id=customer_id)
+        self.assertEqual(customer.total_credit, 100)
+
+        bucket, customer_id, _ = self.bucket_on("default")
+        racing_copy.races = rebalance.COPY_ATTEMPTS
+        with mock.patch.object(rebalance, "copy_bucket", racing_copy):
+            with self.assertRaises(rebalance.BucketChanged):
+                rebalance.move_bucket(bucket, "shard_1")
+        self.assertEqual(rebalance.current_map()[bucket], "default")
+        self.assertTrue(sharding.shard_map.is_moving(bucket))
+
+    def test_move_keeps_source_rows_changed_after_the_copy(self):
+        bucket, customer_id, _ = self.bucket_on("shard_1")
+        customers = models.Customer.objects.using("shard_1").filter(id=customer_id)
+        waits = []
+
+        def wait_for_maps():
+            waits.append(None)
+            if len(waits) == 2:
+                customers.update(updated_at=get_local_time())
+
+        self.wait_for_maps.side_effect = wait_for_maps
+
+        with self.assertRaises(rebalance.BucketChanged):
+            rebalance.move_bucket(bucket, "default")
+        self.assertTrue(customers.exists())
@@ -0,0 +1,62 @@
+import time
+
+from django.db import connection
+from django.test import TestCase
+
+from authentication import celery, metrics
+from authentication.apps.customer import tasks
+
+
+class TaskMetricsTests(TestCase):
+    def sample(self, name, **labels):
+        return metrics.get_registry().get_sample_value(name, labels) or 0
+
+    def test_enqueue_time_is_stamped_on_customer_tasks(self):
+        headers = {}
+        celery.stamp_enqueue_time(sender="customer.archive_deleted", headers=headers)
+        self.assertAlmostEqual(headers["enqueued_at"], time.time(), delta=5)
+
+        headers = {}
+        celery.stamp_enqueue_time(
+            sender="authentication.sample_queue_depth", headers=headers
+        )
+        self.assertEqual(headers, {})
+
+    def test_queue_lag_run_time_and_queries(self):
+        task = tasks.archive_deleted
+        lag = dict(task=task.name, queue="celery")
+        runtime = dict(task=task.name, state="SUCCESS")
+        before = [
+            self.sample("authentication_task_queue_lag_seconds_count", **lag),
+            self.sample("authentication_task_queue_lag_seconds_sum", **lag),
+            self.sample("authentication_task_seconds_count", **runtime),
+            self.sample("authentication_task_queries_sum", task=task.name),
+        ]
+
+        task.push_request(
+            enqueued_at=time.time() - 30, delivery_info={"routing_key": "celery"}
+        )
+        try:
+            celery.start_task_timer(task_id="metrics-test", task=task)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            celery.stop_task_timer(task_id="metrics-test", task=task, state="SUCCESS")
+        finally:
+            task.pop_request()
+
+        self.assertEqual(
+            self.sample("authentication_task_queue_lag_seconds_count", **lag),
+            before[0] + 1,
+        )
+        self.assertGreaterEqual(
+            self.sample("authentication_task_queue_lag_seconds_sum", **lag),
+            before[1] + 30,
+        )
+        self.assertEqual(
+            self.sample("authentication_task_seconds_count", **runtime), before[2] + 1
+        )
+        self.assertEqual(
+            self.sample("authentication_task_queries_sum", task=task.name),
+            before[3] + 1,
+        )
+        self.assertNotIn("metrics-test", celery._running)
@@ -0,0 +1,524 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.test import override_settings
+from redis.exceptions import RedisError
+from rest_framework import status
+
+from authentication.apps.customer import (
+    archive,
+    bulk,
+    lifecycle,
+    models,
+    sharding,
+    tasks,
+    views,
+)
+from authentication.apps.customer.tests.utils import (
+    PASSWORD,
+    QueryBudgetTestCase,
+    create_customer,
+    drain_outbox,
+    make_national_code,
+)
+from authentication.bloom import BloomFilter
+from authentication.connections import get_redis
+
+
+class CustomerReadTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com")
+        for serial in range(2, 12):
+            create_customer(serial, email="customer%s@example.com" % serial)
+        self.authenticate(self.customer)
+
+    def test_list(self):
+        with self.assertBudget(queries=3, cache_calls=2):
+            response = self.client.get("/customer/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 11)
+
+    def test_me(self):
+        with self.assertBudget(queries=4, cache_calls=2):
+            response = self.client.get("/customer/me/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["contact"]["email"], "first@example.com")
+
+    def test_me_not_modified(self):
+        etag = self.client.get("/customer/me/")["ETag"]
+        with self.assertBudget(queries=1, cache_calls=1):
+            response = self.client.get("/customer/me/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        self.client.patch(
+            "/customer/%s/" % self.customer.id, {"name": "Ali"}, format="json"
+        )
+        response = self.client.get("/customer/me/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_retrieve_not_modified(self):
+        response = self.client.get("/customer/%s/" % self.customer.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["contact"]["email"], "first@example.com")
+
+        with self.assertBudget(queries=1, cache_calls=1):
+            response = self.client.get(
+                "/customer/%s/" % self.customer.id,
+                HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_other_customers_are_not_retrieved_or_updated(self):
+        other = models.Customer.objects.exclude(id=self.customer.id).first()
+        # Only the authentication of the caller.
+        with self.assertBudget(queries=1, cache_calls=2):
+            response = self.client.get("/customer/%s/" % other.id)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.patch(
+            "/customer/%s/" % other.id, {"name": "Ali"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_list_not_modified(self):
+        etag = self.client.get("/customer/")["ETag"]
+        with self.assertBudget(queries=1, cache_calls=1):
+            response = self.client.get("/customer/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        create_customer(20, email="customer20@example.com")
+        response = self.client.get("/customer/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_partial_update(self):
+        with self.assertBudget(queries=12, cache_calls=3):
+            response = self.client.patch(
+                "/customer/%s/" % self.customer.id,
+                {"name": "Ali", "email": "changed@example.com"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["people"]["name"], "Ali")
+        self.assertEqual(
+            response.data["email_change"]["new_email"], "changed@example.com"
+        )
+        self.assertEqual(models.Outbox.objects.exclude(task=lifecycle.TASK).count(), 1)
+
+
+class SignupTests(QueryBudgetTestCase):
+    def test_signup_with_email(self):
+        with self.assertBudget(queries=14, cache_calls=1):
+            response = self.client.post(
+                "/customer/signup/",
+                {
+                    "email": "new@example.com",
+                    "national_code": make_national_code(100),
+                    "password": PASSWORD,
+                    "agree_with_policy": True,
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(models.Outbox.objects.exclude(task=lifecycle.TASK).count(), 1)
+
+        drain_outbox()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_signup_with_mobile(self):
+        with self.assertBudget(queries=14, cache_calls=1):
+            response = self.client.post(
+                "/customer/signup/",
+                {
+                    "mobile": "09120000000",
+                    "national_code": make_national_code(101),
+                    "password": PASSWORD,
+                    "agree_with_policy": True,
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        drain_outbox()
+        self.assertEqual(models.OTPTemp.objects.count(), 1)
+
+    def test_signup_survives_availability_filter_errors(self):
+        add = mock.patch.object(BloomFilter, "add", side_effect=RedisError)
+        with add, self.assertLogs(sharding.logger, "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/customer/signup/",
+                    {
+                        "email": "new@example.com",
+                        "national_code": make_national_code(100),
+                        "password": PASSWORD,
+                        "agree_with_policy": True,
+                    },
+                    format="json",
+                )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(models.Customer.objects.count(), 1)
+
+    def test_signup_rejects_email_in_other_case(self):
+        create_customer(100, email="taken@example.com")
+        response = self.client.post(
+            "/customer/signup/",
+            {
+                "email": "Taken@Example.com",
+                "national_code": make_national_code(101),
+                "password": PASSWORD,
+                "agree_with_policy": True,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("email", response.data)
+
+    def test_signup_stores_canonical_mobile(self):
+        create_customer(100, mobile="09120000000")
+        response = self.client.post(
+            "/customer/signup/",
+            {
+                "mobile": "+989120000000",
+                "national_code": make_national_code(101),
+                "password": PASSWORD,
+                "agree_with_policy": True,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("mobile", response.data)
+
+        self.client.post(
+            "/customer/signup/",
+            {
+                "mobile": "00989120000001",
+                "national_code": make_national_code(102),
+                "password": PASSWORD,
+                "agree_with_policy": True,
+            },
+            format="json",
+        )
+        self.assertIn(
+            "09120000001", models.Contact.objects.values_list("mobile", flat=True)
+        )
+
+
+class EmailVerificationTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com", verified=False)
+
+    def send_verification(self):
+        tasks.send_email_verification.apply(
+            kwargs={"customer_id": self.customer.id.hex}
+        )
+        return self.customer.email_temp.get()
+
+    def test_messages_naming_the_contact_are_still_sent(self):
+        # Queued by the release before sharding, which passed the contact id.
+        result = tasks.send_email_verification.apply(
+            args=[str(self.customer.username_id)]
+        )
+        self.assertTrue(result.successful())
+        self.assertEqual(self.customer.email_temp.count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_verify_email(self):
+        temp = self.send_verification()
+        with self.assertBudget(queries=9, cache_calls=1):
+            response = self.client.post(
+                "/customer/%s/verify_email/" % self.customer.id,
+                {"id": str(temp.id)},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", response.data["token"])
+
+    def test_resend_email(self):
+        with self.assertBudget(queries=2):
+            response = self.client.get("/customer/%s/resend_email/" % self.customer.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.send_verification()
+        models.EmailTemp.objects.update(created_at="2000-01-01T00:00:00Z")
+        with self.assertBudget(queries=5):
+            response = self.client.get("/customer/%s/resend_email/" % self.customer.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_change_email(self):
+        with self.assertBudget(queries=10):
+            response = self.client.post(
+                "/customer/%s/change_email/" % self.customer.id,
+                {"email": "other@example.com"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(models.Outbox.objects.exclude(task=lifecycle.TASK).count(), 1)
+
+
+class MobileVerificationTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, mobile="09120000001", verified=False)
+
+    def send_code(self):
+        models.OTPTemp.objects.create(customer=self.customer, code=1234)
+
+    def test_verify_mobile(self):
+        self.send_code()
+        with self.assertBudget(queries=9, cache_calls=1):
+            response = self.client.post(
+                "/customer/%s/verify_mobile/" % self.customer.id,
+                {"code": 1234},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", response.data["token"])
+
+    def test_resend_mobile_code(self):
+        self.send_code()
+        models.OTPTemp.objects.update(created_at="2000-01-01T00:00:00Z")
+        with self.assertBudget(queries=4):
+            response = self.client.get(
+                "/customer/%s/resend_mobile_code/" % self.customer.id
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(models.Outbox.objects.count(), 1)
+
+    def test_change_mobile(self):
+        with self.assertBudget(queries=9):
+            response = self.client.post(
+                "/customer/%s/change_mobile/" % self.customer.id,
+                {"mobile": "09120000002"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(models.Outbox.objects.exclude(task=lifecycle.TASK).count(), 1)
+
+
+class ArchiveTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com")
+        self.other = create_customer(2, email="second@example.com")
+
+    def test_soft_delete_hides_customer(self):
+        self.customer.delete()
+
+        self.assertFalse(models.Customer.objects.filter(id=self.customer.id).exists())
+        self.assertFalse(
+            models.Contact.objects.filter(id=self.customer.username_id).exists()
+        )
+        self.assertTrue(
+            models.Customer.all_objects.filter(id=self.customer.id).exists()
+        )
+        response = self.client.post(
+            "/customer/signin/",
+            {"email": "first@example.com", "password": PASSWORD},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_archive_moves_deleted_rows(self):
+        self.customer.delete()
+        models.Customer.all_objects.filter(id=self.customer.id).update(
+            deleted_at=self.customer.deleted_at - timedelta(days=60)
+        )
+        models.Contact.all_objects.filter(id=self.customer.username_id).update(
+            deleted_at=self.customer.deleted_at - timedelta(days=60)
+        )
+
+        self.assertEqual(archive.archive(), 2)
+
+        self.assertFalse(
+            models.Customer.all_objects.filter(id=self.customer.id).exists()
+        )
+        self.assertFalse(
+            models.EmailChange.objects.filter(customer_id=self.customer.id).exists()
+        )
+        self.assertEqual(
+            set(models.Archive.objects.values_list("model", flat=True)),
+            {
+                "customer.customer",
+                "customer.contact",
+                "customer.emailchange",
+                "customer.phonechange",
+            },
+        )
+        self.assertTrue(models.Customer.objects.filter(id=self.other.id).exists())
+        self.assertEqual(archive.archive(), 0)
+
+    def test_compact_change_history_keeps_current_change(self):
+        old = self.customer.current_email_change
+        self.customer.record_email_change(new_email="changed@example.com")
+        self.customer.save()
+        models.EmailChange.objects.update(
+            created_at=old.created_at - timedelta(days=120)
+        )
+
+        self.assertEqual(archive.compact_change_history(), 1)
+
+        self.assertEqual(
+            set(models.EmailChange.objects.values_list("id", flat=True)),
+            {
+                self.customer.current_email_change_id,
+                self.other.current_email_change_id,
+            },
+        )
+        self.assertEqual(
+            models.Archive.objects.get(model="customer.emailchange").object_id,
+            str(old.id),
+        )
+
+
+class AvailabilityTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(1, email="first@example.com")
+
+    def check(self, **params):
+        response = self.client.get("/customer/availability/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["available"]
+
+    def test_before_first_rebuild(self):
+        with self.assertBudget(queries=1, cache_calls=2):
+            self.assertFalse(self.check(email="First@Example.com"))
+        self.assertTrue(self.check(email="new@example.com"))
+
+    def test_values_added_before_a_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_customer(2, email="second@example.com")
+        self.assertFalse(self.check(email="first@example.com"))
+
+        tasks.rebuild_availability_filter()
+        # The filter was evicted or Redis restarted.
+        get_redis().delete(sharding.used_values().key)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_customer(3, email="third@example.com")
+        self.assertFalse(self.check(email="first@example.com"))
+
+    def test_filter_skips_queries_for_unused_values(self):
+        tasks.rebuild_availability_filter()
+
+        with self.assertBudget(queries=0, cache_calls=2):
+            self.assertTrue(self.check(mobile="09120000009"))
+        self.assertFalse(self.check(national_code=make_national_code(1)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_customer(2, mobile="09120000009")
+        self.assertFalse(self.check(mobile="+98912۰۰۰۰۰۰9"))
+
+    def test_invalid_values(self):
+        response = self.client.get(
+            "/customer/availability/", {"national_code": "1234567890"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(
+            "/customer/availability/",
+            {"email": "first@example.com", "mobile": "09120000009"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rate_limited(self):
+        rates = views.AvailabilityRateThrottle.THROTTLE_RATES
+        with mock.patch.dict(rates, {"availability": "2/min"}):
+            self.check(email="new@example.com")
+            self.check(email="new@example.com")
+            response = self.client.get(
+                "/customer/availability/", {"email": "new@example.com"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+@override_settings(SERVICE_CLIENT_KEYS=["partner-key"])
+class BulkValidationTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = create_customer(
+            1, email="first@example.com", mobile="09120000001"
+        )
+
+    def validate(self, data, key="partner-key"):
+        return self.client.post(
+            "/customer/validate/", data, format="json", HTTP_X_SERVICE_KEY=key
+        )
+
+    def test_national_codes(self):
+        codes = [make_national_code(serial) for serial in range(1, 2501)]
+        with self.assertNumQueries(3):
+            results = bulk.validate("national_code", codes + ["1234567890"])
+
+        self.assertEqual(len(results), 2501)
+        self.assertEqual(results[0]["available"], False)
+        self.assertEqual(str(results[0]["error"]), "This national code already used")
+        self.assertTrue(all(result["available"] for result in results[1:2500]))
+        self.assertEqual(results[2500]["valid"], False)
+
+    def test_national_codes_in_persian_digits(self):
+        taken = make_national_code(1)
+        persian = taken.translate(str.maketrans("0123456789", "۰۱۲۳۴۵۶۷۸۹"))
+        arabic = taken.translate(str.maketrans("0123456789", "٠١٢٣٤٥٦٧٨٩"))
+        results = bulk.validate("national_code", [persian, arabic])
+        self.assertEqual(
+            [(result["valid"], result["available"]) for result in results],
+            [(True, False), (True, False)],
+        )
+
+        response = self.client.post(
+            "/customer/signup/",
+            {
+                "email": "new@example.com",
+                "national_code": persian,
+                "password": PASSWORD,
+                "agree_with_policy": True,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("national_code", response.data)
+
+    def test_endpoint(self):
+        with self.assertBudget(queries=3, cache_calls=2):
+            response = self.validate(
+                {
+                    "emails": ["First@Example.com", "new@example.com", "new@"],
+                    "mobiles": ["+98912۰۰۰۰۰۰2", "0912000000", "09120000002"],
+                }
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["available"] for result in response.data["emails"]],
+            [False, True, None],
+        )
+        self.assertEqual(
+            [
+                (result["valid"], result["available"])
+                for result in response.data["mobiles"]
+            ],
+            [(True, True), (False, None), (True, False)],
+        )
+
+    def test_limits(self):
+        response = self.validate({})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Signed in customers are no service clients.
+        self.authenticate(self.customer)
+        response = self.client.post(
+            "/customer/validate/", {"emails": ["a@example.com"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_rate_limited(self):
+        rates = views.BulkValidationRateThrottle.THROTTLE_RATES
+        with mock.patch.dict(rates, {"bulk_validation": "1/min"}):
+            self.assertEqual(
+                self.validate({"emails": ["a@example.com"]}).status_code,
+                status.HTTP_200_OK,
+            )
+            response = self.validate({"emails": ["a@example.com"]})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
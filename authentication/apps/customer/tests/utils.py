@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from authentication.apps.customer import models, outbox, sharding
+from authentication.connections import get_redis
+from authentication.utils import get_local_time
+
+CACHE_METHODS = (
+    "add",
+    "get",
+    "set",
+    "touch",
+    "delete",
+    "get_many",
+    "set_many",
+    "delete_many",
+    "incr",
+    "decr",
+    "has_key",
+)
+
+PASSWORD = "secret123"
+
+
+def make_national_code(serial):
+    digits = "%09d" % serial
+    s = sum(int(digits[x]) * (10 - x) for x in range(9)) % 11
+    return digits + str(s if s < 2 else 11 - s)
+
+
+def create_customer(
+    serial, email=None, mobile=None, password=PASSWORD, verified=True, **kwargs
+):
+    people = models.People.objects.create(national_code=make_national_code(serial))
+    contact = models.Contact.objects.create(email=email, mobile=mobile, owner=people)
+    customer = models.Customer.objects.create_customer(
+        contact,
+        password=password,
+        owner=people,
+        is_active=verified,
+        email_verify=get_local_time() if verified and email else None,
+        mobile_verify=get_local_time() if verified and mobile else None,
+        **kwargs
+    )
+    customer.record_email_change()
+    customer.record_mobile_change()
+    customer.save()
+    sharding.register(
+        customer.id,
+        created=True,
+        email=email,
+        mobile=mobile,
+        national_code=people.national_code,
+    )
+    return customer
+
+
+def drain_outbox():
+    """Run every pending outbox message in process through the eager relay."""
+    while outbox.relay():
+        pass
+
+
+class QueryBudgetTestCase(APITestCase):
+    """API test case asserting upper bounds on SQL queries and cache calls."""
+
+    databases = {"default"}
+
+    def setUp(self):
+        caches["default"].clear()
+        get_redis().flushdb()
+
+    @contextmanager
+    def assertBudget(self, queries, cache_calls=0):
+        calls = []
+        cache = caches["default"]
+        patches = [
+            mock.patch.object(
+                cache,
+                name,
+                side_effect=self._recorder(calls, name, getattr(cache, name)),
+            )
+            for name in CACHE_METHODS
+        ]
+        captured = [CaptureQueriesContext(connections[db]) for db in self.databases]
+        for patch in patches:
+            patch.start()
+        try:
+            for context in captured:
+                context.__enter__()
+            try:
+                yield
+            finally:
+                for context in captured:
+                    context.__exit__(None, None, None)
+        finally:
+            for patch in patches:
+                patch.stop()
+
+        executed = [query["sql"] for context in captured for query in context]
+        self.assertLessEqual(
+            len(executed),
+            queries,
+            "%s queries executed, budget is %s:\n%s"
+            % (len(executed), queries, "\n".join(executed)),
+        )
+        self.assertLessEqual(
+            len(calls),
+            cache_calls,
+            "%s cache calls made, budget is %s: %s"
+            % (len(calls), cache_calls, ", ".join(calls)),
+        )
+
+    @staticmethod
+    def _recorder(calls, name, method):
+        def record(*args, **kwargs):
+            calls.append(name)
+            return method(*args, **kwargs)
+
+        return record
+
+    def authenticate(self, customer):
+        credentials = {"password": PASSWORD}
+        if customer.username.email:
+            credentials["email"] = customer.username.email
+        else:
+            credentials["mobile"] = customer.username.mobile
+        token = self.client.post(
+            "/customer/signin/", credentials, format="json"
+        ).json()["token"]
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + token["access"])
+        return token
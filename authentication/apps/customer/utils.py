@@ -1,3 +1,6 @@
+import hashlib
+import uuid
+
 import requests
 from django.conf import settings
 
@@ -16,3 +19,9 @@ def validate_recaptcha(response):
         return False
     except requests.exceptions.RequestException:
         return False
+
+
+def bucket_for(customer_id):
+    """Return the shard bucket of a customer id, in any spelling of the UUID."""
+    digest = hashlib.blake2b(uuid.UUID(str(customer_id)).bytes, digest_size=8)
+    return int.from_bytes(digest.digest(), "big") % settings.SHARDING["BUCKETS"]
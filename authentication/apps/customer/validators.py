@@ -1,14 +1,56 @@
+import operator
 import re
 
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
+MOBILE_REGEX = r"^(?:0|98|\+98|\+980|0098|098|00980)?(9\d{9})$"
+
+_mobile = re.compile(MOBILE_REGEX)
+_national_code = re.compile(r"^[0-9]{10}$")
+
+# Persian and Arabic-Indic digits, read as ASCII ones.
+_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "0123456789" * 2)
+
+# Checksum weights of the first nine digits, and what their ASCII codes add.
+_WEIGHTS = range(10, 1, -1)
+_ASCII_OFFSET = ord("0") * sum(_WEIGHTS)
+
+
+def is_national_code(value):
+    """Return whether ``value`` is ten digits with a valid check digit."""
+    value = normalize_national_code(value)
+    if not _national_code.match(value):
+        return False
+    digits = value.encode()
+    s = (sum(map(operator.mul, _WEIGHTS, digits)) - _ASCII_OFFSET) % 11
+    check = digits[9] - ord("0")
+    return check == s if s < 2 else check + s == 11
+
 
 def validate_national_code(value):
-    if not re.search(r"^\d{10}$", value):
-        raise ValidationError(_("Enter a valid national code"))
-    check = int(value[9])
-    s = sum(int(value[x]) * (10 - x) for x in range(9)) % 11
-    result = check == s if s < 2 else check + s == 11
-    if not result:
+    if not is_national_code(value):
         raise ValidationError(_("Enter a valid national code"))
+
+
+def normalize_national_code(value):
+    """Return a national code with Persian and Arabic digits read as ASCII."""
+    return value.translate(_DIGITS) if value else value
+
+
+def normalize_mobile(value):
+    """Return the canonical ``09xxxxxxxxx`` spelling of an Iranian mobile.
+
+    Persian and Arabic digits are read as ASCII ones. Values that are not a
+    valid mobile are returned unchanged for the validators to reject.
+    """
+    if not value:
+        return value
+    digits = "".join(str(int(c)) if c.isdecimal() else c for c in value.strip())
+    match = _mobile.match(digits)
+    return "0" + match.group(1) if match else value
+
+
+def normalize_email(value):
+    """Return the ``email_key`` of an email, the same for every spelling of it."""
+    return value.strip().lower() if value else None
@@ -0,0 +1,58 @@
+"""Cheap version keys of customer representations, for conditional GETs.
+
+A version is the last ``updated_at`` of every row a representation is built
+from, fetched in a single query instead of serializing the customer.
+"""
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from authentication.apps.customer import models
+
+
+def latest_update(queryset):
+    return Subquery(
+        queryset.filter(customer=OuterRef("pk"))
+        .order_by("-updated_at")
+        .values("updated_at")[:1]
+    )
+
+
+def customer_version(customer_id):
+    """Return when the detail representation of a customer last changed.
+
+    Covers the customer, its contact, people and current change rows. Returns None if
+    the customer does not exist.
+    """
+    try:
+        customers = models.Customer.objects.filter(id=customer_id)
+    except (TypeError, ValueError, ValidationError):
+        return None
+    return (
+        customers.annotate(
+            version=Greatest(
+                "updated_at",
+                "username__updated_at",
+                Coalesce(latest_update(models.People.objects.all()), "updated_at"),
+                Coalesce("current_email_change__updated_at", "updated_at"),
+                Coalesce("current_mobile_change__updated_at", "updated_at"),
+            )
+        )
+        .values_list("version", flat=True)
+        .first()
+    )
+
+
+def list_version(*querysets):
+    """Return ``(last_modified, count)`` of the rows of a customer list.
+
+    A list spread over several shards passes one queryset per shard.
+    """
+    versions = [
+        queryset.order_by().aggregate(
+            last_modified=Max("updated_at"), count=Count("pk")
+        )
+        for queryset in querysets
+    ]
+    modified = [v["last_modified"] for v in versions if v["last_modified"]]
+    return max(modified, default=None), sum(v["count"] for v in versions)
@@ -1,27 +1,102 @@
+import hashlib
 import logging
+import uuid
 
 from django.conf import settings as django_settings
 from django.contrib import auth
 from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.utils.translation import gettext_lazy as _
 from rest_framework import mixins
 from rest_framework import permissions as rf_permissions
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle
 from rest_framework.viewsets import GenericViewSet
 from rest_framework_simplejwt.exceptions import TokenBackendError, TokenError
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from authentication.apps.customer import models, serializers, tasks, utils
+from authentication import audit, sessions
+from authentication.apps.customer import (
+    bulk,
+    credit,
+    lifecycle,
+    models,
+    operations,
+    outbox,
+    representations,
+    serializers,
+    sharding,
+    tasks,
+    utils,
+    versions,
+)
+from authentication.permissions import IsSelf, IsServiceClient
+from authentication.tokens import RefreshToken
 from authentication.utils import get_local_time
 
 logger = logging.getLogger(__name__)
 
 
+class ConditionalGetMixin:
+    """Answer polls with 304 Not Modified while the client's copy is current.
+
+    Views pass a version key to ``not_modified`` before serializing anything;
+    the matching ``ETag`` and ``Last-Modified`` are added to the response.
+    """
+
+    def not_modified(self, request, key, last_modified):
+        if last_modified is None:
+            return None
+        key = "%s:%s:%s" % (request.accepted_renderer.format, key, last_modified)
+        etag = '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+        timestamp = int(last_modified.timestamp())
+        self.validators = (etag, timestamp)
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            self.set_validators(response)
+        return response
+
+    def set_validators(self, response):
+        etag, timestamp = self.validators
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "validators", None) and response.status_code == 200:
+            self.set_validators(response)
+        return response
+
+
+class AvailabilityRateThrottle(AnonRateThrottle):
+    scope = "availability"
+
+
+class ServiceClientRateThrottle(SimpleRateThrottle):
+    """Throttle service clients by their service key."""
+
+    def get_cache_key(self, request, view):
+        key = request.META.get("HTTP_X_SERVICE_KEY", "").encode()
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": hashlib.sha256(key).hexdigest()[:32],
+        }
+
+
+class BulkValidationRateThrottle(ServiceClientRateThrottle):
+    scope = "bulk_validation"
+
+
 class CustomerViewSet(
+    ConditionalGetMixin,
     mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
     mixins.ListModelMixin,
@@ -29,29 +104,95 @@ class CustomerViewSet(
 ):
     queryset = models.Customer.objects.all()
     serializer_class = serializers.CustomerSerializer
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, IsSelf)
     lookup_field = "id"
     http_method_names = ["get", "post", "patch", "head", "options"]
+    action_serializer_classes = {
+        "signup": serializers.SignupSerializer,
+        "signin": serializers.SigninSerializer,
+        "availability": serializers.AvailabilitySerializer,
+        "bulk_validate": serializers.BulkValidationSerializer,
+        "adjust_credit": serializers.CreditAdjustSerializer,
+        "bulk_operation": serializers.BulkOperationSerializer,
+        "bulk_operation_status": serializers.BulkOperationStatusSerializer,
+        "signout": serializers.SignoutSerializer,
+        "change_password": serializers.ChangePasswordSerializer,
+        "change_email": serializers.ChangeEmailSerializer,
+        "verify_email": serializers.UUIDSerializer,
+        "verify_mobile": serializers.OTPSerializer,
+        "change_mobile": serializers.MobileSerializer,
+        "partial_update": serializers.CustomerUpdateSerializer,
+        "me": serializers.CustomerDetailSerializer,
+        "retrieve": serializers.CustomerDetailSerializer,
+        "active_sessions": serializers.SessionSerializer,
+        "revoke_sessions": serializers.RevokeSessionSerializer,
+    }
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.lookup_field in kwargs:
+            try:
+                sharding.pin(kwargs[self.lookup_field])
+            except ValueError:
+                pass
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            return queryset
+        return queryset.select_related(
+            "username", "current_email_change", "current_mobile_change"
+        )
+
+    def list(self, request, *args, **kwargs):
+        querysets = [
+            self.filter_queryset(self.get_queryset()).using(alias)
+            for alias in sharding.get_shards()
+        ]
+        last_modified, count = versions.list_version(*querysets)
+        key = "list:%s:%s" % (request.build_absolute_uri(), count)
+        not_modified = self.not_modified(request, key, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        # Pages stay stable across shards with one total order.
+        ordering = ("created_at", "id")
+        if len(querysets) == 1:
+            queryset = querysets[0].order_by(*ordering)
+        else:
+            queryset = sharding.ShardedResults(querysets, ordering, count)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(representations.customers(page, request))
+        return Response(representations.customers(queryset, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        customer_id = kwargs[self.lookup_field]
+        not_modified = self.not_modified(
+            request, customer_id, versions.customer_version(customer_id)
+        )
+        if not_modified is not None:
+            return not_modified
+        return Response(representations.customer_detail(self.get_object()))
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop("partial", True)
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        email_change = models.EmailChange.objects.filter(customer=instance).latest(
-            "created_at"
-        )
-        mobile_change = models.PhoneChange.objects.filter(customer=instance).latest(
-            "created_at"
-        )
-        if email_change.new_email:
-            tasks.send_email_verification.delay(instance.username.id.hex)
-        if mobile_change.new_mobile:
-            tasks.send_mobile_verification_code.delay(instance.username.id)
+        with sharding.atomic():
+            self.perform_update(serializer)
+            if instance.current_email_change.new_email:
+                outbox.enqueue(
+                    tasks.send_email_verification, customer_id=instance.id.hex
+                )
+            if instance.current_mobile_change.new_mobile:
+                outbox.enqueue(
+                    tasks.send_mobile_verification_code, customer_id=instance.id.hex
+                )
 
         return Response(
-            serializers.CustomerDetailSerializer(instance=instance).data,
+            representations.customer_detail(instance),
             status.HTTP_201_CREATED,
         )
 
@@ -60,9 +201,14 @@ class CustomerViewSet(
         methods=["get"],
     )
     def me(self, request, *args, **kwargs):
-        customer = models.Customer.objects.get(id=request.user.id)
-        serializer = self.get_serializer(customer)
-        return Response(serializer.data)
+        not_modified = self.not_modified(
+            request, request.user.id, versions.customer_version(request.user.id)
+        )
+        if not_modified is not None:
+            return not_modified
+
+        customer = self.get_queryset().get(id=request.user.id)
+        return Response(representations.customer_detail(customer))
 
     @action(
         detail=False,
@@ -73,16 +219,108 @@ class CustomerViewSet(
     def signup(self, request):
         serializer = self.get_serializer_class()(data=request.data)
         serializer.is_valid(raise_exception=True)
-        contact = serializer.save()
-        if contact.email:
-            tasks.send_email_verification.delay(contact.id.hex)
-        if contact.mobile:
-            tasks.send_mobile_verification_code.delay(contact.id)
+        customer_id = uuid.uuid4()
+        sharding.pin(customer_id)
+        with sharding.atomic():
+            contact = serializer.save(id=customer_id)
+            if contact.email:
+                outbox.enqueue(
+                    tasks.send_email_verification, customer_id=customer_id.hex
+                )
+            if contact.mobile:
+                outbox.enqueue(
+                    tasks.send_mobile_verification_code, customer_id=customer_id.hex
+                )
         return Response(
-            serializers.CustomerDetailSerializer(instance=contact.customer).data,
+            representations.customer_detail(contact.customer),
             status.HTTP_201_CREATED,
         )
 
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[rf_permissions.AllowAny],
+        authentication_classes=(),
+        throttle_classes=[AvailabilityRateThrottle],
+    )
+    def availability(self, request):
+        serializer = self.get_serializer_class()(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        [(kind, value)] = serializer.validated_data.items()
+        return Response({"available": sharding.is_available(kind, value)})
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="validate",
+        permission_classes=[IsServiceClient],
+        authentication_classes=(),
+        throttle_classes=[BulkValidationRateThrottle],
+    )
+    def bulk_validate(self, request):
+        serializer = self.get_serializer_class()(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        kinds = {
+            "emails": sharding.EMAIL,
+            "mobiles": sharding.MOBILE,
+            "national_codes": sharding.NATIONAL_CODE,
+        }
+        return Response(
+            {
+                field: bulk.validate(kinds[field], values)
+                for field, values in serializer.validated_data.items()
+            }
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="credit",
+        permission_classes=[IsServiceClient],
+        authentication_classes=(),
+    )
+    def adjust_credit(self, request):
+        serializer = self.get_serializer_class()(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = credit.adjust_many(serializer.validated_data["adjustments"])
+        return Response({"results": results})
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="operations",
+        permission_classes=[IsServiceClient],
+        authentication_classes=(),
+    )
+    def bulk_operation(self, request):
+        serializer = self.get_serializer_class()(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # The job row and its task message are committed together.
+        with sharding.use_shard(sharding.get_shards()[0]), sharding.atomic():
+            job = operations.create(**serializer.data)
+            inline = operations.runs_inline(job)
+            if not inline:
+                outbox.enqueue(tasks.run_bulk_operation, str(job.id))
+        if inline:
+            operations.run(job)
+
+        return Response(
+            serializers.BulkOperationStatusSerializer(job).data,
+            status=status.HTTP_200_OK if inline else status.HTTP_202_ACCEPTED,
+        )
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"operations/(?P<operation_id>[0-9a-f-]+)",
+        permission_classes=[IsServiceClient],
+        authentication_classes=(),
+    )
+    def bulk_operation_status(self, request, operation_id=None):
+        job = get_object_or_404(models.BulkOperation.objects.all(), id=operation_id)
+        return Response(self.get_serializer_class()(job).data)
+
     @action(
         detail=True,
         methods=["post"],
@@ -94,9 +332,7 @@ class CustomerViewSet(
         serializer.is_valid(raise_exception=True)
 
         customer = self.get_object()
-        email_change = models.EmailChange.objects.filter(customer=customer).latest(
-            "created_at"
-        )
+        email_change = customer.current_email_change
 
         if customer.email_verify:
             return Response(
@@ -116,15 +352,19 @@ class CustomerViewSet(
         ):
             return Response({"Error": _("Expired")}, status.HTTP_400_BAD_REQUEST)
 
-        customer.email_verify = get_local_time()
-        customer.is_active = True
-        customer.save()
-        if email_change.new_email != "" and email_change.new_email is not None:
-            customer.username.email = email_change.new_email
-            customer.username.save()
-        email_change.new_email = ""
-        email_change.save()
-        customer.email_temp.all().delete()
+        with sharding.atomic():
+            customer.email_verify = get_local_time()
+            customer.is_active = True
+            customer.save()
+            if email_change.new_email != "" and email_change.new_email is not None:
+                customer.username.email = email_change.new_email
+                customer.username.save()
+                sharding.register(customer.id, email=customer.username.email)
+            email_change.new_email = ""
+            email_change.save()
+            customer.email_temp.all().delete()
+            lifecycle.publish(lifecycle.EMAIL_VERIFIED, customer.id)
+        audit.emit(audit.EMAIL_VERIFIED, request, customer_id=customer.id)
 
         token = self.refresh_token(customer)
 
@@ -165,7 +405,7 @@ class CustomerViewSet(
                 status.HTTP_400_BAD_REQUEST,
             )
 
-        tasks.send_email_verification.delay(customer.username.id.hex)
+        outbox.enqueue(tasks.send_email_verification, customer_id=customer.id.hex)
 
         return Response({"Success": _("Email resent")}, status.HTTP_200_OK)
 
@@ -197,10 +437,13 @@ class CustomerViewSet(
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        customer.username.email = serializer.validated_data["email"]
-        customer.username.save()
+        with sharding.atomic():
+            customer.username.email = serializer.validated_data["email"]
+            customer.username.save()
+            sharding.register(customer.id, email=customer.username.email)
+            lifecycle.publish(lifecycle.CONTACT_CHANGED, customer.id, fields=["email"])
 
-        tasks.send_email_verification.delay(customer.username.id.hex)
+            outbox.enqueue(tasks.send_email_verification, customer_id=customer.id.hex)
 
         return Response({"Success": _("Email sent")}, status.HTTP_200_OK)
 
@@ -236,6 +479,7 @@ class CustomerViewSet(
         lockout_time_in_mins = 10
 
         if auth_failures >= 4:
+            audit.emit(audit.SIGNIN_LOCKED_OUT, request, username=username)
             return Response(
                 data={
                     "detail": _("Username is locked out. Try in %s minutes.")
@@ -253,6 +497,7 @@ class CustomerViewSet(
 
         if not customer:
             cache.set(auth_failure_key, auth_failures + 1, lockout_time_in_mins * 60)
+            audit.emit(audit.SIGNIN_FAILED, request, username=username)
 
             return Response(
                 data={"detail": _("Invalid username/password."), "f": auth_failures},
@@ -263,12 +508,20 @@ class CustomerViewSet(
 
         if not customer.is_active:
             logger.debug("Not returning auth token: " "customer %s is disabled", email)
+            audit.emit(
+                audit.SIGNIN_FAILED,
+                request,
+                username=username,
+                customer_id=customer.id,
+                reason="disabled",
+            )
             return Response(
                 data={"detail": _("Customer account is disabled.")},
                 status=status.HTTP_401_UNAUTHORIZED,
             )
 
         token = self.refresh_token(customer)
+        audit.emit(audit.SIGNIN_SUCCEEDED, request, customer_id=customer.id)
 
         return Response(
             {
@@ -288,8 +541,8 @@ class CustomerViewSet(
         refresh_token = serializer.validated_data.get("refresh", None)
         try:
 
-            token = RefreshToken(refresh_token)
-            token.blacklist()
+            sessions.revoke_token(RefreshToken(refresh_token))
+            audit.emit(audit.SIGNOUT, request, customer_id=request.user.id)
 
             return Response(
                 {"detail": _("Successfull log out.")},
@@ -304,7 +557,7 @@ class CustomerViewSet(
     @action(
         detail=True,
         methods=["post"],
-        permission_classes=[IsAuthenticated],
+        permission_classes=[IsAuthenticated, IsSelf],
     )
     def change_password(self, request, id=None):
         customer = self.get_object()
@@ -320,11 +573,12 @@ class CustomerViewSet(
         new_password = serializer.validated_data["new_password"]
         customer.set_password(new_password)
         customer.save()
-        refresh_token = request.data["refresh"]
+        sessions.revoke_all(sessions.get_user_id(customer))
+        audit.emit(audit.PASSWORD_CHANGED, request, customer_id=customer.id)
+        refresh_token = serializer.validated_data.get("refresh")
         try:
-
-            token = RefreshToken(refresh_token)
-            token.blacklist()
+            if refresh_token:
+                sessions.revoke_token(RefreshToken(refresh_token))
 
             return Response(
                 {
@@ -340,15 +594,46 @@ class CustomerViewSet(
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="sessions",
+        permission_classes=[IsAuthenticated],
+    )
+    def active_sessions(self, request):
+        current = request.auth.get(sessions.SESSION_CLAIM) if request.auth else None
+        active = [
+            dict(session, current=session["sid"] == current)
+            for session in sessions.list_sessions(sessions.get_user_id(request.user))
+        ]
+        return Response(self.get_serializer(active, many=True).data)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[IsAuthenticated],
+    )
+    def revoke_sessions(self, request):
+        serializer = self.get_serializer_class()(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user_id = sessions.get_user_id(request.user)
+        if "sid" in serializer.validated_data:
+            if not sessions.revoke(user_id, serializer.validated_data["sid"]):
+                return Response(
+                    {"Error": _("Session not found")}, status.HTTP_404_NOT_FOUND
+                )
+        else:
+            sessions.revoke_all(user_id)
+        return Response({"detail": _("Sessions revoked.")}, status.HTTP_200_OK)
+
     @action(detail=True, methods=["post"], permission_classes=[rf_permissions.AllowAny])
     def verify_mobile(self, request, id=None):
         serializer = self.get_serializer_class()(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         customer = self.get_object()
-        mobile_change = models.PhoneChange.objects.filter(customer=customer).latest(
-            "created_at"
-        )
+        mobile_change = customer.current_mobile_change
 
         if customer.mobile_verify:
             return Response(
@@ -364,16 +649,21 @@ class CustomerViewSet(
             return Response({"Error": _("Code expired")}, status.HTTP_400_BAD_REQUEST)
 
         if serializer.validated_data["code"] == temp[0].code:
-            temp.delete()
-
-            customer.mobile_verify = get_local_time()
-            customer.is_active = True
-            customer.save()
-            if mobile_change.new_mobile != "" and mobile_change.new_mobile is not None:
-                customer.username.mobile = mobile_change.new_mobile
-                customer.username.save()
-            mobile_change.new_mobile = ""
-            mobile_change.save()
+            with sharding.atomic():
+                temp.delete()
+
+                customer.mobile_verify = get_local_time()
+                customer.is_active = True
+                customer.save()
+                new_mobile = mobile_change.new_mobile
+                if new_mobile != "" and new_mobile is not None:
+                    customer.username.mobile = new_mobile
+                    customer.username.save()
+                    sharding.register(customer.id, mobile=new_mobile)
+                mobile_change.new_mobile = ""
+                mobile_change.save()
+                lifecycle.publish(lifecycle.MOBILE_VERIFIED, customer.id)
+            audit.emit(audit.MOBILE_VERIFIED, request, customer_id=customer.id)
 
             token = self.refresh_token(customer)
 
@@ -403,7 +693,7 @@ class CustomerViewSet(
                 status.HTTP_400_BAD_REQUEST,
             )
 
-        tasks.send_mobile_verification_code.delay(customer.username.id.hex)
+        outbox.enqueue(tasks.send_mobile_verification_code, customer_id=customer.id.hex)
         return Response({"Success": _("Code resent")}, status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"], permission_classes=[rf_permissions.AllowAny])
@@ -418,38 +708,23 @@ class CustomerViewSet(
                 {"Success": "Mobile already verified"}, status=status.HTTP_200_OK
             )
 
-        customer.username.mobile = serializer.validated_data["mobile"]
-        customer.username.save()
+        with sharding.atomic():
+            customer.username.mobile = serializer.validated_data["mobile"]
+            customer.username.save()
+            sharding.register(customer.id, mobile=customer.username.mobile)
+            lifecycle.publish(lifecycle.CONTACT_CHANGED, customer.id, fields=["mobile"])
 
-        tasks.send_mobile_verification_code.delay(customer.username.id.hex)
+            outbox.enqueue(
+                tasks.send_mobile_verification_code, customer_id=customer.id.hex
+            )
 
         return Response({"Success": _("Code sent")}, status.HTTP_200_OK)
 
     def get_serializer_class(self):
-        if self.action == "signup":
-            return serializers.SignupSerializer
-        elif self.action == "signin":
-            return serializers.SigninSerializer
-        elif self.action == "signout":
-            return serializers.SignoutSerializer
-        elif self.action == "change_password":
-            return serializers.ChangePasswordSerializer
-        elif self.action == "change_email":
-            return serializers.ChangeEmailSerializer
-        elif self.action == "verify_email":
-            return serializers.UUIDSerializer
-        elif self.action == "verify_mobile":
-            return serializers.OTPSerializer
-        elif self.action == "change_mobile":
-            return serializers.MobileSerializer
-        elif self.action == "partial_update":
-            return serializers.CustomerUpdateSerializer
-        elif self.action == "me":
-            return serializers.CustomerDetailSerializer
-        return self.serializer_class
+        return self.action_serializer_classes.get(self.action, self.serializer_class)
 
     def refresh_token(self, customer):
-        refresh = RefreshToken.for_user(customer)
+        refresh = sessions.create(customer, self.request)
 
         return {
             "refresh": str(refresh),
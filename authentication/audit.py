@@ -0,0 +1,180 @@
+"""Structured audit trail of authentication events.
+
+``emit`` only puts an event on a bounded in-process queue; a background
+thread writes the queue to ``AUDIT_LOG["SINK"]`` in batches of JSON lines.
+Requests never wait for the sink: events are dropped, and counted in
+``authentication_audit_events_dropped``, when the queue is full or the sink
+fails.
+"""
+import atexit
+import functools
+import logging
+import os
+import queue
+import threading
+import time
+
+import orjson
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from authentication import metrics
+from authentication.connections import get_redis
+from authentication.utils import get_local_time
+
+logger = logging.getLogger(__name__)
+
+SIGNIN_SUCCEEDED = "signin_succeeded"
+SIGNIN_FAILED = "signin_failed"
+SIGNIN_LOCKED_OUT = "signin_locked_out"
+SIGNOUT = "signout"
+PASSWORD_CHANGED = "password_changed"
+EMAIL_VERIFIED = "email_verified"
+MOBILE_VERIFIED = "mobile_verified"
+
+
+class FileSink:
+    """Append lines to ``path``, rotated like ``RotatingFileHandler``."""
+
+    def __init__(self, path, max_bytes=100 * 1024 * 1024, backup_count=5):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+    def write(self, lines):
+        with open(self.path, "ab") as file:
+            file.write(b"".join(line + b"\n" for line in lines))
+            size = file.tell()
+        if self.max_bytes and size >= self.max_bytes:
+            self.rollover()
+
+    def rollover(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = "%s.%s" % (self.path, index)
+            if os.path.exists(source):
+                os.replace(source, "%s.%s" % (self.path, index + 1))
+        if self.backup_count:
+            os.replace(self.path, "%s.1" % self.path)
+        else:
+            os.remove(self.path)
+
+
+class RedisStreamSink:
+    """Add every line as an entry of a Redis stream capped near ``maxlen``."""
+
+    def __init__(self, stream, maxlen=None):
+        self.stream = stream
+        self.maxlen = maxlen
+
+    def write(self, lines):
+        with get_redis().pipeline(transaction=False) as pipe:
+            for line in lines:
+                pipe.xadd(
+                    self.stream, {"event": line}, maxlen=self.maxlen, approximate=True
+                )
+            pipe.execute()
+
+
+class AuditLog:
+    def __init__(self, sink, queue_size, batch_size, flush_interval, flush_timeout):
+        self.sink = sink
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.flush_timeout = flush_timeout
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def emit(self, event, **fields):
+        if self.pid != os.getpid():
+            self.start()
+        record = {"event": event, "at": get_local_time().isoformat(), **fields}
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.AUDIT_EVENTS_DROPPED.labels("queue_full").inc()
+
+    def start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            # A forked child starts over, the parent flushes its own queue.
+            self.queue = queue.Queue(self.queue_size)
+            self.sink_lock = threading.Lock()
+            self.pid = os.getpid()
+        threading.Thread(target=self.run, name="audit-log", daemon=True).start()
+        atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=deadline - time.monotonic()))
+                except (queue.Empty, ValueError):
+                    break
+            self.write(batch)
+
+    def write(self, batch):
+        try:
+            with self.sink_lock:
+                self.sink.write([orjson.dumps(record, default=str) for record in batch])
+        except Exception:
+            logger.exception("Could not write %s audit events", len(batch))
+            metrics.AUDIT_EVENTS_DROPPED.labels("sink_error").inc(len(batch))
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wait until the writer thread has written every queued event.
+
+        Events stay in the writer's hands so they are written in order. Gives
+        up after ``flush_timeout`` seconds, so a hanging sink cannot block
+        the exit of the process, counting the events left as dropped.
+        Returns whether every event was written.
+        """
+        if self.pid != os.getpid():
+            return True
+        deadline = time.monotonic() + self.flush_timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    left = self.queue.unfinished_tasks
+                    logger.error("Gave up writing %s audit events", left)
+                    metrics.AUDIT_EVENTS_DROPPED.labels("flush_timeout").inc(left)
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+
+@functools.lru_cache(maxsize=None)
+def get_audit_log():
+    config = settings.AUDIT_LOG
+    sink = import_string(config["SINK"])(**config["OPTIONS"])
+    return AuditLog(
+        sink,
+        queue_size=config["QUEUE_SIZE"],
+        batch_size=config["BATCH_SIZE"],
+        flush_interval=config["FLUSH_INTERVAL"],
+        flush_timeout=config["FLUSH_TIMEOUT"],
+    )
+
+
+@receiver(setting_changed)
+def reset_audit_log(setting, **kwargs):
+    if setting == "AUDIT_LOG":
+        get_audit_log.cache_clear()
+
+
+def emit(event, request=None, **fields):
+    """Record an audit event, with the client address of ``request`` if given."""
+    if request is not None:
+        meta = request.META
+        fields.setdefault("ip", meta.get("REMOTE_ADDR", ""))
+        fields.setdefault("user_agent", meta.get("HTTP_USER_AGENT", "")[:200])
+    get_audit_log().emit(event, **fields)
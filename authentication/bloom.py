@@ -0,0 +1,83 @@
+"""Bloom filters kept in Redis strings.
+
+A filter answers "maybe present" or "certainly absent" with one round trip,
+so callers only query the database for the values that may be present.
+Filters are rebuilt from the source of truth by a periodic task; values added
+while a rebuild runs are kept in a pending key and merged into the new filter.
+
+A rebuild also sets a marker bit after the filter's bits. Until it is set,
+because the filter was never built, was evicted or Redis lost it, every
+value might be present.
+"""
+import hashlib
+import math
+
+from authentication.connections import get_redis
+
+
+class BloomFilter:
+    def __init__(self, key, capacity, error_rate):
+        self.key = key
+        self.pending_key = "%s:pending" % key
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.length = math.ceil(self.size / 8)
+        self.built_bit = self.length * 8
+
+    def positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, items):
+        """Add ``items``, which a filter that is not built yet ignores.
+
+        Writing the filter too, not just the pending key, is safe as only
+        a rebuild sets the marker, and keeps items added while a rebuild
+        ends.
+        """
+        with get_redis(decode_responses=False).pipeline() as pipe:
+            for item in items:
+                for position in self.positions(item):
+                    pipe.setbit(self.key, position, 1)
+                    pipe.setbit(self.pending_key, position, 1)
+            pipe.execute()
+
+    def might_contain(self, item):
+        """Return False only for items certainly never added.
+
+        Until the first rebuild every item might be present.
+        """
+        with get_redis(decode_responses=False).pipeline(transaction=False) as pipe:
+            pipe.getbit(self.key, self.built_bit)
+            for position in self.positions(item):
+                pipe.getbit(self.key, position)
+            built, *bits = pipe.execute()
+        return not built or all(bits)
+
+    def rebuild(self, items):
+        """Replace the filter with one of ``items`` and return how many there were.
+
+        Items added since the rebuild started are merged in from the pending
+        key, so ``items`` may be read while writes go on.
+        """
+        redis = get_redis(decode_responses=False)
+        redis.delete(self.pending_key)
+        bits = bytearray(self.length)
+        count = 0
+        for item in items:
+            for position in self.positions(item):
+                bits[position >> 3] |= 0x80 >> (position & 7)
+            count += 1
+
+        def merge_pending(pipe):
+            pending = (pipe.get(self.pending_key) or b"")[: len(bits)]
+            merged = int.from_bytes(bits, "big") | int.from_bytes(
+                pending.ljust(len(bits), b"\0"), "big"
+            )
+            pipe.multi()
+            pipe.set(self.key, merged.to_bytes(len(bits), "big") + b"\x80")
+
+        redis.transaction(merge_pending, self.pending_key)
+        return count
@@ -0,0 +1,326 @@
+import logging
+import os
+import pickle  # nosec
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache.backends import locmem, redis
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from redis.exceptions import RedisError
+
+from authentication import metrics
+from authentication.connections import get_redis
+
+logger = logging.getLogger(__name__)
+
+_missing = object()
+
+
+class MetricsCacheMixin:
+    """Count cache hits and misses of ``get``/``get_many`` lookups."""
+
+    metrics_label = None
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            metrics.CACHE_REQUESTS.labels(self.metrics_label, "miss").inc()
+            return default
+        metrics.CACHE_REQUESTS.labels(self.metrics_label, "hit").inc()
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        metrics.CACHE_REQUESTS.labels(self.metrics_label, "hit").inc(len(values))
+        metrics.CACHE_REQUESTS.labels(self.metrics_label, "miss").inc(
+            len(keys) - len(values)
+        )
+        return values
+
+
+class LocMemCache(MetricsCacheMixin, locmem.LocMemCache):
+    metrics_label = "locmem"
+
+
+class RedisCache(MetricsCacheMixin, redis.RedisCache):
+    metrics_label = "redis"
+
+
+class LocalTier:
+    """In-process LRU of encoded values, shared by the threads of a process.
+
+    A listener thread drops the entries other processes invalidate on the
+    channel. Entries expire after a short TTL anyway, in case a message is
+    lost while the subscription reconnects.
+    """
+
+    def __init__(self, channel, max_entries):
+        self.channel = channel
+        self.max_entries = max_entries
+        self.origin = uuid.uuid4().hex
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.listener_pid = None
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, data, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, data)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, key=None):
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def message(self, key=None):
+        """Return the invalidation of ``key`` (everything if None) to publish."""
+        return "%s %s" % (self.origin, key if key is not None else "")
+
+    def listen(self, client):
+        if self.listener_pid == os.getpid():
+            return
+        with self.lock:
+            if self.listener_pid == os.getpid():
+                return
+            # Entries copied from a parent process missed its invalidations.
+            self.entries.clear()
+            self.listener_pid = os.getpid()
+        threading.Thread(
+            target=self.run, args=(client,), name="cache-invalidation", daemon=True
+        ).start()
+
+    def run(self, client):
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.discard()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.receive(message["data"].decode())
+            except RedisError:
+                logger.warning("Cache invalidation subscription lost", exc_info=True)
+                self.discard()
+                time.sleep(1)
+
+    def receive(self, message):
+        origin, _, key = message.partition(" ")
+        if origin != self.origin:
+            self.discard(key or None)
+
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(MetricsCacheMixin, BaseCache):
+    """Cache keeping a bounded in-process LRU in front of the ``REDIS`` server.
+
+    Reads are answered from the process while the local copy is younger than
+    ``OPTIONS["LOCAL_TIMEOUT"]`` seconds, otherwise from Redis. Every write is
+    published on ``OPTIONS["CHANNEL"]`` so all processes drop their copy.
+    """
+
+    metrics_label = "two-tier"
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        channel = options.get("CHANNEL", "cache-invalidation:%s" % location)
+        with _local_tiers_lock:
+            if channel not in _local_tiers:
+                _local_tiers[channel] = LocalTier(channel, self._max_entries)
+            self.local = _local_tiers[channel]
+
+    @property
+    def client(self):
+        client = get_redis(decode_responses=False)
+        self.local.listen(client)
+        return client
+
+    def get_backend_timeout(self, timeout=DEFAULT_TIMEOUT):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return None if timeout is None else max(0, int(timeout))
+
+    @staticmethod
+    def encode(value):
+        # Integers stay readable to Redis so incr() can run server side.
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def decode(data):
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)  # nosec
+
+    def keep_local(self, key, data, timeout=None):
+        local_timeout = self.local_timeout
+        if timeout is not None:
+            local_timeout = min(local_timeout, timeout)
+        if local_timeout > 0:
+            self.local.set(key, data, local_timeout)
+
+    def write(self, key, value, timeout, nx=False):
+        timeout = self.get_backend_timeout(timeout)
+        data = self.encode(value)
+        with self.client.pipeline(transaction=False) as pipe:
+            if timeout == 0:
+                pipe.delete(key)
+            else:
+                pipe.set(key, data, ex=timeout, nx=nx)
+            pipe.publish(self.local.channel, self.local.message(key))
+            written = pipe.execute()[0]
+        self.local.discard(key)
+        if written and timeout != 0:
+            self.keep_local(key, data, timeout)
+        return bool(written)
+
+    def invalidate(self, *keys):
+        """Delete ``keys`` in Redis and in the LRU of every process."""
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            for key in keys:
+                pipe.publish(self.local.channel, self.local.message(key))
+            deleted = pipe.execute()[0]
+        for key in keys:
+            self.local.discard(key)
+        return deleted
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.write(key, value, timeout, nx=True)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        data = self.local.get(key)
+        if data is None:
+            data = self.client.get(key)
+            if data is None:
+                return default
+            self.keep_local(key, data)
+        return self.decode(data)
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found = {}
+        for key in keys:
+            data = self.local.get(key)
+            if data is not None:
+                found[key] = data
+        missing = [key for key in keys if key not in found]
+        if missing:
+            for key, data in zip(missing, self.client.mget(missing)):
+                if data is not None:
+                    self.keep_local(key, data)
+                    found[key] = data
+        return {keys[key]: self.decode(data) for key, data in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.write(key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.get_backend_timeout(timeout)
+        encoded = {
+            self.make_and_validate_key(key, version=version): self.encode(value)
+            for key, value in data.items()
+        }
+        with self.client.pipeline(transaction=False) as pipe:
+            for key, value in encoded.items():
+                if timeout == 0:
+                    pipe.delete(key)
+                else:
+                    pipe.set(key, value, ex=timeout)
+                pipe.publish(self.local.channel, self.local.message(key))
+            pipe.execute()
+        for key, value in encoded.items():
+            self.local.discard(key)
+            if timeout != 0:
+                self.keep_local(key, value, timeout)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return bool(self.client.persist(key))
+        return bool(self.client.expire(key, timeout))
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self.invalidate(key))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self.invalidate(*keys)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self.local.get(key) is not None or bool(self.client.exists(key))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        client = self.client
+        if not client.exists(key):
+            raise ValueError("Key '%s' not found." % key)
+        with client.pipeline(transaction=False) as pipe:
+            pipe.incrby(key, delta)
+            pipe.publish(self.local.channel, self.local.message(key))
+            value = pipe.execute()[0]
+        self.local.discard(key)
+        return value
+
+    def clear(self):
+        # The REDIS database is shared with sessions, only drop cache keys.
+        client = self.client
+        pattern = self.key_func("*", self.key_prefix, "*")
+        with client.pipeline(transaction=False) as pipe:
+            for key in client.scan_iter(match=pattern, count=1000):
+                pipe.delete(key)
+            pipe.publish(self.local.channel, self.local.message())
+            pipe.execute()
+        self.local.discard()
+
+
+def entity_key(model, pk):
+    """Return the cache key of the cached copy of a model instance."""
+    return "entity:%s:%s" % (model._meta.label_lower, pk)
+
+
+def generation_key(model, pk):
+    """Return the cache key of the generation of a model instance.
+
+    Every write of the instance sets a new generation, and cached copies are
+    only used while they carry the current one. A reader that loaded the row
+    before a write therefore cannot bring the old copy back.
+    """
+    return "generation:%s:%s" % (model._meta.label_lower, pk)
+
+
+def new_generation():
+    return uuid.uuid4().hex
@@ -1,7 +1,14 @@
 from __future__ import absolute_import
 
-from celery import Celery
+import time
+from contextlib import ExitStack
+
+from celery import Celery, signals
 from django.conf import settings
+from django.db import connections
+from prometheus_client import start_http_server
+
+from authentication import metrics
 
 # set the default Django settings module for the 'celery' program.
 app = Celery("authentication")
@@ -11,7 +18,71 @@ app = Celery("authentication")
 app.config_from_object("django.conf:settings")
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
+INSTRUMENTED_TASK_PREFIX = "customer."
+
+_running = {}
+
 
 @app.task(bind=True)
 def debug_task(self):
     print("Request: {0!r}".format(self.request))
+
+
+@app.task(name="authentication.sample_queue_depth", ignore_result=True)
+def sample_queue_depth():
+    with app.connection_for_read() as connection:
+        channel = connection.default_channel
+        for queue in settings.WORKER_METRICS["QUEUES"]:
+            depth = channel.queue_declare(queue, passive=True).message_count
+            metrics.QUEUE_DEPTH.labels(queue).set(depth)
+
+
+def is_instrumented(name):
+    return bool(name) and name.startswith(INSTRUMENTED_TASK_PREFIX)
+
+
+@signals.before_task_publish.connect
+def stamp_enqueue_time(sender=None, headers=None, **kwargs):
+    if is_instrumented(sender) and headers is not None:
+        headers["enqueued_at"] = time.time()
+
+
+@signals.task_prerun.connect
+def start_task_timer(task_id=None, task=None, **kwargs):
+    if not is_instrumented(task.name):
+        return
+
+    enqueued_at = task.request.get("enqueued_at")
+    if enqueued_at:
+        queue = (task.request.delivery_info or {}).get("routing_key") or "celery"
+        metrics.TASK_QUEUE_LAG.labels(task.name, queue).observe(
+            max(time.time() - enqueued_at, 0)
+        )
+
+    counter = metrics.QueryCounter()
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(counter))
+    _running[task_id] = (time.perf_counter(), counter, stack)
+
+
+@signals.task_postrun.connect
+def stop_task_timer(task_id=None, task=None, state=None, **kwargs):
+    running = _running.pop(task_id, None)
+    if running is None:
+        return
+
+    start, counter, stack = running
+    stack.close()
+    metrics.TASK_RUNTIME.labels(task.name, state or "UNKNOWN").observe(
+        time.perf_counter() - start
+    )
+    metrics.TASK_QUERIES.labels(task.name).observe(counter.count)
+    metrics.TASK_QUERY_SECONDS.labels(task.name).observe(counter.duration)
+
+
+@signals.worker_ready.connect
+def serve_worker_metrics(**kwargs):
+    port = settings.WORKER_METRICS["PORT"]
+    if port:
+        start_http_server(port, registry=metrics.get_registry())
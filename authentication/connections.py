@@ -0,0 +1,25 @@
+import functools
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+@functools.lru_cache(maxsize=None)
+def get_redis(decode_responses=True):
+    """Return a client of the Redis instance configured in ``REDIS``.
+
+    Clients storing binary values, such as pickles, pass
+    ``decode_responses=False``.
+    """
+    config = settings.REDIS
+    client_class = import_string(config["CLIENT_CLASS"])
+    options = dict(config["OPTIONS"], decode_responses=decode_responses)
+    return client_class.from_url(config["URL"], **options)
+
+
+@receiver(setting_changed)
+def reset_redis(setting, **kwargs):
+    if setting == "REDIS":
+        get_redis.cache_clear()
@@ -0,0 +1,16 @@
+from django.contrib.auth import hashers
+
+from authentication import metrics
+
+
+class InstrumentedPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher that reports its key derivation time.
+
+    ``verify`` derives the key through ``encode`` as well, so timing ``encode``
+    covers both signup and signin. The algorithm name is unchanged and existing
+    password hashes keep verifying.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        with metrics.timer(metrics.PASSWORD_HASH_SECONDS, self.algorithm):
+            return super().encode(password, salt, iterations)
@@ -0,0 +1,136 @@
+"""Prometheus metrics shared by the web tier.
+
+When the service runs with several worker processes set the
+``PROMETHEUS_MULTIPROC_DIR`` environment variable to an empty, writable
+directory; every process then writes its samples there and the ``metrics``
+endpoint aggregates them.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+REQUEST_LATENCY = Histogram(
+    "authentication_request_seconds",
+    "Request latency by route",
+    ["route", "method", "status"],
+)
+
+REQUEST_QUERIES = Histogram(
+    "authentication_request_queries",
+    "SQL queries executed per request",
+    ["route", "method"],
+    buckets=QUERY_BUCKETS,
+)
+
+REQUEST_QUERY_SECONDS = Histogram(
+    "authentication_request_query_seconds",
+    "Time spent in SQL queries per request",
+    ["route", "method"],
+)
+
+CACHE_REQUESTS = Counter(
+    "authentication_cache_requests",
+    "Cache lookups by result",
+    ["backend", "result"],
+)
+
+PASSWORD_HASH_SECONDS = Histogram(
+    "authentication_password_hash_seconds",
+    "Time spent deriving password hashes",
+    ["algorithm"],
+)
+
+TASK_QUEUE_LAG = Histogram(
+    "authentication_task_queue_lag_seconds",
+    "Time between publishing a task and a worker starting it",
+    ["task", "queue"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+
+TASK_RUNTIME = Histogram(
+    "authentication_task_seconds",
+    "Task run time",
+    ["task", "state"],
+)
+
+TASK_QUERIES = Histogram(
+    "authentication_task_queries",
+    "SQL queries executed per task",
+    ["task"],
+    buckets=QUERY_BUCKETS,
+)
+
+TASK_QUERY_SECONDS = Histogram(
+    "authentication_task_query_seconds",
+    "Time spent in SQL queries per task",
+    ["task"],
+)
+
+EXTERNAL_CALL_SECONDS = Histogram(
+    "authentication_external_call_seconds",
+    "Time spent sending mails and text messages",
+    ["service"],
+)
+
+AUDIT_EVENTS_DROPPED = Counter(
+    "authentication_audit_events_dropped",
+    "Audit events lost before reaching the sink",
+    ["reason"],
+)
+
+QUEUE_DEPTH = Gauge(
+    "authentication_queue_depth",
+    "Messages waiting in a broker queue",
+    ["queue"],
+    multiprocess_mode="liveall",
+)
+
+
+class QueryCounter:
+    """Database execute wrapper counting queries and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def timer(histogram, *labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - start)
+
+
+def get_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render():
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
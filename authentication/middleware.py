@@ -0,0 +1,78 @@
+import time
+from contextlib import ExitStack
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from authentication import metrics, profiling
+from authentication.apps.customer import sharding
+
+
+class MetricsMiddleware:
+    """Record latency and SQL usage of every request per resolved route."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = metrics.QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        route = self.get_route(request)
+        metrics.REQUEST_LATENCY.labels(
+            route, request.method, response.status_code
+        ).observe(duration)
+        metrics.REQUEST_QUERIES.labels(route, request.method).observe(counter.count)
+        metrics.REQUEST_QUERY_SECONDS.labels(route, request.method).observe(
+            counter.duration
+        )
+        return response
+
+    @staticmethod
+    def get_route(request):
+        # The url name keeps label cardinality bounded, unlike the raw path.
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unmatched"
+        return match.view_name or match.route
+
+
+class ProfilingMiddleware:
+    """Profile sampled requests, or requests carrying the profiling token.
+
+    With a zero sample rate and no token the middleware removes itself, so
+    profiling costs nothing unless it is switched on.
+    """
+
+    def __init__(self, get_response):
+        self.config = profiling.get_settings()
+        if not profiling.is_enabled(self.config):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = "HTTP_" + self.config["HEADER"].upper().replace("-", "_")
+
+    def __call__(self, request):
+        if not profiling.should_profile(self.config, request.META.get(self.header)):
+            return self.get_response(request)
+
+        profiler = profiling.start(self.config)
+        try:
+            return self.get_response(request)
+        finally:
+            profiling.save(self.config, profiler, MetricsMiddleware.get_route(request))
+
+
+class ShardMiddleware:
+    """Unpin the shard a request was routed to once it is answered."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with sharding.use_shard(None):
+            return self.get_response(request)
@@ -1,8 +1,10 @@
 import uuid
 
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.utils import timezone
 
+from authentication.cache import generation_key, new_generation
 from authentication.utils import get_local_time
 
 
@@ -27,9 +29,9 @@ class TimeStampMixin(models.Model):
 
 
 class EntityMixin(UUIDMixin, TimeStampMixin):
-
-    # objects = ExcludeDeletedEntityManager()
-    # all_objects = models.Manager()
+    # Models reading snapshots from the cache under ``entity_key`` set this to
+    # start a new generation of the snapshot whenever a row is saved.
+    cache_snapshots = False
 
     class Meta:
         abstract = True
@@ -37,8 +39,42 @@ class EntityMixin(UUIDMixin, TimeStampMixin):
     def save(self, *args, **kwargs):
         if self.id:
             self.updated_at = timezone.localtime(timezone.now())
+        adding = self._state.adding
         super(TimeStampMixin, self).save(*args, **kwargs)
+        if self.cache_snapshots and not adding:
+            self.invalidate_snapshot()
+
+    def invalidate_snapshot(self):
+        self.invalidate_snapshots([self.pk], using=self._state.db)
+
+    @classmethod
+    def invalidate_snapshots(cls, pks, using=None):
+        """Retire the cached rows of ``pks``, for writes bypassing ``save``."""
+        keys = [generation_key(cls, pk) for pk in pks]
+
+        def start_generations():
+            cache.set_many({key: new_generation() for key in keys})
+
+        start_generations()
+        # Readers may cache the old rows again until the transaction commits.
+        if transaction.get_connection(using).in_atomic_block:
+            transaction.on_commit(start_generations, using=using)
+
+
+class SoftDeleteMixin(models.Model):
+    """Mark rows deleted instead of deleting them.
+
+    Models using it pair ``objects = ExcludeDeletedEntityManager()`` with an
+    ``all_objects`` manager. The archiver later moves deleted rows out of the
+    table, see ``authentication.apps.customer.archive``.
+    """
+
+    class Meta:
+        abstract = True
+
+    def delete(self, using=None, keep_parents=False):
+        self.deleted_at = get_local_time()
+        self.save(using=using, update_fields=["deleted_at", "updated_at"])
 
-    # def delete(self, using=None, keep_parents=False):
-    #     self.deleted_at = get_local_time()
-    #     self.save()
+    def hard_delete(self, using=None, keep_parents=False):
+        return super().delete(using=using, keep_parents=keep_parents)
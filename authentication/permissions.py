@@ -0,0 +1,33 @@
+import hmac
+import uuid
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+
+class IsServiceClient(BasePermission):
+    """Allow internal services presenting one of the configured service keys."""
+
+    def has_permission(self, request, view):
+        key = request.META.get("HTTP_X_SERVICE_KEY", "").encode()
+        return bool(key) and any(
+            hmac.compare_digest(key, allowed.encode())
+            for allowed in settings.SERVICE_CLIENT_KEYS
+        )
+
+
+class IsSelf(BasePermission):
+    """Allow customers to act on their own record only.
+
+    Checked against the id in the URL before any query, so requests for other
+    customers learn nothing, not even whether their record changed.
+    """
+
+    def has_permission(self, request, view):
+        lookup = view.kwargs.get(view.lookup_url_kwarg or view.lookup_field)
+        if lookup is None:
+            return True
+        try:
+            return uuid.UUID(str(lookup)) == request.user.pk
+        except ValueError:
+            return False
@@ -0,0 +1,147 @@
+"""On-demand profiling of requests and Celery tasks.
+
+Profiles are written to ``PROFILING["DIRECTORY"]``, which is used as a ring:
+once it holds ``MAX_FILES`` profiles the oldest ones are removed.
+
+``sampling`` mode writes folded stacks (``*.folded``), the input format of
+flamegraph.pl and speedscope. ``cprofile`` mode writes pstats dumps
+(``*.prof``) for snakeviz or flameprof.
+"""
+import cProfile
+import functools
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+
+
+class SamplingProfiler:
+    """Statistical profiler sampling the stack of a single thread."""
+
+    extension = "folded"
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+
+    def start(self):
+        self.sampler.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.sampler.join()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    "%s (%s:%s)" % (code.co_name, code.co_filename, code.co_firstlineno)
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, "w") as output:
+            for stack, count in self.stacks.items():
+                output.write("%s %s\n" % (stack, count))
+
+
+class CProfileProfiler:
+    extension = "prof"
+
+    def __init__(self, interval=None):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+PROFILERS = {
+    "sampling": SamplingProfiler,
+    "cprofile": CProfileProfiler,
+}
+
+
+def get_settings():
+    return settings.PROFILING
+
+
+def is_enabled(config=None):
+    config = config or get_settings()
+    return config["SAMPLE_RATE"] > 0 or bool(config["TOKEN"])
+
+
+def should_profile(config, header_value=None):
+    if header_value and config["TOKEN"]:
+        return hmac.compare_digest(header_value.encode(), config["TOKEN"].encode())
+    return random.random() < config["SAMPLE_RATE"]  # nosec
+
+
+def start(config):
+    profiler = PROFILERS[config["MODE"]](config["INTERVAL"])
+    profiler.start()
+    return profiler
+
+
+def save(config, profiler, label):
+    """Stop ``profiler`` and store its profile in the ring directory."""
+    profiler.stop()
+    directory = config["DIRECTORY"]
+    os.makedirs(directory, exist_ok=True)
+    # The random suffix keeps profiles taken within a second apart.
+    name = "%s-%s-%s.%s" % (
+        time.strftime("%Y%m%d%H%M%S"),
+        "".join(c if c.isalnum() or c in "-_" else "_" for c in label),
+        uuid.uuid4().hex[:12],
+        profiler.extension,
+    )
+    profiler.dump(os.path.join(directory, name))
+    prune(directory, config["MAX_FILES"])
+
+
+def prune(directory, max_files):
+    entries = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in entries[: max(len(entries) - max_files, 0)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def profile_task(func):
+    """Profile a sampled fraction of the calls of a Celery task."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        config = get_settings()
+        if not config["SAMPLE_RATE"] or not should_profile(config):
+            return func(*args, **kwargs)
+        profiler = start(config)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            save(config, profiler, "task-" + func.__name__)
+
+    return wrapper
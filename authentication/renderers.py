@@ -0,0 +1,48 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME
+
+# Kept escaped like DRF does, they are line terminators for javascript.
+LINE_SEPARATORS = (("\u2028".encode(), b"\\u2028"), ("\u2029".encode(), b"\\u2029"))
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` serializing with orjson.
+
+    Datetimes and every type orjson does not know, such as lazy translations
+    and decimals, go through DRF's ``JSONEncoder`` so they render like the
+    stdlib renderer. Floats in exponent notation are spelled differently
+    (``1e16`` instead of ``1e+16``), and data orjson cannot encode at all, such
+    as integers wider than 64 bits, is rendered by ``JSONRenderer``.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        option = OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=option)
+        except orjson.JSONEncodeError:
+            # Non-string keys are rare and slow orjson down, only allow on retry.
+            try:
+                ret = orjson.dumps(
+                    data,
+                    default=_encoder.default,
+                    option=option | orjson.OPT_NON_STR_KEYS,
+                )
+            except orjson.JSONEncodeError:
+                return super().render(data, accepted_media_type, renderer_context)
+
+        # Both separators start with 0xe2, a single byte scan skips most bodies.
+        if b"\xe2" in ret:
+            for separator, escaped in LINE_SEPARATORS:
+                ret = ret.replace(separator, escaped)
+        return ret
@@ -0,0 +1,114 @@
+from django.conf import settings
+from rest_framework import serializers as rf_serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt import serializers
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from authentication import sessions
+from authentication.tokens import RefreshToken, UntypedToken
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs["refresh"])
+
+        if sessions.SESSION_CLAIM in refresh:
+            sessions.rotate(refresh)
+            return {"access": str(refresh.access_token), "refresh": str(refresh)}
+
+        data = {"access": str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data["refresh"] = str(refresh)
+
+        return data
+
+
+class TokenVerifySerializer(serializers.TokenVerifySerializer):
+    def validate(self, attrs):
+        token = UntypedToken(attrs["token"])
+
+        if sessions.SESSION_CLAIM in token:
+            if not sessions.is_active([token])[0]:
+                raise ValidationError("Session has been revoked")
+        elif api_settings.BLACKLIST_AFTER_ROTATION:
+            jti = token.get(api_settings.JTI_CLAIM)
+            if BlacklistedToken.objects.filter(token__jti=jti).exists():
+                raise ValidationError("Token is blacklisted")
+
+        return {}
+
+
+class TokenIntrospectSerializer(rf_serializers.Serializer):
+    """Describe many tokens at once.
+
+    Sessions are checked with one Redis round trip and tokens issued before
+    sessions existed with one blacklist query for the whole batch. Tokens that
+    fail validation (bad signature, expired, malformed) are reported as
+    inactive with the reason.
+    """
+
+    tokens = rf_serializers.ListField(
+        child=rf_serializers.CharField(),
+        allow_empty=False,
+        max_length=settings.INTROSPECTION_MAX_TOKENS,
+    )
+
+    def validate(self, attrs):
+        decoded, errors = {}, {}
+        for raw in set(attrs["tokens"]):
+            try:
+                decoded[raw] = UntypedToken(raw)
+            except TokenError as error:
+                errors[raw] = str(error)
+
+        revoked = {
+            raw
+            for raw, active in zip(decoded, sessions.is_active(list(decoded.values())))
+            if not active
+        }
+        legacy_jtis = {
+            token[api_settings.JTI_CLAIM]
+            for token in decoded.values()
+            if sessions.SESSION_CLAIM not in token
+        }
+        if legacy_jtis:
+            blacklisted = set(
+                BlacklistedToken.objects.filter(token__jti__in=legacy_jtis).values_list(
+                    "token__jti", flat=True
+                )
+            )
+            revoked.update(
+                raw
+                for raw, token in decoded.items()
+                if token[api_settings.JTI_CLAIM] in blacklisted
+            )
+
+        results = []
+        for raw in attrs["tokens"]:
+            if raw in errors:
+                results.append({"active": False, "error": errors[raw]})
+                continue
+            token = decoded[raw]
+            results.append(
+                {
+                    "active": raw not in revoked,
+                    "blacklisted": raw in revoked,
+                    "token_type": token.get(api_settings.TOKEN_TYPE_CLAIM),
+                    "jti": token[api_settings.JTI_CLAIM],
+                    "exp": token.get("exp"),
+                    "iat": token.get("iat"),
+                    api_settings.USER_ID_CLAIM: token.get(api_settings.USER_ID_CLAIM),
+                    sessions.SESSION_CLAIM: token.get(sessions.SESSION_CLAIM),
+                }
+            )
+        return {"tokens": results}
@@ -0,0 +1,224 @@
+"""Refresh-token sessions kept in Redis.
+
+Every signin starts a session: a family of refresh tokens sharing the ``sid``
+claim. Refreshing rotates the family to a new ``jti``, and presenting an older
+token of the family again means it leaked, so the whole session is revoked.
+
+Tokens also carry the customer's session generation in ``gen``. Incrementing
+the generation revokes every session of the customer with a single write, and
+the sessions it orphans are dropped lazily from the customer's index.
+
+Refreshing and revoking never touch the database.
+"""
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from authentication.connections import get_redis
+from authentication.tokens import SESSION_CLAIM, RefreshToken
+
+GENERATION_CLAIM = "gen"
+
+ROTATED = "rotated"
+REVOKED = "revoked"
+REUSED = "reused"
+
+
+class SessionRevoked(TokenError):
+    pass
+
+
+def session_key(sid):
+    return "session:%s" % sid
+
+
+def index_key(user_id):
+    return "sessions:%s" % user_id
+
+
+def generation_key(user_id):
+    return "session-generation:%s" % user_id
+
+
+def lifetime():
+    return int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+
+
+def get_user_id(customer):
+    user_id = getattr(customer, api_settings.USER_ID_FIELD)
+    return user_id if isinstance(user_id, int) else str(user_id)
+
+
+def create(customer, request=None):
+    """Start a session of ``customer`` and return its first refresh token."""
+    redis = get_redis()
+    user_id = get_user_id(customer)
+    generation = int(redis.get(generation_key(user_id)) or 0)
+
+    refresh = RefreshToken()
+    refresh[api_settings.USER_ID_CLAIM] = user_id
+    refresh[SESSION_CLAIM] = uuid.uuid4().hex
+    refresh[GENERATION_CLAIM] = generation
+
+    now = int(time.time())
+    meta = request.META if request is not None else {}
+    session = {
+        "jti": refresh[api_settings.JTI_CLAIM],
+        "gen": generation,
+        "created_at": now,
+        "last_used_at": now,
+        "ip": meta.get("REMOTE_ADDR", ""),
+        "user_agent": meta.get("HTTP_USER_AGENT", "")[:200],
+    }
+    with redis.pipeline() as pipe:
+        save(pipe, user_id, refresh[SESSION_CLAIM], session, now)
+        pipe.execute()
+    return refresh
+
+
+def save(pipe, user_id, sid, session, now):
+    pipe.hset(session_key(sid), mapping=session)
+    pipe.expire(session_key(sid), lifetime())
+    pipe.zadd(index_key(user_id), {sid: now})
+    pipe.expire(index_key(user_id), lifetime())
+
+
+def rotate(refresh):
+    """Move the session of ``refresh`` on to a new token, updating it in place.
+
+    Raises ``SessionRevoked`` when the session is gone or ``refresh`` is not
+    its current token, in which case the session is revoked.
+    """
+    user_id = refresh[api_settings.USER_ID_CLAIM]
+    sid = refresh[SESSION_CLAIM]
+    new_jti = uuid.uuid4().hex
+    now = int(time.time())
+
+    def rotate_session(pipe):
+        current_jti = pipe.hget(session_key(sid), "jti")
+        generation = int(pipe.get(generation_key(user_id)) or 0)
+        if current_jti is None or generation != refresh[GENERATION_CLAIM]:
+            return REVOKED
+        pipe.multi()
+        if current_jti != refresh[api_settings.JTI_CLAIM]:
+            pipe.delete(session_key(sid))
+            pipe.zrem(index_key(user_id), sid)
+            return REUSED
+        save(pipe, user_id, sid, {"jti": new_jti, "last_used_at": now}, now)
+        return ROTATED
+
+    outcome = get_redis().transaction(
+        rotate_session,
+        session_key(sid),
+        generation_key(user_id),
+        value_from_callable=True,
+    )
+    if outcome != ROTATED:
+        raise SessionRevoked(_("Session has been revoked"))
+
+    refresh[api_settings.JTI_CLAIM] = new_jti
+    refresh.set_exp(from_time=refresh.current_time)
+    refresh.set_iat(at_time=refresh.current_time)
+
+
+def revoke(user_id, sid):
+    """Revoke session ``sid`` of a customer.
+
+    Returns False, revoking nothing, when ``sid`` is not a session of the
+    customer.
+    """
+
+    def revoke_session(pipe):
+        if pipe.zscore(index_key(user_id), sid) is None:
+            return False
+        pipe.multi()
+        pipe.delete(session_key(sid))
+        pipe.zrem(index_key(user_id), sid)
+        return True
+
+    return get_redis().transaction(
+        revoke_session, index_key(user_id), value_from_callable=True
+    )
+
+
+def revoke_token(refresh):
+    """Revoke the session of ``refresh``, or blacklist a token without one."""
+    if SESSION_CLAIM in refresh:
+        revoke(refresh[api_settings.USER_ID_CLAIM], refresh[SESSION_CLAIM])
+    else:
+        refresh.blacklist()
+
+
+def revoke_all(user_id):
+    get_redis().incr(generation_key(user_id))
+
+
+def is_active(tokens):
+    """Tell for each token whether its session is still alive.
+
+    Refresh tokens are active only while they are the current token of their
+    session, access tokens for as long as their session exists. Tokens issued
+    before sessions existed, without a ``sid``, are reported as active.
+    """
+    redis = get_redis()
+    with redis.pipeline(transaction=False) as pipe:
+        for token in tokens:
+            if SESSION_CLAIM in token:
+                pipe.hget(session_key(token[SESSION_CLAIM]), "jti")
+                pipe.get(generation_key(token[api_settings.USER_ID_CLAIM]))
+        replies = iter(pipe.execute())
+
+    states = []
+    for token in tokens:
+        if SESSION_CLAIM not in token:
+            states.append(True)
+            continue
+        current_jti, generation = next(replies), int(next(replies) or 0)
+        states.append(
+            current_jti is not None
+            and generation == token[GENERATION_CLAIM]
+            and (
+                token[api_settings.TOKEN_TYPE_CLAIM] != RefreshToken.token_type
+                or current_jti == token[api_settings.JTI_CLAIM]
+            )
+        )
+    return states
+
+
+def list_sessions(user_id):
+    """Return the live sessions of a customer, most recently used first."""
+    redis = get_redis()
+    redis.zremrangebyscore(index_key(user_id), "-inf", time.time() - lifetime())
+    sids = redis.zrevrange(index_key(user_id), 0, -1)
+
+    with redis.pipeline(transaction=False) as pipe:
+        for sid in sids:
+            pipe.hgetall(session_key(sid))
+        pipe.get(generation_key(user_id))
+        *sessions, generation = pipe.execute()
+
+    live, stale = [], []
+    for sid, session in zip(sids, sessions):
+        if not session or int(session["gen"]) != int(generation or 0):
+            stale.append(sid)
+            continue
+        live.append(
+            {
+                "sid": sid,
+                "created_at": timestamp(session["created_at"]),
+                "last_used_at": timestamp(session["last_used_at"]),
+                "ip": session["ip"],
+                "user_agent": session["user_agent"],
+            }
+        )
+    if stale:
+        redis.zrem(index_key(user_id), *stale)
+    return live
+
+
+def timestamp(value):
+    return datetime.fromtimestamp(int(value), tz=timezone.utc)
@@ -13,6 +13,21 @@ AUTHENTICATION_CUSTOMER = {
     "EMAIL_VERIFICATION_CHANGE_LIMIT": 3,
     "EMAIL_VERIFICATION_RESEND_TIME_LIMIT": timedelta(seconds=100),
     "OTP_EXPIRE_TIME": timedelta(seconds=100),
+    "OUTBOX_RELAY_BATCH_SIZE": 100,
+    "OUTBOX_RELAY_INTERVAL": timedelta(seconds=1),
+    "OUTBOX_MAX_ATTEMPTS": 10,
+    "ARCHIVE_AFTER": timedelta(days=30),
+    "ARCHIVE_BATCH_SIZE": 500,
+    "CHANGE_HISTORY_RETENTION": timedelta(days=90),
+    "CUSTOMER_SNAPSHOT_TIMEOUT": timedelta(minutes=5),
+    # Bloom filter of used emails, mobiles and national codes.
+    "AVAILABILITY_FILTER": {"CAPACITY": 1000000, "ERROR_RATE": 0.001},
+    "BULK_VALIDATION": {"MAX_VALUES": 10000, "CHUNK_SIZE": 1000},
+    # Also how long a credit adjustment reference is remembered.
+    "CREDIT_LEDGER_RETENTION": timedelta(days=180),
+    "CREDIT_ADJUST_MAX_ADJUSTMENTS": 1000,
+    # Operations on at most SYNC_LIMIT customers given by id run in the request.
+    "BULK_OPERATIONS": {"MAX_IDS": 100000, "SYNC_LIMIT": 500, "CHUNK_SIZE": 500},
 }
 
 PUBLIC_APP_SETTING = []
@@ -53,6 +53,9 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "customer.customer"
 
 MIDDLEWARE = [
+    "authentication.middleware.MetricsMiddleware",
+    "authentication.middleware.ProfilingMiddleware",
+    "authentication.middleware.ShardMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -67,12 +70,25 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "authentication.apps.customer.authentication.ShardJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_THROTTLE_RATES": {
+        "availability": "60/min",
+        "bulk_validation": "30/min",
+    },
     "DEFAULT_PAGINATION_CLASS": "authentication.paginations.HeaderPagination",
+    "DEFAULT_RENDERER_CLASSES": [
+        "authentication.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "authentication.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 
@@ -104,6 +120,19 @@ TEMPLATES = [
     },
 ]
 
+# In-process LRU over the REDIS server, kept coherent through CHANNEL.
+CACHES = {
+    "default": {
+        "BACKEND": "authentication.cache.TwoTierCache",
+        "KEY_PREFIX": "cache",
+        "OPTIONS": {
+            "MAX_ENTRIES": 10000,
+            "LOCAL_TIMEOUT": 5,
+            "CHANNEL": "cache-invalidation",
+        },
+    }
+}
+
 AUTHENTICATION_BACKENDS = (
     "authentication.apps.customer.authentication.EmailMobileAuthentication",
 )
@@ -125,10 +154,63 @@ DATABASES = {
     }
 }
 
+# Customer data is spread over the SHARDS databases by a hash of the customer
+# id into BUCKETS buckets, see authentication.apps.customer.sharding. Every
+# shard also needs its own DATABASES entry. The lookup directory and the
+# bucket map live on DIRECTORY. BUCKETS must not change once data is stored.
+SHARDING = {
+    "SHARDS": os.environ.get("SHARDS", "default").split(","),
+    "BUCKETS": 256,
+    "DIRECTORY": "default",
+    "MAP_TTL": timedelta(seconds=30),
+}
+
+DATABASE_ROUTERS = ["authentication.apps.customer.routers.ShardRouter"]
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=2),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "AUTH_TOKEN_CLASSES": ("authentication.tokens.AccessToken",),
+}
+
+# RS256 or EdDSA sign tokens with the keys of DIRECTORY and publish them on
+# /.well-known/jwks.json, HS256 keeps signing with SECRET_KEY.
+JWT_KEYS = {
+    "ALGORITHM": os.environ.get("JWT_ALGORITHM", "HS256"),
+    "DIRECTORY": os.environ.get("JWT_KEYS_DIRECTORY", BASE_DIR.parent / "keys"),
+    "ACTIVE_KID": os.environ.get("JWT_ACTIVE_KID", ""),
+    "JWKS_MAX_AGE": 3600,
+}
+
+
+# Profile PROFILING_SAMPLE_RATE of requests and tasks, plus every request sending
+# the PROFILING_TOKEN in the X-Profile header.
+PROFILING = {
+    "SAMPLE_RATE": float(os.environ.get("PROFILING_SAMPLE_RATE", 0)),
+    "TOKEN": os.environ.get("PROFILING_TOKEN", ""),
+    "HEADER": "X-Profile",
+    "MODE": os.environ.get("PROFILING_MODE", "sampling"),
+    "INTERVAL": 0.005,
+    "DIRECTORY": os.environ.get("PROFILING_DIRECTORY", BASE_DIR.parent / "profiles"),
+    "MAX_FILES": 100,
+}
+
+
+# Keys internal services send in the X-Service-Key header, e.g. the gateways
+# calling token/introspect/ and the Prometheus scraper reading metrics.
+SERVICE_CLIENT_KEYS = [
+    key for key in os.environ.get("SERVICE_CLIENT_KEYS", "").split(",") if key
+]
+
+INTROSPECTION_MAX_TOKENS = 500
+
+
+# Redis holding state shared by every process, e.g. refresh-token sessions.
+REDIS = {
+    "URL": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+    "CLIENT_CLASS": "redis.Redis",
+    "OPTIONS": {"decode_responses": True},
 }
 
 
@@ -137,6 +219,60 @@ CELERY_RESULT_BACKEND = os.environ.get("CELERY_BACKEND", "redis://127.0.0.1:6379
 CELERY_TIMEZONE = "Asia/Tehran"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_ACKS_LATE = True
+CELERYBEAT_SCHEDULE = {
+    "sample-queue-depth": {
+        "task": "authentication.sample_queue_depth",
+        "schedule": timedelta(seconds=15),
+    },
+    "archive-deleted": {
+        "task": "customer.archive_deleted",
+        "schedule": timedelta(minutes=10),
+    },
+    "compact-change-history": {
+        "task": "customer.compact_change_history",
+        "schedule": timedelta(hours=1),
+    },
+    "rollup-credit-ledger": {
+        "task": "customer.rollup_credit_ledger",
+        "schedule": timedelta(hours=1),
+    },
+    "rebuild-availability-filter": {
+        "task": "customer.rebuild_availability_filter",
+        "schedule": timedelta(minutes=30),
+    },
+}
+
+# Auth events are queued in process and written to the sink in batches.
+AUDIT_LOG = {
+    "SINK": "authentication.audit.RedisStreamSink",
+    "OPTIONS": {"stream": "audit", "maxlen": 1000000},
+    "QUEUE_SIZE": 10000,
+    "BATCH_SIZE": 500,
+    "FLUSH_INTERVAL": 1.0,
+    # How long exiting processes wait for the queue to be written.
+    "FLUSH_TIMEOUT": 5.0,
+}
+
+# Stream announcing new, verified and changed customers to other services.
+LIFECYCLE_EVENTS = {
+    "BROKER": "authentication.streams.RedisStreamBroker",
+    "OPTIONS": {"stream": "customer-lifecycle", "maxlen": 1000000},
+}
+
+# Workers serve their task metrics on this port, 0 disables it.
+WORKER_METRICS = {
+    "PORT": int(os.environ.get("WORKER_METRICS_PORT", 0)),
+    "QUEUES": ["celery"],
+}
+
+
+PASSWORD_HASHERS = [
+    "authentication.hashers.InstrumentedPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
 
 
 # Password validation
@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+from .base_settings import *  # noqa
+
+DEBUG = False
+
+# "sqlite" gives a self-contained stack, anything else keeps the MariaDB
+# connection from base_settings so a local server can be measured.
+if os.environ.get("BENCHMARK_DATABASE", "sqlite") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR.parent / "benchmark.sqlite3",  # noqa F405
+            "OPTIONS": {"timeout": 30},
+        }
+    }
+
+# Fake SMTP: every verification mail is written to a file the driver reads.
+EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+EMAIL_FILE_PATH = os.environ.get(
+    "BENCHMARK_MAIL_DIR", "/tmp/authentication-benchmark-mail"  # nosec
+)
+DEFAULT_FROM_EMAIL = "benchmark@localhost"
+
+# The outbox relay runs the verification tasks itself, no broker needed.
+BROKER_URL = "memory://"
+CELERY_RESULT_BACKEND = "cache+memory://"
+CELERY_ALWAYS_EAGER = True
+
+# Sessions stay in process unless REDIS_URL points at a server to measure.
+if "REDIS_URL" not in os.environ:
+    REDIS = {
+        "URL": "redis://localhost:6379/0",
+        "CLIENT_CLASS": "fakeredis.FakeRedis",
+        "OPTIONS": {"decode_responses": True},
+    }
+    # fakeredis has no streams.
+    AUDIT_LOG = dict(
+        AUDIT_LOG,  # noqa F405
+        SINK="authentication.audit.FileSink",
+        OPTIONS={"path": os.path.join(tempfile.gettempdir(), "benchmark_audit.log")},
+    )
+    LIFECYCLE_EVENTS = {
+        "BROKER": "authentication.streams.FileBroker",
+        "OPTIONS": {"path": os.path.join(tempfile.gettempdir(), "benchmark_lifecycle")},
+    }
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from .base_settings import *  # noqa
+
+DEBUG = False
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "test.sqlite3",  # noqa F405
+    },
+    # Second shard for the sharding tests, which enable it with SHARDING.
+    "shard_1": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "test_shard_1.sqlite3",  # noqa F405
+    },
+}
+
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.MD5PasswordHasher",
+]
+
+EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+BROKER_URL = "memory://"
+CELERY_RESULT_BACKEND = "cache+memory://"
+CELERY_ALWAYS_EAGER = True
+
+AUDIT_LOG = {
+    "SINK": "authentication.audit.FileSink",
+    "OPTIONS": {"path": os.path.join(tempfile.gettempdir(), "test_audit.log")},
+    "QUEUE_SIZE": 1000,
+    "BATCH_SIZE": 100,
+    "FLUSH_INTERVAL": 0.01,
+    "FLUSH_TIMEOUT": 5.0,
+}
+
+LIFECYCLE_EVENTS = {
+    "BROKER": "authentication.streams.FileBroker",
+    "OPTIONS": {"path": os.path.join(tempfile.gettempdir(), "test_lifecycle")},
+}
+
+REDIS = {
+    "URL": "redis://localhost:6379/0",
+    "CLIENT_CLASS": "fakeredis.FakeRedis",
+    "OPTIONS": {"decode_responses": True},
+}
@@ -0,0 +1,138 @@
+"""Append-only message streams read by other services.
+
+Brokers publish batches of JSON messages and let consumers either replay the
+stream after any message id or share it through consumer groups, which
+deliver every message to one consumer of the group until it is acknowledged.
+"""
+import fcntl
+import json
+from contextlib import contextmanager
+
+import orjson
+from redis.exceptions import ResponseError
+
+from authentication.connections import get_redis
+
+
+class RedisStreamBroker:
+    """Messages kept in a Redis stream capped near ``maxlen`` entries."""
+
+    def __init__(self, stream, maxlen=None):
+        self.stream = stream
+        self.maxlen = maxlen
+
+    def publish(self, messages):
+        """Append ``messages`` and return their ids."""
+        with get_redis().pipeline(transaction=False) as pipe:
+            for message in messages:
+                pipe.xadd(
+                    self.stream,
+                    {"data": orjson.dumps(message)},
+                    maxlen=self.maxlen,
+                    approximate=True,
+                )
+            return pipe.execute()
+
+    def read(self, after="0", count=100):
+        """Return up to ``count`` ``(id, message)`` pairs following ``after``."""
+        entries = get_redis().xrange(self.stream, min="(%s" % after, count=count)
+        return [(id, orjson.loads(fields["data"])) for id, fields in entries]
+
+    def create_group(self, group, start="0"):
+        """Create ``group`` reading after ``start``, unless it exists."""
+        try:
+            get_redis().xgroup_create(self.stream, group, id=start, mkstream=True)
+        except ResponseError as error:
+            if "BUSYGROUP" not in str(error):
+                raise
+
+    def read_group(self, group, consumer, count=100, block=None):
+        """Deliver up to ``count`` new messages of ``group`` to ``consumer``."""
+        response = get_redis().xreadgroup(
+            group, consumer, {self.stream: ">"}, count=count, block=block
+        )
+        return [
+            (id, orjson.loads(fields["data"]))
+            for _, entries in response
+            for id, fields in entries
+        ]
+
+    def ack(self, group, ids):
+        return get_redis().xack(self.stream, group, *ids) if ids else 0
+
+
+class FileBroker:
+    """Messages kept in a local file, for tests and local stacks.
+
+    A message id is the file offset following its line, so reading after an
+    id continues right there. Consumer groups are kept next to the file.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.groups_path = "%s.groups" % self.path
+
+    @contextmanager
+    def locked(self):
+        with open("%s.lock" % self.path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def publish(self, messages):
+        ids = []
+        with self.locked(), open(self.path, "ab") as file:
+            for message in messages:
+                file.write(orjson.dumps(message) + b"\n")
+                ids.append(str(file.tell()))
+        return ids
+
+    def read(self, after="0", count=100):
+        entries = []
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return entries
+        with file:
+            file.seek(int(after))
+            while len(entries) < count:
+                line = file.readline()
+                if not line.endswith(b"\n"):
+                    break
+                entries.append((str(file.tell()), orjson.loads(line)))
+        return entries
+
+    def load_groups(self):
+        try:
+            with open(self.groups_path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def save_groups(self, groups):
+        with open(self.groups_path, "w") as file:
+            json.dump(groups, file)
+
+    def create_group(self, group, start="0"):
+        with self.locked():
+            groups = self.load_groups()
+            groups.setdefault(group, {"delivered": start, "pending": {}})
+            self.save_groups(groups)
+
+    def read_group(self, group, consumer, count=100, block=None):
+        with self.locked():
+            groups = self.load_groups()
+            state = groups[group]
+            entries = self.read(state["delivered"], count)
+            if entries:
+                state["delivered"] = entries[-1][0]
+                state["pending"].update((id, consumer) for id, _ in entries)
+                self.save_groups(groups)
+        return entries
+
+    def ack(self, group, ids):
+        with self.locked():
+            groups = self.load_groups()
+            pending = groups[group]["pending"]
+            acked = sum(pending.pop(id, None) is not None for id in ids)
+            self.save_groups(groups)
+        return acked
@@ -0,0 +1,198 @@
+"""JWT classes signed with the service's key ring.
+
+With an asymmetric ``JWT_KEYS["ALGORITHM"]`` (RS256 or EdDSA) tokens are
+signed with the active private key of ``JWT_KEYS["DIRECTORY"]`` and carry its
+``kid``. Every key of the directory is published on ``/.well-known/jwks.json``
+so other services verify tokens locally instead of calling ``token/verify/``.
+
+Key files are ``<kid>.pem`` for private keys and ``<kid>.pub.pem`` for retired
+keys that only verify tokens issued before a rotation. Unless
+``JWT_KEYS["ACTIVE_KID"]`` is set the last private key in name order that has
+been published for ``JWT_KEYS["JWKS_MAX_AGE"]`` signs, so services caching the
+JWKS know a new key before the first token carrying it. When no key is that
+old, which only happens on the first deploy, the first one signs.
+"""
+import functools
+import json
+import os
+import time
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from jwt.algorithms import get_default_algorithms
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "EdDSA")
+
+# Claim naming the refresh-token session, see authentication.sessions.
+SESSION_CLAIM = "sid"
+
+PRIVATE_SUFFIX = ".pem"
+PUBLIC_SUFFIX = ".pub.pem"
+
+
+class Keyring:
+    def __init__(self, algorithm, directory, active_kid=None, publish_for=0):
+        self.algorithm = algorithm
+        self.publish_for = publish_for
+        self.private_keys = {}
+        self.public_keys = {}
+        self.added_at = {}
+
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            with open(path, "rb") as key_file:
+                data = key_file.read()
+            if name.endswith(PUBLIC_SUFFIX):
+                kid = name[: -len(PUBLIC_SUFFIX)]
+                self.public_keys[kid] = serialization.load_pem_public_key(data)
+            elif name.endswith(PRIVATE_SUFFIX):
+                kid = name[: -len(PRIVATE_SUFFIX)]
+                key = serialization.load_pem_private_key(data, password=None)
+                self.private_keys[kid] = key
+                self.public_keys[kid] = key.public_key()
+                self.added_at[kid] = os.stat(path).st_mtime
+
+        if not self.private_keys:
+            raise ImproperlyConfigured("No private signing key in %s" % directory)
+        if active_kid and active_kid not in self.private_keys:
+            raise ImproperlyConfigured("Unknown signing key %s" % active_kid)
+        self.pinned_kid = active_kid or None
+
+        self.jwks = {"keys": [self.jwk(kid) for kid in sorted(self.public_keys)]}
+
+    @property
+    def active_kid(self):
+        if self.pinned_kid:
+            return self.pinned_kid
+        published = time.time() - self.publish_for
+        ready = [kid for kid, at in self.added_at.items() if at <= published]
+        return max(ready) if ready else min(self.private_keys)
+
+    @property
+    def signing_key(self):
+        return self.private_keys[self.active_kid]
+
+    def jwk(self, kid):
+        jwk = json.loads(
+            get_default_algorithms()[self.algorithm].to_jwk(self.public_keys[kid])
+        )
+        jwk.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+        return jwk
+
+
+class KeyringTokenBackend(TokenBackend):
+    """Token backend signing with the active key and verifying by ``kid``."""
+
+    def __init__(self, keyring, audience=None, issuer=None, leeway=0):
+        self.keyring = keyring
+        super().__init__(
+            keyring.algorithm,
+            keyring.signing_key,
+            audience=audience,
+            issuer=issuer,
+            leeway=leeway,
+        )
+
+    def _validate_algorithm(self, algorithm):
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise TokenBackendError(_("Unrecognized algorithm type '%s'") % algorithm)
+
+    def get_verifying_key(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError:
+            raise TokenBackendError(_("Token is invalid or expired"))
+        try:
+            return self.keyring.public_keys[kid]
+        except KeyError:
+            raise TokenBackendError(_("Token is invalid or expired"))
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+
+        kid = self.keyring.active_kid
+        return jwt.encode(
+            jwt_payload,
+            self.keyring.private_keys[kid],
+            algorithm=self.algorithm,
+            headers={"kid": kid},
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_keyring():
+    config = settings.JWT_KEYS
+    if config["ALGORITHM"] not in ASYMMETRIC_ALGORITHMS:
+        return None
+    return Keyring(
+        config["ALGORITHM"],
+        config["DIRECTORY"],
+        config["ACTIVE_KID"],
+        publish_for=config["JWKS_MAX_AGE"],
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_token_backend():
+    keyring = get_keyring()
+    if keyring is None:
+        from rest_framework_simplejwt.state import token_backend
+
+        return token_backend
+    return KeyringTokenBackend(
+        keyring,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY,
+    )
+
+
+@receiver(setting_changed)
+def reset_keyring(setting, **kwargs):
+    if setting == "JWT_KEYS":
+        get_keyring.cache_clear()
+        get_token_backend.cache_clear()
+
+
+class KeyringTokenMixin:
+    def get_token_backend(self):
+        return get_token_backend()
+
+
+class AccessToken(KeyringTokenMixin, tokens.AccessToken):
+    pass
+
+
+class UntypedToken(KeyringTokenMixin, tokens.UntypedToken):
+    pass
+
+
+class RefreshToken(KeyringTokenMixin, tokens.RefreshToken):
+    def check_blacklist(self):
+        # Tokens of a session are revoked in Redis instead of the blacklist.
+        if SESSION_CLAIM not in self.payload:
+            super().check_blacklist()
+
+    @property
+    def access_token(self):
+        access = AccessToken()
+        access.set_exp(from_time=self.current_time)
+
+        for claim, value in self.payload.items():
+            if claim not in self.no_copy_claims:
+                access[claim] = value
+
+        return access
@@ -17,7 +17,6 @@ from django.urls import include, path, re_path
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
-from rest_framework_simplejwt.views import TokenRefreshView, token_verify
 
 from authentication import views
 
@@ -50,7 +49,10 @@ urlpatterns = [
     # Authentication
     path("info", views.Info.as_view()),
     path("config", views.Config.as_view()),
+    path("metrics", views.Metrics.as_view()),
     # JWT Token
-    path("token/verify/", token_verify, name="token_verify"),
-    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("token/verify/", views.TokenVerify.as_view(), name="token_verify"),
+    path("token/refresh/", views.TokenRefresh.as_view(), name="token_refresh"),
+    path("token/introspect/", views.TokenIntrospect.as_view(), name="token_introspect"),
+    path(".well-known/jwks.json", views.JWKS.as_view(), name="jwks"),
 ]
@@ -1,9 +1,15 @@
+import logging
+
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 from django.template import Context
 from django.template.loader import get_template, render_to_string
 from django.utils import timezone
 
+from authentication import metrics
+
+logger = logging.getLogger(__name__)
+
 
 def get_local_time():
     return timezone.now().astimezone()
@@ -33,4 +39,19 @@ def send_email(app, event, context, recipients=(), from_email=None):
 
         email.attach_alternative(html_message, "text/html")
 
-        email.send()
+        with metrics.timer(metrics.EXTERNAL_CALL_SECONDS, "smtp"):
+            email.send()
+
+
+def mask_mobile(mobile):
+    """Hide all but the prefix and the last two digits of a mobile for logs."""
+    mobile = str(mobile or "")
+    if len(mobile) <= 6:
+        return "*" * len(mobile)
+    return mobile[:4] + "*" * (len(mobile) - 6) + mobile[-2:]
+
+
+def send_sms(mobile, text):
+    with metrics.timer(metrics.EXTERNAL_CALL_SECONDS, "sms"):
+        # Send To Phone Here
+        logger.debug("SMS to %s", mask_mobile(mobile))
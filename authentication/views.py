@@ -1,9 +1,14 @@
 from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
 from django.utils.translation import gettext_lazy as _
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt import views as jwt_views
 
+from authentication import metrics, serializers, tokens
+from authentication.permissions import IsServiceClient
 from authentication.utils import get_local_time
 
 
@@ -33,3 +38,45 @@ class Config(APIView):
             public_settings.update({setting: all_app_settings.get(setting, None)})
 
         return Response(public_settings)
+
+
+class Metrics(APIView):
+    """Prometheus samples, for scrapers sending a service key."""
+
+    authentication_classes = []
+    permission_classes = (IsServiceClient,)
+
+    def get(self, request, *args, **kwargs):
+        content, content_type = metrics.render()
+        return HttpResponse(content, content_type=content_type)
+
+
+class TokenRefresh(jwt_views.TokenRefreshView):
+    serializer_class = serializers.TokenRefreshSerializer
+
+
+class TokenVerify(jwt_views.TokenVerifyView):
+    serializer_class = serializers.TokenVerifySerializer
+
+
+class JWKS(APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, *args, **kwargs):
+        keyring = tokens.get_keyring()
+        response = Response(keyring.jwks if keyring else {"keys": []})
+        patch_cache_control(
+            response, public=True, max_age=settings.JWT_KEYS["JWKS_MAX_AGE"]
+        )
+        return response
+
+
+class TokenIntrospect(APIView):
+    authentication_classes = []
+    permission_classes = (IsServiceClient,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = serializers.TokenIntrospectSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.validated_data)
@@ -0,0 +1,224 @@
+"""Load benchmark of the customer authentication flow.
+
+Every virtual user runs signup -> verify -> signin -> me -> refresh -> signout
+against a running stack and the latency of each step is recorded.
+
+Start a local stack with the benchmark settings (SQLite by default, set
+``BENCHMARK_DATABASE=mariadb`` to use the MariaDB from base settings)::
+
+    export DJANGO_SETTINGS_MODULE=authentication.settings.benchmark_settings
+    python manage.py migrate
+    python manage.py runserver --noreload 127.0.0.1:8000
+    python manage.py relay_outbox
+
+and run the driver::
+
+    python -m benchmarks.auth_flows --users 200 --concurrency 16 \\
+        --output results/auth_flows.json
+"""
+import argparse
+import os
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.utils import print_table, summarize, write_results
+
+STEPS = ("signup", "verify", "signin", "me", "refresh", "signout")
+
+PASSWORD = "benchmark123"
+
+VERIFICATION_URL = re.compile(
+    r"/sign-up/verify-email/(?P<customer_id>[0-9a-f-]{36})/(?P<temp_id>[0-9a-f-]{36})"
+)
+
+
+class Mailbox:
+    """Reads the verification mails written by the file based email backend."""
+
+    def __init__(self, directory, timeout):
+        self.directory = directory
+        self.timeout = timeout
+        self.seen = set()
+        self.temps = {}
+        self.lock = threading.Lock()
+
+    def verification_id(self, customer_id):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if customer_id not in self.temps:
+                    self.scan()
+                temp_id = self.temps.get(customer_id)
+            if temp_id:
+                return temp_id
+            time.sleep(0.05)
+        raise TimeoutError("No verification mail for %s" % customer_id)
+
+    def scan(self):
+        for name in os.listdir(self.directory):
+            if name in self.seen:
+                continue
+            self.seen.add(name)
+            with open(os.path.join(self.directory, name)) as mail:
+                for match in VERIFICATION_URL.finditer(mail.read()):
+                    self.temps[match["customer_id"]] = match["temp_id"]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def call(self, step, method, url, expected, **kwargs):
+        start = time.perf_counter()
+        response = method(url, **kwargs)
+        duration = time.perf_counter() - start
+        with self.lock:
+            if response.status_code == expected:
+                self.samples[step].append(duration)
+            else:
+                self.errors[step] += 1
+        if response.status_code != expected:
+            raise StepFailed(step, response)
+        return response.json() if response.content else None
+
+
+class StepFailed(Exception):
+    def __init__(self, step, response):
+        super().__init__(
+            "%s returned %s: %s" % (step, response.status_code, response.text[:200])
+        )
+
+
+def national_code(serial):
+    digits = "%09d" % serial
+    s = sum(int(digits[x]) * (10 - x) for x in range(9)) % 11
+    return digits + str(s if s < 2 else 11 - s)
+
+
+def run_user(base_url, serial, run_id, mailbox, recorder):
+    session = requests.Session()
+    email = "bench-%s-%s@example.com" % (run_id, serial)
+
+    customer = recorder.call(
+        "signup",
+        session.post,
+        base_url + "/customer/signup/",
+        201,
+        json={
+            "email": email,
+            "national_code": national_code(serial),
+            "password": PASSWORD,
+            "agree_with_policy": True,
+        },
+    )
+    temp_id = mailbox.verification_id(customer["id"])
+    recorder.call(
+        "verify",
+        session.post,
+        base_url + "/customer/%s/verify_email/" % customer["id"],
+        200,
+        json={"id": temp_id},
+    )
+    token = recorder.call(
+        "signin",
+        session.post,
+        base_url + "/customer/signin/",
+        200,
+        json={"email": email, "password": PASSWORD},
+    )["token"]
+    headers = {"Authorization": "Bearer " + token["access"]}
+    recorder.call("me", session.get, base_url + "/customer/me/", 200, headers=headers)
+    recorder.call(
+        "refresh",
+        session.post,
+        base_url + "/token/refresh/",
+        200,
+        json={"refresh": token["refresh"]},
+    )
+    recorder.call(
+        "signout",
+        session.post,
+        base_url + "/customer/signout/",
+        205,
+        json={"refresh": token["refresh"]},
+        headers=headers,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--mail-dir",
+        default=os.environ.get(
+            "BENCHMARK_MAIL_DIR", "/tmp/authentication-benchmark-mail"  # nosec
+        ),
+    )
+    parser.add_argument("--mail-timeout", type=float, default=30)
+    parser.add_argument(
+        "--serial-offset",
+        type=int,
+        default=None,
+        help="First national code serial, defaults to a value derived from the clock",
+    )
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.mail_dir, exist_ok=True)
+    base_url = args.base_url.rstrip("/")
+    run_id = uuid.uuid4().hex[:8]
+    offset = args.serial_offset
+    if offset is None:
+        offset = int(time.time()) % 100000 * 1000
+    mailbox = Mailbox(args.mail_dir, args.mail_timeout)
+    recorder = Recorder()
+    failures = []
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(run_user, base_url, offset + n, run_id, mailbox, recorder)
+            for n in range(args.users)
+        ]
+        for future in futures:
+            try:
+                future.result()
+            except (StepFailed, TimeoutError, requests.RequestException) as error:
+                failures.append(str(error))
+    elapsed = time.perf_counter() - start
+
+    results = {
+        step: summarize(recorder.samples[step], elapsed, recorder.errors[step])
+        for step in STEPS
+    }
+    print_table(results, columns=("count", "errors", "p50_ms", "p95_ms", "p99_ms"))
+    print("%s users in %.2fs, %s failed" % (args.users, elapsed, len(failures)))
+    for failure in failures[:5]:
+        print("  " + failure)
+
+    if args.output:
+        write_results(
+            args.output,
+            "auth_flows",
+            {
+                "base_url": base_url,
+                "users": args.users,
+                "concurrency": args.concurrency,
+            },
+            results,
+        )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
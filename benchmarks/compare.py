@@ -0,0 +1,45 @@
+"""Compare two benchmark result files, e.g. the previous and the next release.
+
+    python -m benchmarks.compare results/v1.json results/v2.json
+"""
+import argparse
+import json
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s")
+
+
+def change(old, new):
+    if old in (None, 0) or new is None:
+        return "n/a"
+    return "%+.1f%%" % ((new - old) / old * 100)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as baseline, open(args.candidate) as candidate:
+        old, new = json.load(baseline), json.load(candidate)
+    if old["benchmark"] != new["benchmark"]:
+        parser.error("Results of %s and %s" % (old["benchmark"], new["benchmark"]))
+
+    print("%s: %s -> %s" % (new["benchmark"], old.get("revision"), new.get("revision")))
+    for name, row in new["results"].items():
+        before = old["results"].get(name, {})
+        print(
+            "  "
+            + name.ljust(24)
+            + "".join(
+                ("%s %s" % (metric, change(before.get(metric), row.get(metric)))).rjust(
+                    26
+                )
+                for metric in METRICS
+                if metric in row
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Micro benchmark of the JSON renderers and parsers of the REST API.
+
+Renders and parses customer list payloads with DRF's stdlib based classes and
+the orjson based ones configured in REST_FRAMEWORK::
+
+    python -m benchmarks.renderers --sizes 1 100 10000 \\
+        --output results/renderers.json
+"""
+import argparse
+import time
+import uuid
+from io import BytesIO
+
+from benchmarks.utils import print_table, setup_django, summarize, write_results
+
+
+def make_payload(size):
+    """Customer details shaped like the output of CustomerDetailSerializer."""
+    from authentication.utils import get_local_time
+
+    now = get_local_time().isoformat()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "url": "http://testserver/customer/%s/" % uuid.uuid4(),
+            "is_active": True,
+            "email_verify": now,
+            "mobile_verify": None,
+            "total_credit": n * 1000,
+            "contact": {"email": "customer%s@example.com" % n, "mobile": None},
+            "people": {
+                "name": "Ali",
+                "last_name": "",
+                "national_code": "%010d" % n,
+            },
+        }
+        for n in range(size)
+    ]
+
+
+def measure(function, iterations):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - begin)
+    return summarize(samples, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=None,
+        help="Runs per size, defaults to about 100000 objects worth",
+    )
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from authentication.parsers import ORJSONParser
+    from authentication.renderers import ORJSONRenderer
+
+    candidates = {
+        "json": (JSONRenderer(), JSONParser()),
+        "orjson": (ORJSONRenderer(), ORJSONParser()),
+    }
+
+    results = {}
+    for size in args.sizes:
+        payload = make_payload(size)
+        iterations = args.iterations or max(100000 // size, 10)
+        content = JSONRenderer().render(payload)
+        for name, (renderer, json_parser) in candidates.items():
+            results["render %s x%s" % (name, size)] = measure(
+                lambda: renderer.render(payload), iterations
+            )
+            results["parse %s x%s" % (name, size)] = measure(
+                lambda: json_parser.parse(BytesIO(content)), iterations
+            )
+
+    print_table(results, columns=("count", "p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+
+    if args.output:
+        write_results(
+            args.output,
+            "renderers",
+            {"sizes": args.sizes, "iterations": args.iterations},
+            results,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+"""Micro benchmark of the customer representations against DRF serializers.
+
+Serializes unsaved customers, so no database is needed, and reports objects
+per second for every page size::
+
+    python -m benchmarks.representations --sizes 1 100 10000 \\
+        --output results/representations.json
+"""
+import argparse
+import time
+import uuid
+
+from benchmarks.utils import print_table, setup_django, summarize, write_results
+
+
+def make_customers(size):
+    from authentication.apps.customer import models
+    from authentication.utils import get_local_time
+
+    now = get_local_time()
+    return [
+        models.Customer(
+            id=uuid.uuid4(),
+            username=models.Contact(email="customer%s@example.com" % n),
+            is_active=True,
+            email_verify=now,
+            total_credit=n * 1000,
+        )
+        for n in range(size)
+    ]
+
+
+def measure(function, iterations, size):
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - begin)
+    result = summarize(samples, time.perf_counter() - start)
+    result["objects_per_s"] = round(result["throughput_per_s"] * size)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=None,
+        help="Runs per size, defaults to about 100000 objects worth",
+    )
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.test import RequestFactory
+
+    from authentication.apps.customer import representations, serializers
+
+    request = RequestFactory().get("/customer/")
+
+    results = {}
+    for size in args.sizes:
+        customers = make_customers(size)
+        contacts = [customer.username for customer in customers]
+        iterations = args.iterations or max(100000 // size, 10)
+        candidates = {
+            "customers drf": lambda: serializers.CustomerSerializer(
+                customers, many=True, context={"request": request}
+            ).data,
+            "customers plain": lambda: representations.customers(customers, request),
+            "contacts drf": lambda: serializers.ContactSerializer(
+                contacts, many=True
+            ).data,
+            "contacts plain": lambda: [
+                representations.contact(contact) for contact in contacts
+            ],
+        }
+        for name, function in candidates.items():
+            results["%s x%s" % (name, size)] = measure(function, iterations, size)
+
+    print_table(results, columns=("count", "p50_ms", "p95_ms", "objects_per_s"))
+
+    if args.output:
+        write_results(
+            args.output,
+            "representations",
+            {"sizes": args.sizes, "iterations": args.iterations},
+            results,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
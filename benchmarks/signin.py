@@ -0,0 +1,107 @@
+"""Benchmark of the database side of signin credential lookups.
+
+Creates customers in the benchmark database and authenticates them by email
+and by mobile, reporting the queries and the time spent in the database per
+lookup. Passwords use the fast MD5 hasher so hashing does not hide the
+database time::
+
+    export DJANGO_SETTINGS_MODULE=authentication.settings.benchmark_settings
+    python manage.py migrate
+    python -m benchmarks.signin --customers 1000 --iterations 2000 \\
+        --output results/signin.json
+"""
+import argparse
+import random
+import time
+
+from benchmarks.utils import print_table, setup_django, summarize, write_results
+
+PASSWORD = "benchmark123"
+
+SERIAL_OFFSET = 900000000
+
+
+def make_national_code(serial):
+    digits = "%09d" % serial
+    s = sum(int(digits[x]) * (10 - x) for x in range(9)) % 11
+    return digits + str(s if s < 2 else 11 - s)
+
+
+def create_customers(count):
+    """Create ``count`` signin benchmark customers unless they already exist."""
+    from authentication.apps.customer import models
+
+    credentials = []
+    for n in range(count):
+        email = "signin%s@benchmark.local" % n
+        mobile = "0939%07d" % n
+        credentials.append({"email": email, "mobile": mobile})
+        if models.Contact.objects.filter(email_key=email).exists():
+            continue
+        people = models.People.objects.create(
+            national_code=make_national_code(SERIAL_OFFSET + n)
+        )
+        contact = models.Contact.objects.create(
+            email=email, mobile=mobile, owner=people
+        )
+        models.Customer.objects.create_customer(
+            contact, password=PASSWORD, owner=people, is_active=True
+        )
+    return credentials
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.contrib import auth
+    from django.db import connection
+    from django.test import override_settings
+
+    from authentication import metrics
+
+    results = {}
+    with override_settings(
+        PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]
+    ):
+        credentials = create_customers(args.customers)
+        for kind in ("email", "mobile"):
+            samples, queries, db_time = [], 0, 0.0
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                lookup = {kind: random.choice(credentials)[kind]}  # nosec
+                counter = metrics.QueryCounter()
+                begin = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    customer = auth.authenticate(password=PASSWORD, **lookup)
+                samples.append(time.perf_counter() - begin)
+                if customer is None:
+                    raise SystemExit("Could not authenticate %s" % lookup)
+                queries += counter.count
+                db_time += counter.duration
+            result = summarize(samples, time.perf_counter() - start)
+            result["queries"] = queries / args.iterations
+            result["db_ms"] = round(db_time / args.iterations * 1000, 3)
+            results["authenticate by %s" % kind] = result
+
+    print_table(
+        results,
+        columns=("count", "p50_ms", "p99_ms", "queries", "db_ms"),
+    )
+
+    if args.output:
+        write_results(
+            args.output,
+            "signin",
+            {"customers": args.customers, "iterations": args.iterations},
+            results,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+import json
+import os
+import platform
+import subprocess  # nosec
+import time
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return None
+    rank = max(int(round(fraction * len(samples) + 0.5)) - 1, 0)
+    return samples[min(rank, len(samples) - 1)]
+
+
+def summarize(samples, elapsed, errors=0):
+    """Latency percentiles in milliseconds and throughput per second."""
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "p50_ms": _ms(percentile(samples, 0.50)),
+        "p95_ms": _ms(percentile(samples, 0.95)),
+        "p99_ms": _ms(percentile(samples, 0.99)),
+        "mean_ms": _ms(sum(samples) / len(samples)) if samples else None,
+        "throughput_per_s": round(len(samples) / elapsed, 2) if elapsed else None,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def git_revision():
+    try:
+        return (
+            subprocess.check_output(  # nosec
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, benchmark, parameters, results):
+    """Write results together with enough metadata to compare two releases."""
+    document = {
+        "benchmark": benchmark,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "parameters": parameters,
+        "results": results,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as output:
+        json.dump(document, output, indent=2, sort_keys=True)
+    return document
+
+
+def print_table(results, columns=("count", "errors", "p50_ms", "p95_ms", "p99_ms")):
+    width = max(len(name) for name in results) + 2
+    print("".ljust(width) + "".join(column.rjust(18) for column in columns))
+    for name, row in results.items():
+        print(
+            name.ljust(width)
+            + "".join(str(row.get(column)).rjust(18) for column in columns)
+        )
+
+
+def setup_django(settings_module="authentication.settings.benchmark_settings"):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+
+    django.setup()